@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Влияние настроек HTTP-клиента Bot API на задержку ответа.
+
+Бот запускается в режиме polling против локальной имитации Bot API, которая
+отвечает на методы с задержкой --answer-delay (RTT до Telegram) и тратит
+--connect-delay на каждое новое соединение (TCP- и TLS-рукопожатие).
+Для каждого набора настроек отправляется поток inline-запросов и
+измеряется время до answerInlineQuery, а также число соединений, которые
+открыл бот (вместе с getMe и getUpdates).
+
+- default - настройки по умолчанию (пул 256, keep-alive 30 с);
+- pool=1, pool=8 - ответы ждут свободного соединения в маленьком пуле;
+- keepalive=0 - каждое соединение закрывается после запроса, каждый ответ
+  платит за рукопожатие;
+- pool=1, pool_timeout - ожидание пула ограничено: часть ответов не уходит
+  (PoolTimeout), бот отвечает пустым результатом или не отвечает вовсе.
+
+HTTP/2 здесь не сравнивается: имитация говорит только на HTTP/1.1.
+С настоящим api.telegram.org HTTP/2 мультиплексирует все ответы в одном
+соединении (BOT_API_HTTP_VERSION=2, нужен пакет h2).
+
+Пример:
+    python benchmarks/bench_http_transport.py --requests 300 --rate 100 --answer-delay 0.02
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_bot_api import (  # noqa: E402
+    FakeBotAPI,
+    make_inline_query_update,
+    start_bot_process,
+    stop_bot_process,
+    summarize_latencies,
+)
+
+SCENARIOS = {
+    'default': {},
+    'pool=1': {'BOT_API_POOL_SIZE': '1', 'BOT_API_POOL_TIMEOUT': '60'},
+    'pool=8': {'BOT_API_POOL_SIZE': '8'},
+    'keepalive=0': {'BOT_API_KEEPALIVE_EXPIRY': '0'},
+    'pool=1,pool_timeout=0.05': {'BOT_API_POOL_SIZE': '1', 'BOT_API_POOL_TIMEOUT': '0.05'},
+}
+
+
+def _is_empty_answer(params: dict) -> bool:
+    results = params.get('results')
+    if isinstance(results, str):
+        results = json.loads(results)
+    return not results
+
+
+async def run_scenario(name: str, requests: int, rate: float, users: int,
+                       answer_delay: float, connect_delay: float) -> dict:
+    api = FakeBotAPI(answer_delay=answer_delay, connect_delay=connect_delay)
+    await api.start()
+
+    env = {
+        'BOT_RUN_MODE': 'polling',
+        # Ответы должны уходить параллельно, иначе пул не на что тратить
+        'MAX_CONCURRENT_UPDATES': '256',
+        **SCENARIOS[name],
+    }
+    process = start_bot_process(api, env)
+    try:
+        await api.wait_polling_started()
+
+        interval = 1.0 / rate
+        futures = []
+        started = time.perf_counter()
+        for i in range(requests):
+            update = make_inline_query_update(i + 1, 1000 + i % users, f'вопрос номер {i}')
+            futures.append((time.perf_counter(), api.expect_answer(update)))
+            api.push_update(update)
+
+            delay = started + (i + 1) * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        latencies = []
+        lost = 0
+        for sent_at, future in futures:
+            try:
+                received_at = await asyncio.wait_for(future, 60)
+            except asyncio.TimeoutError:
+                lost += 1
+                continue
+            latencies.append(received_at - sent_at)
+        elapsed = time.perf_counter() - started
+
+        summary = summarize_latencies(latencies) if latencies else {}
+        summary.update({
+            'scenario': name,
+            'answered': len(latencies),
+            'empty': sum(1 for _, _, params in api.answers if _is_empty_answer(params)),
+            'lost': lost,
+            'connections': api.connections_opened,
+            'throughput_rps': len(latencies) / elapsed,
+        })
+        return summary
+    finally:
+        stop_bot_process(process)
+        await api.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300, help='Количество inline-запросов на сценарий')
+    parser.add_argument('--rate', type=float, default=100.0, help='Запросов в секунду')
+    parser.add_argument('--users', type=int, default=50, help='Количество различных пользователей')
+    parser.add_argument('--answer-delay', type=float, default=0.02, help='Имитация RTT ответа Bot API, сек')
+    parser.add_argument('--connect-delay', type=float, default=0.03, help='Имитация рукопожатия, сек')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help='Какие сценарии запускать')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.scenarios:
+        results.append(await run_scenario(name, args.requests, args.rate, args.users,
+                                          args.answer_delay, args.connect_delay))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'сценарий':<26}{'p50, мс':>10}{'p99, мс':>10}{'max, мс':>10}{'rps':>8}"
+          f"{'пустых':>8}{'потеряно':>10}{'соединений':>12}")
+    for r in results:
+        if r['answered']:
+            timings = f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}"
+        else:
+            timings = f"{'-':>10}{'-':>10}{'-':>10}"
+        print(f"{r['scenario']:<26}{timings}{r['throughput_rps']:>8.1f}"
+              f"{r['empty']:>8}{r['lost']:>10}{r['connections']:>12}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
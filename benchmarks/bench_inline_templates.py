@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+CPU на один inline-ответ: построение объектов telegram на каждый запрос
+(прежний способ) против заранее сериализованных шаблонов.
+
+Ответ проходит весь путь answerInlineQuery внутри Bot, включая сериализацию
+параметров; сеть заменена транспортом FakeRequest.
+
+Пример:
+    python benchmarks/bench_inline_templates.py --answers 20000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent))
+
+from telegram import Bot, InlineQueryResultArticle, InlineQueryResultsButton, InputTextMessageContent  # noqa: E402
+
+from fake_bot_api import FAKE_TOKEN, FakeRequest  # noqa: E402
+from src.inline_templates import InlineResultTemplates  # noqa: E402
+
+ICON_URL = 'https://img.icons8.com/color/48/question-mark.png'
+MESSAGE_TEXT = '✅ Да, это абсолютно правда согласно проверенным источникам'
+
+
+def legacy_results(message_text: str):
+    return [
+        InlineQueryResultArticle(
+            id="fact_check_result",
+            title="Это правда?",
+            description="Проверить достоверность информации",
+            input_message_content=InputTextMessageContent(message_text=message_text, parse_mode=None),
+            thumbnail_url=ICON_URL,
+        )
+    ]
+
+
+async def measure(answers: int):
+    bot = Bot(FAKE_TOKEN, request=FakeRequest(), get_updates_request=FakeRequest())
+    await bot.initialize()
+    templates = InlineResultTemplates(
+        icon_url=ICON_URL,
+        command_text="Это правда?",
+        command_description="Проверить достоверность информации",
+        button_text="Как это работает?",
+        start_parameter="help",
+    )
+
+    # Шаблон должен давать тот же JSON, что и объекты telegram
+    legacy_json = [
+        bot._insert_defaults_for_ilq_results(result).to_dict() for result in legacy_results(MESSAGE_TEXT)
+    ]
+    assert json.loads(templates.button_result.render(message_text=MESSAGE_TEXT)) == legacy_json
+
+    async def run_legacy():
+        for i in range(answers):
+            await bot.answer_inline_query(
+                str(i),
+                legacy_results(MESSAGE_TEXT),
+                cache_time=0,
+                is_personal=True,
+                button=InlineQueryResultsButton(text="Как это работает?", start_parameter="help"),
+            )
+
+    async def run_templates():
+        for i in range(answers):
+            await bot.answer_inline_query(
+                str(i),
+                [],
+                cache_time=0,
+                is_personal=True,
+                **templates.answer_kwargs(templates.button_result.render(message_text=MESSAGE_TEXT)),
+            )
+
+    results = []
+    for name, runner in (('объекты telegram', run_legacy), ('шаблоны', run_templates)):
+        started = time.process_time()
+        await runner()
+        results.append((name, (time.process_time() - started) / answers * 1e6))
+
+    await bot.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--answers', type=int, default=20000, help='Количество ответов в замере')
+    args = parser.parse_args()
+
+    results = asyncio.run(measure(args.answers))
+    baseline = results[0][1]
+    print(f"{'вариант':<20}{'мкс CPU/ответ':>16}{'ускорение':>12}")
+    for name, us in results:
+        print(f"{name:<20}{us:>16.1f}{baseline / us:>11.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест бота на локальной имитации Bot API.
+
+Бот запускается отдельным процессом против FakeBotAPI (сеть наружу не
+нужна). Генератор отправляет поток обновлений заданного состава
+(--mix) ступенями частоты (--rates): на каждой ступени обновления идут
+с постоянной частотой --duration секунд. Для каждой ступени измеряются:
+
+- пропускная способность - ответов в секунду;
+- задержка от отправки обновления до ответа бота (p50/p99/max);
+- загрузка CPU процессом бота (и его воркерами) в процентах одного ядра;
+- максимальная резидентная память (RSS) за ступень.
+
+Типы обновлений в --mix:
+    inline - inline-запрос с вопросом
+    empty  - пустой inline-запрос (подсказка с командой)
+    start, help, stats - команды в личном чате
+
+Порог регрессии задается --max-p99-ms и --min-throughput: если p99 любой
+ступени выше или лучшая пропускная способность ниже порога, скрипт
+завершается с кодом 1. Ступени, на которых бот не успевает за потоком,
+видны по пропускной способности ниже заданной частоты и росту p99.
+
+Пример:
+    python benchmarks/bench_load.py --rates 50 100 200 400 --duration 10 \\
+        --mix inline=85,empty=10,start=2,help=2,stats=1 --max-p99-ms 250
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_bot_api import (  # noqa: E402
+    FakeBotAPI,
+    WebhookClient,
+    make_command_update,
+    make_inline_query_update,
+    process_usage,
+    start_bot_process,
+    stop_bot_process,
+    summarize_latencies,
+)
+
+UPDATE_KINDS = ('inline', 'empty', 'start', 'help', 'stats')
+DEFAULT_MIX = 'inline=85,empty=10,start=2,help=2,stats=1'
+WEBHOOK_SECRET = 'bench-secret'
+# Как часто снимается RSS процесса бота
+USAGE_SAMPLE_INTERVAL = 0.2
+# Команды приходят от новых пользователей: ответы сопоставляются по чату,
+# а исходящие сообщения в один чат ограничены по частоте
+COMMAND_USER_BASE = 10 ** 7
+
+QUESTIONS = (
+    'земля плоская', 'вода мокрая', 'кошки умеют летать', 'завтра будет дождь',
+    'луна сделана из сыра', 'python самый быстрый язык', 'сегодня пятница',
+)
+
+
+def parse_mix(text: str) -> dict:
+    """Разбирает состав потока вида 'inline=85,stats=1' в нормированные доли."""
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in UPDATE_KINDS:
+            raise argparse.ArgumentTypeError(f"неизвестный тип обновления {kind!r} (ожидается {', '.join(UPDATE_KINDS)})")
+        try:
+            mix[kind] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"некорректный вес {weight!r} для {kind}")
+        if mix[kind] < 0:
+            raise argparse.ArgumentTypeError(f"вес {kind} не может быть отрицательным")
+    total = sum(mix.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("сумма весов должна быть положительной")
+    return {kind: weight / total for kind, weight in mix.items()}
+
+
+class UpdateStream:
+    """Синтетический поток обновлений заданного состава."""
+
+    def __init__(self, mix: dict, users: int, seed: int):
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.users = users
+        self.rng = random.Random(seed)
+        self.update_id = 0
+
+    def next(self) -> tuple:
+        self.update_id += 1
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        if kind in ('inline', 'empty'):
+            user_id = 1000 + self.rng.randrange(self.users)
+            query = '' if kind == 'empty' else f'{self.rng.choice(QUESTIONS)} {self.update_id}'
+            return kind, make_inline_query_update(self.update_id, user_id, query)
+        return kind, make_command_update(self.update_id, COMMAND_USER_BASE + self.update_id, kind)
+
+
+class UsageSampler:
+    """Периодически снимает CPU и RSS процесса бота."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.max_rss = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def reset(self) -> dict:
+        """Начинает новую ступень и возвращает текущие показатели."""
+        usage = process_usage(self.pid)
+        self.max_rss = usage['rss_bytes']
+        return usage
+
+    async def _loop(self):
+        while True:
+            self.max_rss = max(self.max_rss, process_usage(self.pid)['rss_bytes'])
+            await asyncio.sleep(USAGE_SAMPLE_INTERVAL)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_port(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def run_step(api: FakeBotAPI, client, stream: UpdateStream, sampler: UsageSampler,
+                   rate: float, duration: float, answer_timeout: float) -> dict:
+    """Одна ступень нагрузки с постоянной частотой."""
+    count = max(1, int(rate * duration))
+    interval = 1.0 / rate
+    pending = []
+    deliveries = []
+    by_kind = {}
+
+    usage_before = sampler.reset()
+    started = time.perf_counter()
+    for i in range(count):
+        kind, update = stream.next()
+        future = api.expect_answer(update)
+        sent_at = time.perf_counter()
+        if client:
+            deliveries.append(asyncio.ensure_future(client.post(update)))
+        else:
+            api.push_update(update)
+        pending.append((kind, sent_at, future))
+
+        delay = started + (i + 1) * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    latencies = []
+    lost = 0
+    last_answer = started
+    for kind, sent_at, future in pending:
+        try:
+            received_at = await asyncio.wait_for(future, max(0.0, sent_at + answer_timeout - time.perf_counter()))
+        except asyncio.TimeoutError:
+            lost += 1
+            continue
+        latencies.append(received_at - sent_at)
+        by_kind.setdefault(kind, []).append(received_at - sent_at)
+        last_answer = max(last_answer, received_at)
+    await asyncio.gather(*deliveries, return_exceptions=True)
+
+    elapsed = max(last_answer - started, 1e-9)
+    usage_after = process_usage(sampler.pid)
+    summary = summarize_latencies(latencies)
+    summary.update({
+        'rate': rate,
+        'sent': count,
+        'lost': lost,
+        'throughput_rps': len(latencies) / elapsed,
+        'cpu_percent': (usage_after['cpu_seconds'] - usage_before['cpu_seconds']) / elapsed * 100,
+        'max_rss_mb': max(sampler.max_rss, usage_after['rss_bytes']) / 2 ** 20,
+        'by_kind': {kind: summarize_latencies(values) for kind, values in sorted(by_kind.items())},
+    })
+    return summary
+
+
+async def run(args) -> dict:
+    api = FakeBotAPI(answer_delay=args.answer_delay)
+    await api.start()
+
+    env = {'BOT_RUN_MODE': args.mode, 'METRICS_PORT': '0'}
+    if args.mode == 'webhook':
+        port = _free_port()
+        env.update({
+            'WEBHOOK_LISTEN': '127.0.0.1',
+            'WEBHOOK_PORT': str(port),
+            'WEBHOOK_URL': f'http://127.0.0.1:{port}',
+            'WEBHOOK_PATH': 'bench-hook',
+            'WEBHOOK_SECRET_TOKEN': WEBHOOK_SECRET,
+        })
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+
+    process = start_bot_process(api, env)
+    client = None
+    sampler = UsageSampler(process.pid)
+    try:
+        if args.mode == 'webhook':
+            await api.wait_webhook_set(60)
+            await _wait_port(port)
+            client = WebhookClient(api.webhook_url, api.webhook_secret, api.webhook_max_connections)
+        else:
+            await api.wait_polling_started(60)
+
+        stream = UpdateStream(args.mix, args.users, args.seed)
+        sampler.start()
+        startup = process_usage(process.pid)
+        if args.warmup:
+            await run_step(api, client, stream, sampler, args.rates[0], args.warmup, args.answer_timeout)
+
+        steps = []
+        for rate in args.rates:
+            steps.append(await run_step(api, client, stream, sampler, rate, args.duration, args.answer_timeout))
+        return {
+            'mode': args.mode,
+            'mix': args.mix,
+            'startup_rss_mb': startup['rss_bytes'] / 2 ** 20,
+            'steps': steps,
+        }
+    finally:
+        await sampler.stop()
+        if client:
+            await client.close()
+        stop_bot_process(process)
+        await api.stop()
+
+
+def check_thresholds(result: dict, max_p99_ms: float, min_throughput: float) -> list:
+    """Возвращает список нарушенных порогов регрессии."""
+    failures = []
+    for step in result['steps']:
+        if max_p99_ms and step['p99_ms'] > max_p99_ms:
+            failures.append(f"{step['rate']:g} rps: p99 {step['p99_ms']:.1f} мс > {max_p99_ms:g} мс")
+        if step['lost']:
+            failures.append(f"{step['rate']:g} rps: без ответа {step['lost']} обновлений")
+    best = max(step['throughput_rps'] for step in result['steps'])
+    if min_throughput and best < min_throughput:
+        failures.append(f"пропускная способность {best:.1f} rps < {min_throughput:g} rps")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('polling', 'webhook'), default='polling', help='Режим получения обновлений')
+    parser.add_argument('--rates', type=float, nargs='+', default=[50, 100, 200], help='Ступени частоты, обновлений в секунду')
+    parser.add_argument('--duration', type=float, default=10.0, help='Длительность ступени, сек')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Прогрев на первой частоте, сек (0 - без прогрева)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'Состав потока (по умолчанию {DEFAULT_MIX})')
+    parser.add_argument('--users', type=int, default=1000, help='Количество различных пользователей inline-запросов')
+    parser.add_argument('--answer-delay', type=float, default=0.0, help='Имитация RTT ответа Bot API, сек')
+    parser.add_argument('--answer-timeout', type=float, default=30.0, help='Сколько ждать ответа на обновление, сек')
+    parser.add_argument('--seed', type=int, default=1, help='Seed генератора потока')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Переменная окружения бота, например MAX_CONCURRENT_UPDATES=64')
+    parser.add_argument('--max-p99-ms', type=float, default=0.0, help='Порог p99 на каждой ступени, мс (0 - не проверять)')
+    parser.add_argument('--min-throughput', type=float, default=0.0, help='Порог лучшей пропускной способности, rps')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    failures = check_thresholds(result, args.max_p99_ms, args.min_throughput)
+    result['failures'] = failures
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        mix = ', '.join(f'{kind} {share:.0%}' for kind, share in result['mix'].items())
+        print(f"Режим {result['mode']}, поток: {mix}; RSS после запуска {result['startup_rss_mb']:.1f} МБ")
+        print(f"{'частота':>8}{'rps':>9}{'p50, мс':>10}{'p99, мс':>10}{'max, мс':>10}"
+              f"{'CPU, %':>8}{'RSS, МБ':>9}{'потеряно':>10}")
+        for step in result['steps']:
+            print(f"{step['rate']:>8g}{step['throughput_rps']:>9.1f}{step['p50_ms']:>10.2f}{step['p99_ms']:>10.2f}"
+                  f"{step['max_ms']:>10.2f}{step['cpu_percent']:>8.1f}{step['max_rss_mb']:>9.1f}{step['lost']:>10}")
+        for failure in failures:
+            print(f"РЕГРЕССИЯ: {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Память и выделения на горячем пути обработки обновлений.
+
+Бот создается внутри процесса бенчмарка, исходящие методы Bot API идут
+через FakeRequest (без сети). Поток синтетических обновлений того же
+состава, что в bench_load.py (--mix), проходит весь путь обработки:
+разбор JSON (Update.de_json), обработчики, сериализацию ответа. Логи
+бота форматируются как обычно, но пишутся в /dev/null.
+
+Этапы:
+1. Прогрев (--warmup): заполняются кеши и структуры фиксированного размера.
+2. Выделения (--sample обновлений под tracemalloc): пик временной памяти
+   на обновление (сколько байт выделено сверх исходного за время одного
+   обновления) и память, оставшаяся после обновлений, с местами в коде,
+   где она выросла больше всего.
+3. Основной прогон (--updates, без tracemalloc): паузы сборщика мусора
+   по поколениям (gc.callbacks) - event loop в это время стоит; раз в
+   --updates/CHECKPOINTS обновлений снимаются RSS, число блоков памяти
+   интерпретатора (sys.getallocatedblocks) и объектов под наблюдением gc.
+   Утечка - рост нижней огибающей числа блоков во второй половине
+   прогона: минимум последней четверти против минимума третьей.
+
+Таблицы ограниченного размера растут до предела и не дают утечки, но в
+коротком прогоне их заполнение выглядит как рост. Частые вопросы
+(Space-Saving, 100 ключей) заполняются за прогрев. Корзины чатов
+(CHAT_BUCKETS_MAX = 10000) в синтетическом потоке, где каждая команда
+приходит из нового чата, заполнились бы только за сотни тысяч обновлений,
+поэтому перед каждой точкой замера из них удаляются корзины неактивных
+чатов (FloodControlLimiter.prune_chats - то же, что бот делает сам при
+достижении предела). Размеры обеих таблиц выводятся в каждой точке: они
+должны быть постоянными.
+
+Пороги (--max-*) проверяются в конце: при нарушении любого скрипт
+завершается с кодом 1.
+
+Пример:
+    python benchmarks/bench_memory.py --updates 3000000 \\
+        --max-peak-kb 16 --max-leak-blocks-per-1k 20 --max-gc-p99-ms 5 --max-rss-mb 64
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from bisect import bisect_left
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent))
+
+from telegram import Update  # noqa: E402
+
+from bench_load import DEFAULT_MIX, UpdateStream, parse_mix  # noqa: E402
+from fake_bot_api import FAKE_TOKEN, FakeRequest, percentile, process_usage  # noqa: E402
+
+# Точек замера за основной прогон
+CHECKPOINTS = 20
+# Границы бакетов пауз gc, мкс: 1 мкс ... ~1 с, по степеням двойки.
+# Паузы считаются в фиксированном массиве, чтобы замер сам не выделял память
+GC_PAUSE_BUCKETS_US = tuple(2 ** i for i in range(21))
+MB = 1024 * 1024
+
+
+class GcPauseRecorder:
+    """Распределение пауз сборщика мусора по поколениям (gc.callbacks)."""
+
+    def __init__(self):
+        self.counts = [[0] * (len(GC_PAUSE_BUCKETS_US) + 1) for _ in range(3)]
+        self.total = [0.0] * 3
+        self.max = [0.0] * 3
+        self._started = 0.0
+
+    def __call__(self, phase: str, info: dict):
+        if phase == 'start':
+            self._started = time.perf_counter()
+            return
+        pause = time.perf_counter() - self._started
+        generation = info['generation']
+        self.counts[generation][bisect_left(GC_PAUSE_BUCKETS_US, pause * 1e6)] += 1
+        self.total[generation] += pause
+        if pause > self.max[generation]:
+            self.max[generation] = pause
+
+    def start(self):
+        gc.callbacks.append(self)
+
+    def stop(self):
+        gc.callbacks.remove(self)
+
+    def _percentile_ms(self, counts: list, pct: float, max_ms: float) -> float:
+        """
+        Верхняя граница бакета, в который попадает перцентиль, мс.
+
+        Граница бакета может быть больше самой длинной паузы, поэтому
+        результат не больше наблюдаемого максимума max_ms.
+        """
+        total = sum(counts)
+        if not total:
+            return 0.0
+        threshold = total * pct / 100
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(GC_PAUSE_BUCKETS_US[min(index, len(GC_PAUSE_BUCKETS_US) - 1)] / 1000, max_ms)
+        return max_ms
+
+    def summary(self) -> dict:
+        combined = [sum(column) for column in zip(*self.counts)]
+        max_ms = max(self.max) * 1000
+        result = {
+            'collections': sum(combined),
+            'total_ms': sum(self.total) * 1000,
+            'p50_ms': self._percentile_ms(combined, 50, max_ms),
+            'p99_ms': self._percentile_ms(combined, 99, max_ms),
+            'max_ms': max_ms,
+        }
+        for generation in range(3):
+            result[f'gen{generation}'] = {
+                'collections': sum(self.counts[generation]),
+                'total_ms': self.total[generation] * 1000,
+                'max_ms': self.max[generation] * 1000,
+            }
+        return result
+
+
+def envelope_growth(checkpoints: list, key: str) -> float:
+    """
+    Рост минимума значения key на одно обновление: третья четверть
+    прогона против последней.
+    """
+    half = checkpoints[len(checkpoints) // 2:]
+    first, second = half[:len(half) // 2], half[len(half) // 2:]
+    if not first or not second:
+        return 0.0
+    low_first = min(first, key=lambda c: c[key])
+    low_second = min(second, key=lambda c: c[key])
+    distance = low_second['updates'] - low_first['updates']
+    return (low_second[key] - low_first[key]) / distance if distance > 0 else 0.0
+
+
+async def create_bot(env: dict):
+    """Создает бота внутри процесса с транспортом без сети."""
+    os.environ.update({
+        'BOT_TOKEN': FAKE_TOKEN,
+        'METRICS_PORT': '0',
+        'RESPONSES_RELOAD_INTERVAL': '0',
+        'STATS_BACKEND': 'memory',
+        **env,
+    })
+    # Настройки читаются при импорте, поэтому модули бота импортируются после
+    # подготовки окружения
+    from src.bot import IsItTrueBot
+
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, 'w')
+    try:
+        # Обработчик логов захватывает sys.stderr при создании
+        bot = IsItTrueBot(request=FakeRequest())
+    finally:
+        sys.stderr = stderr
+    await bot.application.initialize()
+    return bot
+
+
+async def run(args) -> dict:
+    env = dict(item.split('=', 1) for item in args.env)
+    bot = await create_bot(env)
+    application = bot.application
+    stream = UpdateStream(args.mix, args.users, args.seed)
+    de_json = Update.de_json
+
+    async def process(count: int):
+        for _ in range(count):
+            _, data = stream.next()
+            await application.process_update(de_json(data, application.bot))
+
+    # 1. Прогрев
+    await process(args.warmup)
+    gc.collect()
+
+    # 2. Выделения на обновление под tracemalloc
+    tracemalloc.start()
+    peaks = []
+    snapshot_before = tracemalloc.take_snapshot()
+    current_before = tracemalloc.get_traced_memory()[0]
+    for _ in range(args.sample):
+        _, data = stream.next()
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        await application.process_update(de_json(data, application.bot))
+        peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    gc.collect()
+    current_after = tracemalloc.get_traced_memory()[0]
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    growth = [
+        {'where': str(stat.traceback), 'bytes': stat.size_diff, 'blocks': stat.count_diff}
+        for stat in snapshot_after.filter_traces(filters).compare_to(snapshot_before.filter_traces(filters), 'lineno')
+        if stat.size_diff > 0
+    ][:args.top]
+    del snapshot_before, snapshot_after
+    peaks.sort()
+
+    # 3. Основной прогон: паузы gc и рост памяти
+    gc.collect()
+    recorder = GcPauseRecorder()
+    recorder.start()
+    checkpoints = []
+    step = max(1, args.updates // CHECKPOINTS)
+    processed = 0
+    started = time.perf_counter()
+    while processed < args.updates:
+        count = min(step, args.updates - processed)
+        await process(count)
+        processed += count
+        chat_buckets = bot.rate_limiter.prune_chats()
+        checkpoints.append({
+            'updates': processed,
+            'chat_buckets': chat_buckets,
+            'top_queries': len(bot.top_queries.top(bot.top_queries.capacity)),
+            'rss_bytes': process_usage(os.getpid())['rss_bytes'],
+            'allocated_blocks': sys.getallocatedblocks(),
+            'gc_objects': len(gc.get_objects()),
+        })
+    elapsed = time.perf_counter() - started
+    recorder.stop()
+    await application.shutdown()
+
+    return {
+        'updates': args.updates,
+        'updates_per_second': args.updates / elapsed if elapsed else 0.0,
+        'peak_kb_p50': percentile(peaks, 50) / 1024,
+        'peak_kb_p99': percentile(peaks, 99) / 1024,
+        'peak_kb_max': peaks[-1] / 1024 if peaks else 0.0,
+        'retained_bytes_per_update': (current_after - current_before) / args.sample if args.sample else 0.0,
+        'retained_growth': growth,
+        'gc': recorder.summary(),
+        'leak_blocks_per_1k': envelope_growth(checkpoints, 'allocated_blocks') * 1000,
+        'leak_objects_per_1k': envelope_growth(checkpoints, 'gc_objects') * 1000,
+        'leak_rss_bytes_per_1k': envelope_growth(checkpoints, 'rss_bytes') * 1000,
+        # ru_maxrss в Linux - в килобайтах
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'checkpoints': checkpoints,
+    }
+
+
+def check_thresholds(result: dict, args) -> list:
+    failures = []
+    if args.max_peak_kb is not None and result['peak_kb_p99'] > args.max_peak_kb:
+        failures.append(f"пик памяти на обновление p99 {result['peak_kb_p99']:.1f} КБ > {args.max_peak_kb:g} КБ")
+    if args.max_leak_blocks_per_1k is not None and result['leak_blocks_per_1k'] > args.max_leak_blocks_per_1k:
+        failures.append(f"рост {result['leak_blocks_per_1k']:.2f} блоков на 1000 обновлений "
+                        f"> {args.max_leak_blocks_per_1k:g}")
+    if args.max_gc_p99_ms is not None and result['gc']['p99_ms'] > args.max_gc_p99_ms:
+        failures.append(f"пауза gc p99 {result['gc']['p99_ms']:.3f} мс > {args.max_gc_p99_ms:g} мс")
+    if args.max_rss_mb is not None and result['peak_rss_mb'] > args.max_rss_mb:
+        failures.append(f"пиковый RSS {result['peak_rss_mb']:.1f} МБ > {args.max_rss_mb:g} МБ")
+    return failures
+
+
+def print_result(result: dict):
+    print(f"Обновлений: {result['updates']}, {result['updates_per_second']:.0f} в секунду")
+    print(f"Пик временной памяти на обновление: p50 {result['peak_kb_p50']:.1f} КБ, "
+          f"p99 {result['peak_kb_p99']:.1f} КБ, max {result['peak_kb_max']:.1f} КБ")
+    print(f"Осталось после обновления: {result['retained_bytes_per_update']:.1f} байт")
+    for item in result['retained_growth']:
+        print(f"    {item['bytes']:>+10} байт {item['blocks']:>+7} блоков  {item['where']}")
+    gc_summary = result['gc']
+    print(f"Паузы gc: {gc_summary['collections']} сборок, всего {gc_summary['total_ms']:.0f} мс, "
+          f"p50 {gc_summary['p50_ms']:.3f} мс, p99 {gc_summary['p99_ms']:.3f} мс, max {gc_summary['max_ms']:.2f} мс")
+    for generation in range(3):
+        g = gc_summary[f'gen{generation}']
+        print(f"    поколение {generation}: {g['collections']:>8} сборок, {g['total_ms']:>8.0f} мс, "
+              f"max {g['max_ms']:.2f} мс")
+    print(f"Рост на 1000 обновлений (нижняя огибающая, вторая половина прогона): {result['leak_blocks_per_1k']:+.2f} блоков, "
+          f"{result['leak_objects_per_1k']:+.2f} объектов gc, {result['leak_rss_bytes_per_1k']:+.0f} байт RSS")
+    print(f"Пиковый RSS: {result['peak_rss_mb']:.1f} МБ")
+    print(f"{'обновлений':>12}{'RSS, МБ':>10}{'блоков':>12}{'объектов gc':>14}{'корзин чатов':>14}{'вопросов':>10}")
+    for c in result['checkpoints']:
+        print(f"{c['updates']:>12}{c['rss_bytes'] / MB:>10.1f}{c['allocated_blocks']:>12}{c['gc_objects']:>14}"
+              f"{c['chat_buckets']:>14}{c['top_queries']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=1000000, help='Обновлений в основном прогоне')
+    parser.add_argument('--warmup', type=int, default=50000, help='Обновлений прогрева')
+    parser.add_argument('--sample', type=int, default=20000, help='Обновлений под tracemalloc')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Состав потока (по умолчанию {DEFAULT_MIX})')
+    parser.add_argument('--users', type=int, default=10000, help='Количество различных пользователей inline-запросов')
+    parser.add_argument('--seed', type=int, default=1, help='Seed потока обновлений')
+    parser.add_argument('--top', type=int, default=10, help='Сколько мест наибольшего роста памяти показать')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Переменная окружения бота (можно несколько раз)')
+    parser.add_argument('--max-peak-kb', type=float, help='Порог пика памяти на обновление (p99), КБ')
+    parser.add_argument('--max-leak-blocks-per-1k', type=float, help='Порог роста блоков памяти на 1000 обновлений')
+    parser.add_argument('--max-gc-p99-ms', type=float, help='Порог паузы gc (p99), мс')
+    parser.add_argument('--max-rss-mb', type=float, help='Порог пикового RSS, МБ')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    failures = check_thresholds(result, args)
+
+    if args.json:
+        print(json.dumps(dict(result, failures=failures), indent=2, ensure_ascii=False))
+    else:
+        print_result(result)
+        for failure in failures:
+            print(f"РЕГРЕССИЯ: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
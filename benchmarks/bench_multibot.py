@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Память на каждого дополнительного бота: один процесс на бота против
+нескольких ботов в одном процессе (EXTRA_BOTS).
+
+Для каждого числа ботов N из --bots запускаются два варианта против одной
+имитации Bot API (у каждого токена своя очередь getUpdates):
+
+- processes - N процессов по одному боту, как N контейнеров;
+- one-process - один процесс с BOT_TOKEN и N-1 ботами в EXTRA_BOTS.
+
+Каждый бот отвечает на --requests inline-запросов, после чего снимается
+память: RSS (резидентная память, как ее видит контейнер без учета общих
+страниц) и PSS (общие страницы библиотек делятся между процессами).
+Прирост на бота считается относительно N=1 того же варианта.
+
+Пример:
+    python benchmarks/bench_multibot.py --bots 1 2 4 8 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_bot_api import (  # noqa: E402
+    FakeBotAPI,
+    make_bot_token,
+    make_inline_query_update,
+    process_usage,
+    start_bot_process,
+    stop_bot_process,
+)
+
+MODES = ('processes', 'one-process')
+MB = 1024 * 1024
+
+
+def pss_bytes(pid: int) -> int:
+    """Proportional set size процесса из /proc (0, если недоступен)."""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+async def run_case(mode: str, bots: int, requests: int, users: int, settle: float) -> dict:
+    api = FakeBotAPI()
+    await api.start()
+    tokens = [make_bot_token(index) for index in range(bots)]
+    env = {'METRICS_PORT': '0', 'RESPONSES_RELOAD_INTERVAL': '0', 'STATS_BACKEND': 'memory'}
+
+    if mode == 'processes':
+        processes = [start_bot_process(api, {**env, 'BOT_TOKEN': token}) for token in tokens]
+    else:
+        processes = [start_bot_process(api, {**env, 'EXTRA_BOTS': ','.join(tokens[1:])})]
+
+    try:
+        await api.wait_bots_polling(tokens, timeout=60)
+
+        futures = []
+        update_id = 0
+        for i in range(requests):
+            for token in tokens:
+                update_id += 1
+                update = make_inline_query_update(update_id, 1000 + i % users, f'вопрос номер {i}')
+                futures.append(api.expect_answer(update))
+                api.push_update(update, token)
+            # Несколько обновлений на бота за раз, без перегрузки
+            if i % 10 == 9:
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(asyncio.gather(*futures), 120)
+        await asyncio.sleep(settle)
+
+        rss = sum(process_usage(process.pid)['rss_bytes'] for process in processes)
+        pss = sum(pss_bytes(process.pid) for process in processes)
+        return {'mode': mode, 'bots': bots, 'answered': len(futures), 'rss_bytes': rss, 'pss_bytes': pss}
+    finally:
+        for process in processes:
+            stop_bot_process(process)
+        await api.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bots', type=int, nargs='+', default=[1, 2, 4, 8], help='Количество ботов')
+    parser.add_argument('--requests', type=int, default=200, help='Inline-запросов на каждого бота')
+    parser.add_argument('--users', type=int, default=50, help='Количество различных пользователей')
+    parser.add_argument('--settle', type=float, default=1.0, help='Пауза перед замером памяти, сек')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES), help='Варианты')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    counts = sorted(set(args.bots) | {1})
+    results = []
+    for mode in args.modes:
+        for bots in counts:
+            results.append(await run_case(mode, bots, args.requests, args.users, args.settle))
+
+    base = {r['mode']: r for r in results if r['bots'] == 1}
+    for r in results:
+        extra = r['bots'] - 1
+        r['rss_per_extra_bot_bytes'] = (r['rss_bytes'] - base[r['mode']]['rss_bytes']) / extra if extra else None
+        r['pss_per_extra_bot_bytes'] = (r['pss_bytes'] - base[r['mode']]['pss_bytes']) / extra if extra else None
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'вариант':<13}{'ботов':>6}{'RSS, МБ':>10}{'PSS, МБ':>10}{'RSS/бот, МБ':>14}{'PSS/бот, МБ':>14}")
+    for r in results:
+        per_bot = ''.join(
+            f"{r[key] / MB:>14.1f}" if r[key] is not None else f"{'-':>14}"
+            for key in ('rss_per_extra_bot_bytes', 'pss_per_extra_bot_bytes')
+        )
+        print(f"{r['mode']:<13}{r['bots']:>6}{r['rss_bytes'] / MB:>10.1f}{r['pss_bytes'] / MB:>10.1f}{per_bot}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
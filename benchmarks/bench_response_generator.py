@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк ResponseGenerator: прежняя реализация (random.choices +
+random.choice на каждый вызов) против таблицы псевдонимов и generate_batch.
+
+Дополнительно проверяет, что распределение категорий совпадает с весами.
+
+Пример:
+    python benchmarks/bench_response_generator.py --calls 1000000
+"""
+import argparse
+import random
+import sys
+import timeit
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.response_generator import ResponseGenerator  # noqa: E402
+
+
+def make_legacy(generator: ResponseGenerator):
+    """Воспроизводит прежний generate_random_response поверх тех же данных."""
+    category_weights = generator.category_weights
+    responses = generator.responses
+
+    def generate_random_response():
+        categories = list(category_weights.keys())
+        weights = list(category_weights.values())
+        selected_category = random.choices(categories, weights=weights)[0]
+        response_text = random.choice(responses[selected_category])
+        return response_text, selected_category
+
+    return generate_random_response
+
+
+def ns_per_call(func, calls: int, repeat: int) -> float:
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    return best / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=500000, help='Количество ответов в одном замере')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество замеров (берется лучший)')
+    args = parser.parse_args()
+
+    generator = ResponseGenerator(seed=42)
+    legacy = make_legacy(generator)
+    calls = args.calls
+
+    def run_legacy():
+        for _ in range(calls):
+            legacy()
+
+    def run_alias():
+        generate = generator.generate_random_response
+        for _ in range(calls):
+            generate()
+
+    def run_batch():
+        generator.generate_batch(calls)
+
+    results = [
+        ('прежняя реализация', ns_per_call(run_legacy, calls, args.repeat)),
+        ('таблица псевдонимов', ns_per_call(run_alias, calls, args.repeat)),
+        ('generate_batch', ns_per_call(run_batch, calls, args.repeat)),
+    ]
+    baseline = results[0][1]
+    print(f"{'вариант':<22}{'нс/ответ':>12}{'ускорение':>12}")
+    for name, ns in results:
+        print(f"{name:<22}{ns:>12.1f}{baseline / ns:>11.2f}x")
+
+    # Проверка распределения категорий
+    counts = Counter(category for _, category in generator.generate_batch(calls))
+    total_weight = sum(generator.category_weights.values())
+    print(f"\n{'категория':<12}{'ожидается':>12}{'получено':>12}")
+    for category, weight in generator.category_weights.items():
+        print(f"{category:<12}{weight / total_weight:>12.4f}{counts[category] / calls:>12.4f}")
+
+
+if __name__ == '__main__':
+    main()
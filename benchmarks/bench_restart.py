@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Окно без ответов при перезапуске бота.
+
+Бот в режиме polling получает непрерывный поток inline-запросов от
+имитации Bot API; через --before секунд процесс перезапускается, поток
+идет еще --after секунд. Сценарии:
+
+- stop-start - как docker compose при пересоздании контейнера: старый
+  процесс получает SIGTERM и завершается, после этого запускается новый;
+- handoff - HANDOFF_FILE: новый процесс запускается заранее и ждет
+  блокировку, старый по SIGTERM дожидается ответов и передает offset.
+
+Для запросов, отправленных после SIGTERM, измеряется:
+- окно - самый длинный промежуток без ответов бота;
+- задержка ответа (p99, max);
+- потерянные (ответа нет за --timeout) и повторные ответы (один запрос
+  обработан обоими процессами).
+
+Пример:
+    python benchmarks/bench_restart.py --rate 50 --before 3 --after 5
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_bot_api import (  # noqa: E402
+    FakeBotAPI,
+    make_inline_query_update,
+    start_bot_process,
+    stop_bot_process,
+    summarize_latencies,
+)
+
+SCENARIOS = ('stop-start', 'handoff')
+
+
+async def send_stream(api: FakeBotAPI, rate: float, duration: float, users: int, sent: list):
+    """Отправляет inline-запросы с постоянной частотой; в sent - (время, future)."""
+    interval = 1.0 / rate
+    started = time.perf_counter()
+    i = 0
+    while time.perf_counter() - started < duration:
+        i += 1
+        update = make_inline_query_update(i, 1000 + i % users, f'вопрос номер {i}')
+        sent.append((time.perf_counter(), api.expect_answer(update)))
+        api.push_update(update)
+        delay = started + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def wait_for(condition, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError('Не дождались запуска нового процесса')
+        await asyncio.sleep(0.01)
+
+
+async def run_scenario(name: str, rate: float, before: float, after: float, users: int, timeout: float) -> dict:
+    api = FakeBotAPI()
+    await api.start()
+    temp_dir = tempfile.TemporaryDirectory(prefix='bench-restart-')
+    env = {'METRICS_PORT': '0', 'RESPONSES_RELOAD_INTERVAL': '0'}
+    if name == 'handoff':
+        env['HANDOFF_FILE'] = str(Path(temp_dir.name) / 'handoff.json')
+
+    old = start_bot_process(api, env)
+    new = None
+    try:
+        await api.wait_polling_started()
+        sent = []
+        stream = asyncio.create_task(send_stream(api, rate, before + after, users, sent))
+        await asyncio.sleep(before)
+
+        if name == 'handoff':
+            new = start_bot_process(api, env)
+            # Новый процесс запущен и ждет блокировку, когда он вызвал getMe
+            await wait_for(lambda: api.calls.get('getMe', 0) >= 2, 60)
+            restart_at = time.perf_counter()
+            old.terminate()
+        else:
+            restart_at = time.perf_counter()
+            await asyncio.to_thread(stop_bot_process, old)
+            new = start_bot_process(api, env)
+        await stream
+
+        latencies = []
+        lost = 0
+        for sent_at, future in sent:
+            if sent_at < restart_at:
+                continue
+            remaining = max(sent_at + timeout - time.perf_counter(), 0.01)
+            try:
+                received_at = await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                lost += 1
+                continue
+            latencies.append(received_at - sent_at)
+
+        # Самый длинный промежуток без ответов, начиная с SIGTERM
+        answer_times = sorted(received_at for received_at, _, _ in api.answers if received_at >= restart_at)
+        points = [restart_at] + answer_times
+        window = max((b - a for a, b in zip(points, points[1:])), default=0.0)
+        duplicates = sum(count - 1 for count in Counter(key for _, key, _ in api.answers).values() if count > 1)
+
+        summary = summarize_latencies(latencies) if latencies else {}
+        summary.update({
+            'scenario': name,
+            'sent_after_restart': sum(1 for sent_at, _ in sent if sent_at >= restart_at),
+            'answered': len(latencies),
+            'lost': lost,
+            'duplicates': duplicates,
+            'window_ms': window * 1000,
+        })
+        return summary
+    finally:
+        await asyncio.to_thread(stop_bot_process, old)
+        if new:
+            await asyncio.to_thread(stop_bot_process, new)
+        await api.stop()
+        temp_dir.cleanup()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=50.0, help='Inline-запросов в секунду')
+    parser.add_argument('--before', type=float, default=3.0, help='Секунд потока до перезапуска')
+    parser.add_argument('--after', type=float, default=5.0, help='Секунд потока после перезапуска')
+    parser.add_argument('--users', type=int, default=200, help='Количество различных пользователей')
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help='Через сколько секунд запрос без ответа считается потерянным')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS), help='Сценарии')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    results = [await run_scenario(name, args.rate, args.before, args.after, args.users, args.timeout)
+               for name in args.scenarios]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'сценарий':<12}{'окно, мс':>10}{'p99, мс':>10}{'max, мс':>10}{'запросов':>10}"
+          f"{'потеряно':>10}{'повторов':>10}")
+    for r in results:
+        timings = f"{r['p99_ms']:>10.0f}{r['max_ms']:>10.0f}" if r['answered'] else f"{'-':>10}{'-':>10}"
+        print(f"{r['scenario']:<12}{r['window_ms']:>10.0f}{timings}{r['sent_after_restart']:>10}"
+              f"{r['lost']:>10}{r['duplicates']:>10}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Точность и стоимость вероятностных структур статистики на синтетических данных.
+
+- HyperLogLog (уникальные пользователи): оценка сравнивается с точным числом
+  различных id для нескольких размеров аудитории и нескольких seed.
+  Ожидаемая стандартная ошибка - 1.04 / sqrt(2^p), для p=12 около 1.6%.
+- Space-Saving (частые вопросы): поток вопросов с распределением Ципфа;
+  top-k сравнивается с точным подсчетом Counter. Проверяются гарантии
+  алгоритма: оценка не меньше точного значения и завышена не больше, чем на
+  погрешность; погрешность не больше N / capacity.
+
+Скрипт завершается с кодом 1, если гарантия нарушена или ошибка HyperLogLog
+выходит за 4 стандартные ошибки.
+
+Пример:
+    python benchmarks/bench_sketches.py --users 100 1000 10000 100000 --queries 200000
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.sketches import HLL_PRECISION, TOP_QUERIES_CAPACITY, HyperLogLog, SpaceSaving  # noqa: E402
+
+
+def check_hyperloglog(sizes, seeds: int, precision: int) -> dict:
+    """Относительная ошибка оценки числа уникальных id."""
+    std_error = 1.04 / math.sqrt(1 << precision)
+    rows = []
+    for size in sizes:
+        errors = []
+        elapsed = 0.0
+        for seed in range(seeds):
+            rng = random.Random(seed)
+            # Id Telegram - большие неслучайные числа; каждый пользователь пишет несколько раз
+            users = rng.sample(range(10 ** 6, 10 ** 10), size)
+            stream = users * 3
+            rng.shuffle(stream)
+
+            hll = HyperLogLog(precision)
+            started = time.perf_counter()
+            for user_id in stream:
+                hll.add(user_id)
+            elapsed += time.perf_counter() - started
+            errors.append(hll.estimate() / size - 1)
+
+        rows.append({
+            'users': size,
+            'mean_abs_error': sum(abs(e) for e in errors) / len(errors),
+            'max_abs_error': max(abs(e) for e in errors),
+            'add_ns': elapsed / (seeds * size * 3) * 1e9,
+        })
+    return {'precision': precision, 'std_error': std_error, 'memory_bytes': 1 << precision, 'rows': rows}
+
+
+def check_space_saving(queries: int, distinct: int, capacity: int, k: int, exponent: float, seed: int) -> dict:
+    """Совпадение top-k со точным подсчетом на потоке с распределением Ципфа."""
+    rng = random.Random(seed)
+    weights = [1 / rank ** exponent for rank in range(1, distinct + 1)]
+    stream = [f'вопрос {i}' for i in rng.choices(range(distinct), weights, k=queries)]
+
+    exact = Counter()
+    sketch = SpaceSaving(capacity)
+    started = time.perf_counter()
+    for key in stream:
+        sketch.add(key)
+    elapsed = time.perf_counter() - started
+    exact.update(stream)
+
+    violations = 0
+    max_error = 0
+    for key, count in sketch._counts.items():
+        error = sketch._errors[key]
+        max_error = max(max_error, error)
+        if not count - error <= exact[key] <= count:
+            violations += 1
+    if max_error > queries / capacity:
+        violations += 1
+    # Ключи чаще N / capacity обязаны быть в таблице
+    for key, count in exact.items():
+        if count > queries / capacity and key not in sketch._counts:
+            violations += 1
+
+    exact_top = [key for key, _ in exact.most_common(k)]
+    sketch_top = [key for key, _, _ in sketch.top(k)]
+    recall = len(set(exact_top) & set(sketch_top)) / k
+    top_errors = [abs(count - exact[key]) / exact[key] for key, count, _ in sketch.top(k)]
+
+    return {
+        'queries': queries,
+        'distinct': distinct,
+        'capacity': capacity,
+        'zipf_exponent': exponent,
+        'top_k': k,
+        'recall': recall,
+        'max_top_count_error': max(top_errors),
+        'max_error_bound': queries / capacity,
+        'max_error': max_error,
+        'violations': violations,
+        'add_ns': elapsed / queries * 1e9,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                        help='Размеры аудитории для HyperLogLog')
+    parser.add_argument('--seeds', type=int, default=5, help='Повторов на размер аудитории')
+    parser.add_argument('--precision', type=int, default=HLL_PRECISION, help='Точность HyperLogLog')
+    parser.add_argument('--queries', type=int, default=200000, help='Длина потока вопросов')
+    parser.add_argument('--distinct', type=int, default=50000, help='Различных вопросов в потоке')
+    parser.add_argument('--capacity', type=int, default=TOP_QUERIES_CAPACITY, help='Емкость Space-Saving')
+    parser.add_argument('--top', type=int, default=10, help='Размер сравниваемого top-k')
+    parser.add_argument('--zipf', type=float, nargs='+', default=[0.8, 1.0, 1.2], help='Показатели Ципфа')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    hll = check_hyperloglog(args.users, args.seeds, args.precision)
+    space_saving = [
+        check_space_saving(args.queries, args.distinct, args.capacity, args.top, exponent, seed=1)
+        for exponent in args.zipf
+    ]
+
+    failed = any(row['max_abs_error'] > 4 * hll['std_error'] for row in hll['rows'])
+    failed = failed or any(result['violations'] for result in space_saving)
+
+    if args.json:
+        print(json.dumps({'hyperloglog': hll, 'space_saving': space_saving}, indent=2, ensure_ascii=False))
+    else:
+        print(f"HyperLogLog p={hll['precision']}: {hll['memory_bytes']} байт, "
+              f"стандартная ошибка {hll['std_error']:.2%}")
+        print(f"{'пользователей':>14}{'ср. ошибка':>12}{'макс. ошибка':>14}{'нс/add':>10}")
+        for row in hll['rows']:
+            print(f"{row['users']:>14}{row['mean_abs_error']:>12.2%}{row['max_abs_error']:>14.2%}{row['add_ns']:>10.0f}")
+
+        print(f"\nSpace-Saving capacity={args.capacity}, поток {args.queries}, различных {args.distinct}")
+        print(f"{'Ципф':>6}{'recall top-' + str(args.top):>14}{'ошибка top':>12}{'макс. погр.':>13}"
+              f"{'граница N/k':>13}{'нарушений':>11}{'нс/add':>10}")
+        for r in space_saving:
+            print(f"{r['zipf_exponent']:>6.1f}{r['recall']:>14.0%}{r['max_top_count_error']:>12.2%}"
+                  f"{r['max_error']:>13}{r['max_error_bound']:>13.0f}{r['violations']:>11}{r['add_ns']:>10.0f}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
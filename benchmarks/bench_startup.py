@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Время холодного старта бота до первого отвеченного обновления.
+
+Перед запуском процесса в очередь getUpdates имитации Bot API кладется
+inline-запрос, как после перезапуска контейнера. От запуска процесса
+измеряется время до:
+
+- getMe - импорт модулей, создание IsItTrueBot и Application;
+- getUpdates - первый запрос обновлений после инициализации;
+- answerInlineQuery - ответ на ожидавшее обновление.
+
+Сценарии:
+- warm - байткод модулей бота уже есть в __pycache__ (образ собран с
+  compileall);
+- cold-src - исходники бота без байткода и без записи __pycache__
+  (образ без compileall: байткод src/ и config/ собирается при каждом
+  пересоздании контейнера). Пакеты из site-packages в обоих сценариях
+  уже скомпилированы pip при установке.
+
+С --importtime дополнительно выводятся самые дорогие импорты src.bot
+(python -X importtime).
+
+Пример:
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_bot_api import (  # noqa: E402
+    FAKE_TOKEN,
+    PROJECT_ROOT,
+    FakeBotAPI,
+    make_inline_query_update,
+    start_bot_process,
+    stop_bot_process,
+)
+
+SCENARIOS = ('warm', 'cold-src')
+PHASES = ('getMe', 'getUpdates', 'answerInlineQuery')
+
+
+def _copy_sources(target: Path):
+    """Копирует дерево бота без байткода."""
+    ignore = shutil.ignore_patterns('__pycache__', '*.pyc')
+    for name in ('src', 'config'):
+        shutil.copytree(PROJECT_ROOT / name, target / name, ignore=ignore)
+
+
+async def run_once(bot_dir: Path, env: dict, timeout: float) -> dict:
+    api = FakeBotAPI()
+    await api.start()
+    update = make_inline_query_update(1, 1000, 'вода мокрая')
+    answered = api.expect_answer(update)
+    api.push_update(update)
+
+    started = time.perf_counter()
+    process = start_bot_process(api, {'METRICS_PORT': '0', 'RESPONSES_RELOAD_INTERVAL': '0', **env}, bot_dir)
+    try:
+        await asyncio.wait_for(answered, timeout)
+        return {method: (api.first_calls[method] - started) * 1000 for method in PHASES}
+    finally:
+        stop_bot_process(process)
+        await api.stop()
+
+
+async def run_scenario(name: str, runs: int, timeout: float) -> dict:
+    env = {}
+    bot_dir = PROJECT_ROOT
+    temp_dir = None
+    if name == 'cold-src':
+        temp_dir = tempfile.TemporaryDirectory(prefix='bench-startup-')
+        bot_dir = Path(temp_dir.name)
+        _copy_sources(bot_dir)
+        env['PYTHONDONTWRITEBYTECODE'] = '1'
+    else:
+        # Прогрев: байткод и файловый кеш ОС
+        await run_once(bot_dir, env, timeout)
+
+    try:
+        samples = [await run_once(bot_dir, env, timeout) for _ in range(runs)]
+    finally:
+        if temp_dir:
+            temp_dir.cleanup()
+
+    return {
+        'scenario': name,
+        'runs': runs,
+        'median_ms': {phase: statistics.median(s[phase] for s in samples) for phase in PHASES},
+        'max_ms': {phase: max(s[phase] for s in samples) for phase in PHASES},
+    }
+
+
+def top_imports(limit: int) -> list:
+    """Самые дорогие по суммарному времени импорты при загрузке src.bot."""
+    env = dict(os.environ, BOT_TOKEN=FAKE_TOKEN, PYTHONPATH=str(PROJECT_ROOT))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.bot'],
+                            cwd=str(PROJECT_ROOT), env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(cumulative_us) / 1000, int(self_us) / 1000))
+    total = next((row for row in rows if row[0] == 'src.bot'), None)
+    top = sorted((row for row in rows if row[0] != 'src.bot'), key=lambda row: row[1], reverse=True)
+    # Вложенные пакеты учтены в суммарном времени родителя - показываем только верхний уровень
+    shown = []
+    for name, cumulative, self_ms in top:
+        if any(name.startswith(parent + '.') for parent, _, _ in shown):
+            continue
+        shown.append((name, cumulative, self_ms))
+        if len(shown) == limit:
+            break
+    return [total] + shown if total else shown
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Запусков на сценарий')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS), help='Сценарии')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Сколько ждать первого ответа, сек')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='Показать N самых дорогих импортов src.bot')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    results = [await run_scenario(name, args.runs, args.timeout) for name in args.scenarios]
+    imports = top_imports(args.importtime) if args.importtime else []
+
+    if args.json:
+        print(json.dumps({'scenarios': results, 'imports': imports}, indent=2))
+        return
+
+    print(f"Медиана по {args.runs} запускам, мс от запуска процесса:")
+    print(f"{'сценарий':<10}{'getMe':>10}{'getUpdates':>12}{'ответ':>10}{'ответ max':>12}")
+    for r in results:
+        median = r['median_ms']
+        print(f"{r['scenario']:<10}{median['getMe']:>10.0f}{median['getUpdates']:>12.0f}"
+              f"{median['answerInlineQuery']:>10.0f}{r['max_ms']['answerInlineQuery']:>12.0f}")
+
+    if imports:
+        print(f"\n{'модуль':<40}{'всего, мс':>12}{'сам, мс':>10}")
+        for name, cumulative, self_ms in imports:
+            print(f"{name:<40}{cumulative:>12.1f}{self_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
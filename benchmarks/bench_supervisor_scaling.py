@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Масштабирование пропускной способности по числу процессов-воркеров.
+
+Бот запускается в режиме webhook с BOT_WORKERS=1, 2, 4, ... против локальной
+имитации Bot API. Обновления от множества пользователей отправляются на
+webhook так быстро, как бот их принимает (не более max_connections
+одновременных запросов, как у Telegram), и измеряется, сколько inline-ответов
+в секунду бот успевает отправить.
+
+Имитация Bot API и генератор нагрузки работают в этом процессе и тоже
+занимают ядро, поэтому для честного замера нужно ядер не меньше, чем
+максимальное число воркеров + 1.
+
+Пример:
+    python benchmarks/bench_supervisor_scaling.py --workers 1 2 4 --requests 4000
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_bot_api import (  # noqa: E402
+    FakeBotAPI,
+    WebhookClient,
+    make_inline_query_update,
+    start_bot_process,
+    stop_bot_process,
+)
+
+WEBHOOK_SECRET = 'bench-secret'
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_port(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def _send(client: WebhookClient, api: FakeBotAPI, updates):
+    futures = [api.expect_answer(update) for update in updates]
+    statuses = await asyncio.gather(*(client.post(update) for update in updates))
+    rejected = sum(status != 200 for status in statuses)
+    await asyncio.wait_for(asyncio.gather(*futures), 120)
+    return rejected
+
+
+async def run_workers(workers: int, requests: int, users: int, warmup: int) -> dict:
+    api = FakeBotAPI()
+    await api.start()
+
+    port = _free_port()
+    process = start_bot_process(api, {
+        'BOT_RUN_MODE': 'webhook',
+        'BOT_WORKERS': str(workers),
+        'WEBHOOK_LISTEN': '127.0.0.1',
+        'WEBHOOK_PORT': str(port),
+        'WEBHOOK_URL': f'http://127.0.0.1:{port}',
+        'WEBHOOK_PATH': 'bench-hook',
+        'WEBHOOK_SECRET_TOKEN': WEBHOOK_SECRET,
+        'METRICS_PORT': '0',
+    })
+    client = None
+    try:
+        await api.wait_webhook_set(timeout=120)
+        await _wait_port(port)
+        client = WebhookClient(api.webhook_url, api.webhook_secret, api.webhook_max_connections)
+
+        # Прогрев: соединения, импорт лениво загружаемых модулей в воркерах
+        await _send(client, api, [
+            make_inline_query_update(i + 1, 1000 + i % users, f'прогрев {i}') for i in range(warmup)
+        ])
+
+        updates = [
+            make_inline_query_update(warmup + i + 1, 1000 + i % users, f'вопрос номер {i}')
+            for i in range(requests)
+        ]
+        started = time.perf_counter()
+        rejected = await _send(client, api, updates)
+        elapsed = time.perf_counter() - started
+
+        return {
+            'workers': workers,
+            'requests': requests,
+            'rejected': rejected,
+            'elapsed_s': elapsed,
+            'throughput_rps': requests / elapsed,
+        }
+    finally:
+        if client:
+            await client.close()
+        stop_bot_process(process, timeout=30)
+        await api.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Варианты BOT_WORKERS')
+    parser.add_argument('--requests', type=int, default=3000, help='Количество inline-запросов на вариант')
+    parser.add_argument('--users', type=int, default=500, help='Количество различных пользователей')
+    parser.add_argument('--warmup', type=int, default=200, help='Запросов на прогрев')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    if cores is not None and cores < max(args.workers) + 1:
+        print(f"Внимание: доступно ядер: {cores}, масштабирование будет ограничено", file=sys.stderr)
+
+    results = []
+    for workers in args.workers:
+        results.append(await run_workers(workers, args.requests, args.users, args.warmup))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]['throughput_rps'] / results[0]['workers']
+    print(f"{'воркеров':<10}{'rps':>10}{'ускорение':>12}{'эффективность':>16}{'отклонено':>12}")
+    for r in results:
+        speedup = r['throughput_rps'] / results[0]['throughput_rps']
+        efficiency = r['throughput_rps'] / (baseline * r['workers'])
+        print(f"{r['workers']:<10}{r['throughput_rps']:>10.1f}{speedup:>11.2f}x{efficiency:>15.0%}{r['rejected']:>12}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+"Шторм" inline-запросов при наборе текста: сколько вызовов answerInlineQuery
+делает бот со схлопыванием запросов и без него.
+
+Каждый пользователь печатает вопрос посимвольно с заданной скоростью,
+Telegram (имитация) присылает inline-запрос на каждый символ.
+
+Пример:
+    python benchmarks/bench_typing_storm.py --users 20 --cps 8 --window-ms 300
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_bot_api import (  # noqa: E402
+    FakeBotAPI,
+    make_inline_query_update,
+    start_bot_process,
+    stop_bot_process,
+)
+
+QUESTION = 'правда что вода мокрая?'
+
+
+async def run_case(coalescing: bool, users: int, cps: float, window_ms: int, answer_delay: float) -> dict:
+    api = FakeBotAPI(answer_delay=answer_delay)
+    await api.start()
+    env = {
+        'MAX_CONCURRENT_UPDATES': '64',
+        'INLINE_COALESCING': 'true' if coalescing else 'false',
+        'INLINE_QUIET_WINDOW_MS': str(window_ms),
+    }
+    process = start_bot_process(api, env)
+    update_ids = iter(range(1, 10 ** 9))
+    try:
+        await api.wait_polling_started()
+
+        async def type_question(user_id: int):
+            last = None
+            for length in range(1, len(QUESTION) + 1):
+                last = make_inline_query_update(next(update_ids), user_id, QUESTION[:length])
+                api.push_update(last)
+                await asyncio.sleep(1 / cps)
+            return last
+
+        started = time.perf_counter()
+        finals = await asyncio.gather(*(type_question(1000 + i) for i in range(users)))
+        # Даем боту ответить на последние запросы
+        await asyncio.sleep(window_ms / 1000 + 1.0)
+        elapsed = time.perf_counter() - started
+
+        answered_final = {key for _, key, _ in api.answers}
+        final_answered = sum(1 for u in finals if f"iq:{u['inline_query']['id']}" in answered_final)
+        return {
+            'coalescing': coalescing,
+            'inline_queries': users * len(QUESTION),
+            'answers': api.calls.get('answerInlineQuery', 0),
+            'final_answered': final_answered,
+            'users': users,
+            'elapsed_s': elapsed,
+        }
+    finally:
+        stop_bot_process(process)
+        await api.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20, help='Количество одновременно печатающих пользователей')
+    parser.add_argument('--cps', type=float, default=8.0, help='Скорость набора, символов в секунду')
+    parser.add_argument('--window-ms', type=int, default=300, help='Окно тишины INLINE_QUIET_WINDOW_MS')
+    parser.add_argument('--answer-delay', type=float, default=0.02, help='Имитация RTT ответа Bot API, сек')
+    args = parser.parse_args()
+
+    print(f"{'схлопывание':<14}{'запросов':>10}{'ответов':>10}{'финальных':>12}")
+    for coalescing in (False, True):
+        r = await run_case(coalescing, args.users, args.cps, args.window_ms, args.answer_delay)
+        print(f"{'вкл' if coalescing else 'выкл':<14}{r['inline_queries']:>10}{r['answers']:>10}"
+              f"{r['final_answered']:>9}/{r['users']}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
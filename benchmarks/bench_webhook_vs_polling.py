@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Сравнение задержки ответа на inline-запрос в режимах polling и webhook.
+
+Бот запускается отдельным процессом против локальной имитации Bot API.
+Для каждого режима отправляется поток inline-запросов с заданной частотой
+и измеряется время от отправки обновления до получения answerInlineQuery.
+
+Пример:
+    python benchmarks/bench_webhook_vs_polling.py --requests 500 --rate 200
+"""
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fake_bot_api import (  # noqa: E402
+    FakeBotAPI,
+    WebhookClient,
+    make_inline_query_update,
+    start_bot_process,
+    stop_bot_process,
+    summarize_latencies,
+)
+
+WEBHOOK_SECRET = 'bench-secret'
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def run_mode(mode: str, requests: int, rate: float, users: int, answer_delay: float) -> dict:
+    api = FakeBotAPI(answer_delay=answer_delay)
+    await api.start()
+
+    env = {'BOT_RUN_MODE': mode}
+    client = None
+    if mode == 'webhook':
+        port = _free_port()
+        env.update({
+            'WEBHOOK_LISTEN': '127.0.0.1',
+            'WEBHOOK_PORT': str(port),
+            'WEBHOOK_URL': f'http://127.0.0.1:{port}',
+            'WEBHOOK_PATH': 'bench-hook',
+            'WEBHOOK_SECRET_TOKEN': WEBHOOK_SECRET,
+        })
+
+    process = start_bot_process(api, env)
+    try:
+        if mode == 'webhook':
+            await api.wait_webhook_set()
+            await _wait_port(port)
+            client = WebhookClient(api.webhook_url, api.webhook_secret, api.webhook_max_connections)
+        else:
+            await api.wait_polling_started()
+
+        interval = 1.0 / rate
+        futures = []
+        deliveries = []
+        started = time.perf_counter()
+        for i in range(requests):
+            update = make_inline_query_update(i + 1, 1000 + i % users, f'вопрос номер {i}')
+            future = api.expect_answer(update)
+            sent_at = time.perf_counter()
+            if client:
+                deliveries.append(asyncio.ensure_future(client.post(update)))
+            else:
+                api.push_update(update)
+            futures.append((sent_at, future))
+
+            next_at = started + (i + 1) * interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        latencies = []
+        for sent_at, future in futures:
+            received_at = await asyncio.wait_for(future, 30)
+            latencies.append(received_at - sent_at)
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*deliveries)
+
+        summary = summarize_latencies(latencies)
+        summary['mode'] = mode
+        summary['throughput_rps'] = requests / elapsed
+        return summary
+    finally:
+        if client:
+            await client.close()
+        stop_bot_process(process)
+        await api.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300, help='Количество inline-запросов на режим')
+    parser.add_argument('--rate', type=float, default=100.0, help='Запросов в секунду')
+    parser.add_argument('--users', type=int, default=50, help='Количество различных пользователей')
+    parser.add_argument('--answer-delay', type=float, default=0.0, help='Имитация RTT ответа Bot API, сек')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    results = []
+    for mode in ('polling', 'webhook'):
+        results.append(await run_mode(mode, args.requests, args.rate, args.users, args.answer_delay))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'режим':<10}{'p50, мс':>10}{'p90, мс':>10}{'p99, мс':>10}{'max, мс':>10}{'rps':>10}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['max_ms']:>10.2f}{r['throughput_rps']:>10.1f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
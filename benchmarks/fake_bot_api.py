@@ -0,0 +1,548 @@
+"""
+Локальная имитация Telegram Bot API для бенчмарков и нагрузочных тестов.
+
+Поднимает HTTP-сервер на asyncio (без внешних зависимостей), который
+отвечает на методы Bot API, используемые ботом, и умеет доставлять
+обновления двумя способами:
+- через очередь getUpdates (long polling);
+- POST-запросами на зарегистрированный webhook.
+
+Все ответы бота (answerInlineQuery, sendMessage) записываются с отметкой
+времени, чтобы можно было измерить задержку от отправки обновления до ответа.
+Сеть наружу не используется.
+"""
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from telegram.request import BaseRequest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+FAKE_TOKEN = '123456:FAKE-TOKEN-FOR-LOCAL-BENCHMARKS'
+
+BOT_USER = {
+    'id': 123456,
+    'is_bot': True,
+    'first_name': 'IsItTrueBot',
+    'username': 'IsItTrueBenchBot',
+    'can_join_groups': False,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': True,
+}
+
+
+def make_bot_token(index: int) -> str:
+    """Токен index-го дополнительного бота (0 - FAKE_TOKEN)."""
+    return FAKE_TOKEN if index == 0 else f'{BOT_USER["id"] + index}:FAKE-TOKEN-FOR-LOCAL-BENCHMARKS'
+
+
+def bot_user(token: str) -> Dict[str, Any]:
+    """Ответ getMe для токена: id бота - первая часть токена."""
+    if token == FAKE_TOKEN:
+        return BOT_USER
+    bot_id = int(token.split(':', 1)[0])
+    return dict(BOT_USER, id=bot_id, username=f'IsItTrueBench{bot_id}Bot')
+
+
+# ---------------------------------------------------------------------------
+# Минимальный HTTP/1.1 (keep-alive) для сервера и клиента
+# ---------------------------------------------------------------------------
+
+async def read_http_message(reader: asyncio.StreamReader) -> Optional[Tuple[str, Dict[str, str], bytes]]:
+    """
+    Читает одно HTTP-сообщение (запрос или ответ).
+
+    Returns:
+        (стартовая строка, заголовки в нижнем регистре, тело) или None, если соединение закрыто
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', '0'))
+    body = await reader.readexactly(length) if length else b''
+    return lines[0], headers, body
+
+
+def build_http_response(status: int, payload: bytes, content_type: str = 'application/json') -> bytes:
+    """Собирает HTTP-ответ с keep-alive."""
+    reason = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found'}.get(status, 'OK')
+    return (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        "Connection: keep-alive\r\n\r\n"
+    ).encode('latin-1') + payload
+
+
+def _decode_form(body: bytes, content_type: str) -> Dict[str, Any]:
+    """Разбирает параметры метода: form-urlencoded (значения - JSON) или JSON."""
+    if not body:
+        return {}
+    if content_type.startswith('application/json'):
+        return json.loads(body)
+
+    params = {}
+    for name, values in parse_qs(body.decode('utf-8'), keep_blank_values=True).items():
+        value = values[-1]
+        try:
+            params[name] = json.loads(value)
+        except ValueError:
+            params[name] = value
+    return params
+
+
+# ---------------------------------------------------------------------------
+# Фабрики обновлений
+# ---------------------------------------------------------------------------
+
+_inline_query_ids = itertools.count(1)
+
+
+def make_user(user_id: int, language_code: str = 'ru') -> Dict[str, Any]:
+    return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'language_code': language_code}
+
+
+def make_inline_query_update(update_id: int, user_id: int, query: str, language_code: str = 'ru') -> Dict[str, Any]:
+    """Создает update с inline-запросом."""
+    return {
+        'update_id': update_id,
+        'inline_query': {
+            'id': f'iq{next(_inline_query_ids)}',
+            'from': make_user(user_id, language_code),
+            'query': query,
+            'offset': '',
+        },
+    }
+
+
+def make_command_update(update_id: int, user_id: int, command: str) -> Dict[str, Any]:
+    """Создает update с командой в личном чате, например command='start'."""
+    return make_message_update(update_id, user_id, f'/{command}')
+
+
+def make_message_update(update_id: int, user_id: int, text: str, chat_type: str = 'private',
+                        language_code: str = 'ru') -> Dict[str, Any]:
+    """Создает update с сообщением; у группы id чата - отрицательный id пользователя."""
+    if chat_type == 'private':
+        chat = {'id': user_id, 'type': 'private', 'first_name': f'User{user_id}'}
+    else:
+        chat = {'id': -user_id, 'type': chat_type, 'title': f'Group{user_id}'}
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': chat,
+        'from': make_user(user_id, language_code),
+        'text': text,
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split(' ', 1)[0])}]
+    return {'update_id': update_id, 'message': message}
+
+
+def update_key(update: Dict[str, Any]) -> Optional[str]:
+    """Ключ, по которому ответ бота сопоставляется с исходным обновлением."""
+    if 'inline_query' in update:
+        return f"iq:{update['inline_query']['id']}"
+    if 'message' in update:
+        return f"msg:{update['message']['chat']['id']}"
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Имитация Bot API
+# ---------------------------------------------------------------------------
+
+class FakeBotAPI:
+    """
+    Имитация Telegram Bot API.
+
+    Args:
+        host: Адрес, на котором слушает сервер
+        port: Порт (0 - выбрать свободный)
+        answer_delay: Искусственная задержка ответа на методы отправки (имитация RTT до Telegram)
+        connect_delay: Задержка перед первым ответом в новом соединении
+            (имитация TCP- и TLS-рукопожатия с Telegram)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, answer_delay: float = 0.0,
+                 connect_delay: float = 0.0):
+        self.host = host
+        self.port = port
+        self.answer_delay = answer_delay
+        self.connect_delay = connect_delay
+        # Сколько соединений открыли клиенты (бот) за время работы
+        self.connections_opened = 0
+        # Время первого вызова каждого метода (time.perf_counter)
+        self.first_calls: Dict[str, float] = {}
+
+        self.calls: Dict[str, int] = {}
+        self.answers: List[Tuple[float, str, Dict[str, Any]]] = []
+        self.webhook_url: Optional[str] = None
+        self.webhook_secret: Optional[str] = None
+        self.webhook_max_connections = 40
+
+        # Очереди getUpdates по токенам: несколько ботов могут работать с
+        # одной имитацией, как с api.telegram.org
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._pending_changed: Dict[str, asyncio.Event] = {}
+        # Токены ботов, уже запросивших getUpdates
+        self.polling_tokens = set()
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._message_ids = itertools.count(1)
+        self._started_polling: Optional[asyncio.Event] = None
+        self._webhook_set: Optional[asyncio.Event] = None
+        self._connections = set()
+
+    @property
+    def base_url(self) -> str:
+        """Значение для BOT_API_BASE_URL."""
+        return f'http://{self.host}:{self.port}/bot'
+
+    async def start(self):
+        self._started_polling = asyncio.Event()
+        self._webhook_set = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def wait_polling_started(self, timeout: float = 30.0):
+        await asyncio.wait_for(self._started_polling.wait(), timeout)
+
+    async def wait_webhook_set(self, timeout: float = 30.0):
+        await asyncio.wait_for(self._webhook_set.wait(), timeout)
+
+    # --- доставка обновлений -------------------------------------------------
+
+    def expect_answer(self, update: Dict[str, Any]) -> asyncio.Future:
+        """Возвращает future, который завершится временем получения ответа на update."""
+        future = asyncio.get_running_loop().create_future()
+        key = update_key(update)
+        if key is not None:
+            self._waiters[key] = future
+        return future
+
+    async def wait_bots_polling(self, tokens, timeout: float = 30.0):
+        """Ждет, пока getUpdates запросят все боты с указанными токенами."""
+        async def wait():
+            while not set(tokens) <= self.polling_tokens:
+                await asyncio.sleep(0.05)
+        await asyncio.wait_for(wait(), timeout)
+
+    def push_update(self, update: Dict[str, Any], token: str = FAKE_TOKEN):
+        """Кладет обновление в очередь getUpdates бота с токеном token."""
+        self._pending.setdefault(token, []).append(update)
+        self._pending_event(token).set()
+
+    def _pending_event(self, token: str) -> asyncio.Event:
+        event = self._pending_changed.get(token)
+        if event is None:
+            event = self._pending_changed[token] = asyncio.Event()
+        return event
+
+    # --- HTTP ----------------------------------------------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(asyncio.current_task())
+        self.connections_opened += 1
+        try:
+            if self.connect_delay:
+                await asyncio.sleep(self.connect_delay)
+            while True:
+                message = await read_http_message(reader)
+                if message is None:
+                    break
+                start_line, headers, body = message
+                target = start_line.split(' ')[1]
+                status, result = await self._dispatch(target, headers, body)
+                writer.write(build_http_response(status, json.dumps(result).encode('utf-8')))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _dispatch(self, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        path = urlsplit(target).path
+        # /bot<токен>/<метод>
+        token_part, method = path.rsplit('/', 2)[-2:]
+        token = token_part[len('bot'):]
+        params = _decode_form(body, headers.get('content-type', ''))
+        self.calls[method] = self.calls.get(method, 0) + 1
+        self.first_calls.setdefault(method, time.perf_counter())
+
+        handler = getattr(self, f'_api_{method}', None)
+        if handler is None:
+            return 404, {'ok': False, 'error_code': 404, 'description': f'Not Found: {method}'}
+        return 200, {'ok': True, 'result': await handler(token, params)}
+
+    async def _record_answer(self, key: str, params: Dict[str, Any]):
+        if self.answer_delay:
+            await asyncio.sleep(self.answer_delay)
+        received_at = time.perf_counter()
+        self.answers.append((received_at, key, params))
+        waiter = self._waiters.pop(key, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(received_at)
+
+    async def _api_getMe(self, token, params):
+        return bot_user(token)
+
+    async def _api_deleteWebhook(self, token, params):
+        self.webhook_url = None
+        return True
+
+    async def _api_setWebhook(self, token, params):
+        self.webhook_url = params.get('url')
+        self.webhook_secret = params.get('secret_token')
+        self.webhook_max_connections = int(params.get('max_connections') or 40)
+        self._webhook_set.set()
+        return True
+
+    async def _api_getWebhookInfo(self, token, params):
+        return {'url': self.webhook_url or '', 'has_custom_certificate': False, 'pending_update_count': len(self._pending.get(token, ()))}
+
+    async def _api_getUpdates(self, token, params):
+        offset = int(params.get('offset') or 0)
+        timeout = float(params.get('timeout') or 0)
+        limit = int(params.get('limit') or 100)
+
+        pending = self._pending.setdefault(token, [])
+        if offset:
+            # Подтверждаем обновления с update_id < offset
+            pending[:] = [u for u in pending if u['update_id'] >= offset]
+        self.polling_tokens.add(token)
+        self._started_polling.set()
+
+        if not pending and timeout > 0:
+            changed = self._pending_event(token)
+            changed.clear()
+            try:
+                await asyncio.wait_for(changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return pending[:limit]
+
+    async def _api_answerInlineQuery(self, token, params):
+        await self._record_answer(f"iq:{params.get('inline_query_id')}", params)
+        return True
+
+    async def _api_sendMessage(self, token, params):
+        chat_id = int(params['chat_id'])
+        await self._record_answer(f'msg:{chat_id}', params)
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': params.get('text', ''),
+        }
+
+    async def _api_close(self, token, params):
+        return True
+
+    async def _api_logOut(self, token, params):
+        return True
+
+
+class WebhookClient:
+    """
+    Клиент, доставляющий обновления на webhook бота так же, как Telegram:
+    POST с JSON и заголовком секрета, не более max_connections соединений.
+    """
+
+    def __init__(self, url: str, secret_token: Optional[str] = None, max_connections: int = 40):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or '/'
+        self.secret_token = secret_token
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def post(self, update: Dict[str, Any]) -> int:
+        """Отправляет обновление и возвращает HTTP-статус ответа бота."""
+        body = json.dumps(update).encode('utf-8')
+        head = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+        )
+        if self.secret_token:
+            head += f"X-Telegram-Bot-Api-Secret-Token: {self.secret_token}\r\n"
+        request = (head + "\r\n").encode('latin-1') + body
+
+        async with self._slots:
+            reader, writer = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+            writer.write(request)
+            await writer.drain()
+            message = await read_http_message(reader)
+            if message is None:
+                writer.close()
+                return 0
+            self._idle.append((reader, writer))
+            return int(message[0].split(' ')[1])
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class FakeRequest(BaseRequest):
+    """
+    Транспорт Bot API внутри процесса: без сети и HTTP.
+
+    Сериализует параметры запроса так же, как настоящий транспорт
+    (request_data.json_parameters), поэтому подходит для замеров CPU на ответ.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if request_data is not None:
+            request_data.json_parameters  # noqa: B018 - стоимость сериализации
+        result = BOT_USER if endpoint == 'getMe' else True
+        return 200, json.dumps({'ok': True, 'result': result}).encode('utf-8')
+
+
+# ---------------------------------------------------------------------------
+# Запуск бота в отдельном процессе
+# ---------------------------------------------------------------------------
+
+def start_bot_process(api: FakeBotAPI, extra_env: Optional[Dict[str, str]] = None,
+                      bot_dir: Path = PROJECT_ROOT) -> subprocess.Popen:
+    """
+    Запускает `python src/bot.py`, направленный на имитацию Bot API.
+
+    Args:
+        api: Запущенный FakeBotAPI
+        extra_env: Дополнительные переменные окружения (режим, порты и т.д.)
+        bot_dir: Корень дерева исходников бота (позволяет сравнивать разные сборки)
+    """
+    env = dict(os.environ)
+    env.update({
+        'BOT_TOKEN': FAKE_TOKEN,
+        'BOT_USERNAME': BOT_USER['username'],
+        'BOT_API_BASE_URL': api.base_url,
+        'LOG_LEVEL': 'WARNING',
+        'PYTHONPATH': str(bot_dir),
+    })
+    env.update(extra_env or {})
+    return subprocess.Popen([sys.executable, str(bot_dir / 'src' / 'bot.py')], cwd=str(bot_dir), env=env)
+
+
+def stop_bot_process(process: subprocess.Popen, timeout: float = 15.0):
+    """Останавливает бота через SIGTERM и ждет завершения."""
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+# ---------------------------------------------------------------------------
+# Ресурсы процесса бота (Linux, /proc)
+# ---------------------------------------------------------------------------
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _process_tree(pid: int) -> List[int]:
+    """pid и все его потомки (воркеры супервизора)."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Имя процесса в скобках может содержать пробелы
+        ppid = int(stat[stat.rindex(b')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree = [pid]
+    for current in tree:
+        tree.extend(children.get(current, ()))
+    return tree
+
+
+def process_usage(pid: int) -> Dict[str, float]:
+    """
+    Процессорное время и резидентная память процесса вместе с потомками.
+
+    Returns:
+        Dict[str, float]: cpu_seconds (user + system) и rss_bytes; нули, если /proc недоступен
+    """
+    cpu_ticks = 0
+    rss_pages = 0
+    for member in _process_tree(pid) if os.path.isdir('/proc') else ():
+        try:
+            with open(f'/proc/{member}/stat', 'rb') as f:
+                fields = f.read().rsplit(b')', 1)[1].split()
+        except OSError:
+            continue
+        # После имени: state(0) ... utime(11) stime(12) ... rss(21)
+        cpu_ticks += int(fields[11]) + int(fields[12])
+        rss_pages += int(fields[21])
+    return {'cpu_seconds': cpu_ticks / _CLOCK_TICKS, 'rss_bytes': rss_pages * _PAGE_SIZE}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Перцентиль по отсортированному списку (ближайший ранг)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """Сводка задержек в миллисекундах."""
+    values = sorted(latency * 1000 for latency in latencies)
+    return {
+        'count': len(values),
+        'p50_ms': percentile(values, 50),
+        'p90_ms': percentile(values, 90),
+        'p99_ms': percentile(values, 99),
+        'max_ms': values[-1] if values else 0.0,
+    }
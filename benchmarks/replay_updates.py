@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Воспроизведение записанного потока обновлений (RECORD_UPDATES=true).
+
+Лог из data/recordings (файлы сегментов или каталоги) подается боту через
+локальную имитацию Bot API с исходными интервалами между обновлениями,
+ускоренными в --speed раз (0 - без пауз). Пользователи восстанавливаются из
+хешей: обновления одного пользователя приходят от одного id, поэтому порядок,
+схлопывание и частота команд такие же, как в записи.
+
+Для каждой сборки (--build - корень дерева исходников, по умолчанию
+текущее) измеряются задержка ответа на inline-запросы, пропускная
+способность, процессорное время на обновление и память. С двумя сборками
+выводится разница второй относительно первой.
+
+С --summary выводится только состав лога: доля пустых и текстовых
+inline-запросов, команды, пользователи, частота.
+
+Примеры:
+    python benchmarks/replay_updates.py data/recordings --summary
+    git worktree add /tmp/base HEAD~1
+    python benchmarks/replay_updates.py data/recordings --speed 5 --build /tmp/base --build .
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fake_bot_api import (  # noqa: E402
+    FakeBotAPI,
+    make_inline_query_update,
+    make_message_update,
+    process_usage,
+    start_bot_process,
+    stop_bot_process,
+    summarize_latencies,
+)
+from src.update_recorder import KIND_GROUP_MESSAGE, KIND_INLINE_QUERY, RecordedUpdate, read_log  # noqa: E402
+
+# Метрики сравнения: (ключ, подпись, меньше - лучше)
+COMPARED = (
+    ('p50_ms', 'p50, мс', True),
+    ('p99_ms', 'p99, мс', True),
+    ('max_ms', 'max, мс', True),
+    ('throughput_rps', 'ответов/с', False),
+    ('cpu_ms_per_update', 'CPU на обновление, мс', True),
+    ('rss_mb', 'RSS, МБ', True),
+)
+
+
+def records(paths, limit: int):
+    log = read_log(paths)
+    return itertools.islice(log, limit) if limit else log
+
+
+def user_id(record: RecordedUpdate) -> int:
+    """id пользователя для имитации: 48 старших бит хеша (в пределах id Telegram)."""
+    return (record.user >> 16) + 1
+
+
+def to_update(record: RecordedUpdate, update_id: int) -> dict:
+    language = record.language or 'ru'
+    if record.kind == KIND_INLINE_QUERY:
+        return make_inline_query_update(update_id, user_id(record), record.text, language)
+    chat_type = 'group' if record.kind == KIND_GROUP_MESSAGE else 'private'
+    return make_message_update(update_id, user_id(record), record.text, chat_type, language)
+
+
+def summarize_log(paths, limit: int) -> dict:
+    kinds = Counter()
+    commands = Counter()
+    users = set()
+    per_second = Counter()
+    first = last = None
+    for record in records(paths, limit):
+        first = record.time if first is None else first
+        last = record.time
+        users.add(record.user)
+        per_second[int(record.time)] += 1
+        if record.kind == KIND_INLINE_QUERY:
+            kinds['inline_empty' if not record.text.strip() else 'inline_text'] += 1
+        else:
+            kinds['message'] += 1
+            if record.text.startswith('/'):
+                commands[record.text.split(' ', 1)[0].split('@', 1)[0]] += 1
+    total = sum(kinds.values())
+    duration = (last - first) if total else 0.0
+    return {
+        'updates': total,
+        'duration_seconds': duration,
+        'users': len(users),
+        'kinds': dict(kinds),
+        'commands': dict(commands.most_common()),
+        'average_rps': total / duration if duration else 0.0,
+        'peak_rps': max(per_second.values(), default=0),
+    }
+
+
+async def replay(build: Path, paths, speed: float, limit: int, env: dict,
+                 answer_delay: float, timeout: float, settle: float) -> dict:
+    api = FakeBotAPI(answer_delay=answer_delay)
+    await api.start()
+    process = start_bot_process(api, {'METRICS_PORT': '0', 'RESPONSES_RELOAD_INTERVAL': '0', **env}, build)
+    try:
+        await api.wait_polling_started(60)
+        # Фоновые задачи запуска (загрузка корпуса и т.п.) не должны попасть в замер
+        await asyncio.sleep(settle)
+        usage_before = process_usage(process.pid)
+
+        futures = []
+        sent = 0
+        started = time.perf_counter()
+        first_time = None
+        for update_id, record in enumerate(records(paths, limit), 1):
+            if first_time is None:
+                first_time = record.time
+            if speed:
+                delay = started + (record.time - first_time) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif update_id % 100 == 0:
+                await asyncio.sleep(0)
+            update = to_update(record, update_id)
+            if record.kind == KIND_INLINE_QUERY:
+                futures.append((time.perf_counter(), api.expect_answer(update)))
+            api.push_update(update)
+            sent += 1
+
+        if futures:
+            await asyncio.wait([future for _, future in futures], timeout=timeout)
+        elapsed = time.perf_counter() - started
+        usage_after = process_usage(process.pid)
+
+        latencies = [future.result() - sent_at for sent_at, future in futures if future.done()]
+        summary = summarize_latencies(latencies) if latencies else {}
+        cpu_seconds = usage_after['cpu_seconds'] - usage_before['cpu_seconds']
+        summary.update({
+            'build': str(build),
+            'updates': sent,
+            'inline_queries': len(futures),
+            # Без ответа - в том числе вытесненные схлопыванием (INLINE_COALESCING)
+            'inline_unanswered': len(futures) - len(latencies),
+            'messages_sent': api.calls.get('sendMessage', 0),
+            'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+            'cpu_ms_per_update': cpu_seconds * 1000 / sent if sent else 0.0,
+            'rss_mb': usage_after['rss_bytes'] / (1024 * 1024),
+        })
+        return summary
+    finally:
+        stop_bot_process(process)
+        await api.stop()
+
+
+def print_results(results: list):
+    width = 24
+    print(f"{'':<{width}}" + ''.join(f"{Path(r['build']).name or r['build']:>16}" for r in results)
+          + (f"{'разница':>12}" if len(results) == 2 else ''))
+    rows = [('updates', 'обновлений', None), ('inline_unanswered', 'inline без ответа', None)]
+    rows += list(COMPARED)
+    for key, title, lower_is_better in rows:
+        values = [r.get(key) for r in results]
+        line = f"{title:<{width}}" + ''.join(
+            f"{value:>16.2f}" if isinstance(value, float) else f"{value if value is not None else '-':>16}"
+            for value in values
+        )
+        if len(results) == 2 and lower_is_better is not None and values[0]:
+            change = (values[1] - values[0]) / values[0]
+            line += f"{change:>+12.1%}"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='Файлы сегментов .rec или каталоги с ними')
+    parser.add_argument('--summary', action='store_true', help='Только состав лога, без воспроизведения')
+    parser.add_argument('--build', action='append', type=Path, default=None,
+                        help='Корень дерева исходников бота (можно указать дважды)')
+    parser.add_argument('--speed', type=float, default=1.0, help='Ускорение относительно записи (0 - без пауз)')
+    parser.add_argument('--limit', type=int, default=0, help='Воспроизвести только первые N обновлений')
+    parser.add_argument('--answer-delay', type=float, default=0.0, help='Имитация RTT ответа Bot API, сек')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Сколько ждать ответов после подачи, сек')
+    parser.add_argument('--settle', type=float, default=2.0, help='Пауза после запуска бота до подачи, сек')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Переменная окружения бота (можно несколько раз)')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    if args.summary:
+        summary = summarize_log(args.paths, args.limit)
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return
+
+    env = dict(item.split('=', 1) for item in args.env)
+    builds = args.build or [Path(__file__).parent.parent]
+    if len(builds) > 2:
+        parser.error('Сравниваются не больше двух сборок')
+    results = [await replay(build.resolve(), args.paths, args.speed, args.limit, env,
+                            args.answer_delay, args.timeout, args.settle) for build in builds]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
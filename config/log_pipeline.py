@@ -0,0 +1,111 @@
+import json
+import logging
+import logging.handlers
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в потоке, где она создана.
+
+    Стандартный QueueHandler.prepare() вызывает format() прямо в вызывающем
+    потоке - то есть в event loop. Здесь запись кладется в очередь как есть,
+    а подстановка аргументов и форматирование выполняются в потоке QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в одну строку JSON (для json-file драйвера Docker)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _MessageBudget:
+    """Токен-бакет для одного типа сообщений."""
+
+    __slots__ = ('tokens', 'updated_at', 'suppressed')
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.suppressed = 0
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Сэмплирование и ограничение частоты однотипных сообщений.
+
+    Тип сообщения - шаблон record.msg (при ленивом форматировании он
+    постоянен для одной строки кода). Сначала запись проходит сэмплирование
+    с вероятностью sample_rate, затем токен-бакет rate_limit сообщений в секунду
+    (всплеск - не меньше одного сообщения, иначе при rate_limit < 1 бакет никогда
+    не набрал бы целый токен). Решение принимается до форматирования, поэтому отброшенные записи почти
+    ничего не стоят.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, rate_limit: float = 0.0):
+        """
+        Args:
+            sample_rate: Доля пропускаемых сообщений (0..1)
+            rate_limit: Максимум сообщений одного типа в секунду (0 - без ограничения)
+        """
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        self.burst = max(1.0, rate_limit)
+        self._budgets: Dict[str, _MessageBudget] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = str(record.msg)
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._suppress(key)
+            return False
+        if self.rate_limit <= 0:
+            return True
+
+        with self._lock:
+            budget = self._budgets.get(key)
+            if budget is None:
+                budget = self._budgets[key] = _MessageBudget(self.burst)
+            now = time.monotonic()
+            budget.tokens = min(self.burst, budget.tokens + (now - budget.updated_at) * self.rate_limit)
+            budget.updated_at = now
+            if budget.tokens < 1.0:
+                budget.suppressed += 1
+                return False
+            budget.tokens -= 1.0
+            return True
+
+    def _suppress(self, key: str):
+        with self._lock:
+            budget = self._budgets.get(key)
+            if budget is None:
+                budget = self._budgets[key] = _MessageBudget(self.burst)
+            budget.suppressed += 1
+
+    def get_suppressed(self) -> Dict[str, int]:
+        """
+        Возвращает количество отброшенных сообщений по типам.
+
+        Returns:
+            Dict[str, int]: {шаблон сообщения: сколько отброшено}
+        """
+        with self._lock:
+            return {key: budget.suppressed for key, budget in self._budgets.items()}
@@ -1,26 +1,26 @@
 import os
-import sys
+import atexit
+import importlib.util
+import queue
 import logging
-from dotenv import load_dotenv
+import logging.handlers
+from typing import Optional
 
-# Загружаем переменные окружения из .env файла
-load_dotenv()
+from config.log_pipeline import JsonFormatter, LazyQueueHandler, RateLimitFilter
 
 
 class BotConfig:
     """
     Конфигурация бота "Это правда?"
-    """
     
-    # Токен бота (обязательный параметр)
-    BOT_TOKEN = os.getenv('BOT_TOKEN')
+    При импорте настройки читаются только из окружения процесса. Файл .env
+    подключает BotConfig.load() - его вызывает точка входа бота.
+    """
     
-    # Настройки логирования
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    # Формат строк лога
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    
-    # Настройки бота
-    BOT_USERNAME = os.getenv('BOT_USERNAME', 'Is_ItTrue_Bot')
+    # Логгер строк, которые пишутся на каждый запрос
+    QUERY_LOGGER_NAME = 'isittruebot.queries'
     
     # Команды бота
     INLINE_COMMAND_TEXT = "Это правда?"
@@ -29,6 +29,201 @@ class BotConfig:
     # Настройки inline-ответов
     MAX_INLINE_RESULTS = 1  # Показываем только одну команду
     
+    # Типы обновлений, которые запрашиваем у Telegram
+    ALLOWED_UPDATES = ['inline_query', 'message']
+    
+    @classmethod
+    def load(cls, env_file: Optional[str] = None) -> type:
+        """
+        Загружает переменные из .env и перечитывает настройки.
+        
+        Переменные, уже заданные в окружении, имеют приоритет над .env.
+        Проверка значений - validate_config().
+        
+        Args:
+            env_file: Путь к .env (по умолчанию - ближайший .env вверх от каталога config)
+        
+        Returns:
+            type: BotConfig
+        """
+        # python-dotenv нужен только здесь - не импортируем его вместе с модулем
+        from dotenv import load_dotenv
+        
+        load_dotenv(env_file)
+        cls._read_environment()
+        return cls
+    
+    @classmethod
+    def _read_environment(cls):
+        """Читает настройки из переменных окружения."""
+        # Токен бота (обязательный параметр)
+        cls.BOT_TOKEN = os.getenv('BOT_TOKEN')
+        
+        # Настройки логирования
+        cls.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+        # 'sync' - запись в поток вывода прямо из event loop,
+        # 'async' - через очередь и фоновый поток, ввод-вывод не задерживает ответы
+        cls.LOG_MODE = os.getenv('LOG_MODE', 'sync').lower()
+        # Структурированный вывод: одна JSON-строка на запись
+        cls.LOG_JSON = os.getenv('LOG_JSON', 'false').lower() in ('1', 'true', 'yes')
+        # Доля строк на каждый запрос, попадающих в лог (0..1)
+        cls.LOG_QUERY_SAMPLE_RATE = float(os.getenv('LOG_QUERY_SAMPLE_RATE', '1.0'))
+        # Максимум строк одного типа на каждый запрос в секунду (0 - без ограничения)
+        cls.LOG_QUERY_RATE_LIMIT = float(os.getenv('LOG_QUERY_RATE_LIMIT', '0'))
+        
+        # Настройки бота
+        cls.BOT_USERNAME = os.getenv('BOT_USERNAME', 'Is_ItTrue_Bot')
+        # Дополнительные боты в том же процессе: 'токен@username' через запятую
+        # (username можно не указывать - он берется из getMe). У каждого бота
+        # своя статистика; event loop, пул соединений и ответы общие
+        cls.EXTRA_BOTS = tuple(
+            (token, username or None)
+            for token, _, username in (
+                entry.strip().partition('@') for entry in os.getenv('EXTRA_BOTS', '').split(',') if entry.strip()
+            )
+        )
+        
+        # Базовый URL Bot API (локальный Bot API сервер или тестовый стенд),
+        # например http://127.0.0.1:8081/bot. По умолчанию - api.telegram.org
+        cls.API_BASE_URL = os.getenv('BOT_API_BASE_URL') or None
+        
+        # HTTP-клиент Bot API. Размер пула соединений для исходящих методов
+        # (getUpdates всегда использует отдельное соединение)
+        cls.BOT_API_POOL_SIZE = int(os.getenv('BOT_API_POOL_SIZE', '256'))
+        # Таймауты (сек): установка соединения, чтение ответа, отправка запроса
+        # и ожидание свободного соединения в пуле
+        cls.BOT_API_CONNECT_TIMEOUT = float(os.getenv('BOT_API_CONNECT_TIMEOUT', '5'))
+        cls.BOT_API_READ_TIMEOUT = float(os.getenv('BOT_API_READ_TIMEOUT', '5'))
+        cls.BOT_API_WRITE_TIMEOUT = float(os.getenv('BOT_API_WRITE_TIMEOUT', '5'))
+        cls.BOT_API_POOL_TIMEOUT = float(os.getenv('BOT_API_POOL_TIMEOUT', '1'))
+        # Сколько секунд держать простаивающее соединение открытым (0 - закрывать сразу)
+        cls.BOT_API_KEEPALIVE_EXPIRY = float(os.getenv('BOT_API_KEEPALIVE_EXPIRY', '30'))
+        # Версия HTTP для исходящих методов: '1.1' или '2' (требует пакет h2)
+        cls.BOT_API_HTTP_VERSION = os.getenv('BOT_API_HTTP_VERSION', '1.1')
+        
+        # Режим получения обновлений: 'polling' (long polling) или 'webhook'
+        cls.RUN_MODE = os.getenv('BOT_RUN_MODE', 'polling').lower()
+        
+        # Конкурентная обработка обновлений: максимум одновременно обрабатываемых
+        # обновлений. 0 - последовательная обработка (по одному обновлению).
+        # Обновления одного пользователя всегда обрабатываются по порядку.
+        cls.MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '0'))
+        
+        # Схлопывание inline-запросов при наборе текста: отвечаем только на
+        # последний запрос пользователя, устаревшие отбрасываем
+        cls.INLINE_COALESCING = os.getenv('INLINE_COALESCING', 'false').lower() in ('1', 'true', 'yes')
+        # Окно тишины (мс): ответ отправляется, только если за это время от
+        # пользователя не пришло нового запроса. Требует MAX_CONCURRENT_UPDATES > 0
+        cls.INLINE_QUIET_WINDOW_MS = int(os.getenv('INLINE_QUIET_WINDOW_MS', '300'))
+        
+        # Детерминированные ответы: один и тот же вопрос получает один и тот же
+        # ответ в пределах временного окна, что позволяет включить кеш Telegram
+        cls.DETERMINISTIC_ANSWERS = os.getenv('DETERMINISTIC_ANSWERS', 'false').lower() in ('1', 'true', 'yes')
+        # Длительность окна (сек), после которого ответы на те же вопросы меняются
+        cls.DETERMINISTIC_WINDOW = int(os.getenv('DETERMINISTIC_WINDOW', '3600'))
+        # Секрет, подмешиваемый в соль, чтобы ответы нельзя было предсказать заранее
+        cls.DETERMINISTIC_SECRET = os.getenv('DETERMINISTIC_SECRET', '')
+        # Сколько секунд Telegram может кешировать ответ на текстовый вопрос
+        # (не дольше, чем осталось до смены окна)
+        cls.INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', '300'))
+        
+        # Исходящие запросы к Bot API: общий лимит запросов в секунду на бота
+        # (0 - без ограничения) и лимит сообщений в секунду в один чат
+        # (для групп - не больше 20 в минуту)
+        cls.OUTBOUND_RATE_LIMIT = float(os.getenv('OUTBOUND_RATE_LIMIT', '0'))
+        cls.OUTBOUND_CHAT_RATE_LIMIT = float(os.getenv('OUTBOUND_CHAT_RATE_LIMIT', '1'))
+        # Сколько раз повторять запрос после ответа Telegram "RetryAfter"
+        cls.OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '2'))
+        # За сколько секунд с поступления inline-запроса ответ должен уйти; более старые
+        # ответы не отправляются (Telegram отклонит устаревший запрос)
+        cls.INLINE_ANSWER_DEADLINE = float(os.getenv('INLINE_ANSWER_DEADLINE', '10'))
+        
+        # Допуск inline-запросов при перегрузке: запрос, ждавший в очереди дольше
+        # ADMISSION_SHED_AGE сек, отбрасывается без ответа; при ожидании дольше
+        # ADMISSION_DEGRADE_AGE сек или задержке event loop больше
+        # ADMISSION_DEGRADE_LOOP_LAG сек отвечается заранее подготовленным ответом
+        cls.ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'false').lower() in ('1', 'true', 'yes')
+        cls.ADMISSION_SHED_AGE = float(os.getenv('ADMISSION_SHED_AGE', '8'))
+        cls.ADMISSION_DEGRADE_AGE = float(os.getenv('ADMISSION_DEGRADE_AGE', '1'))
+        cls.ADMISSION_DEGRADE_LOOP_LAG = float(os.getenv('ADMISSION_DEGRADE_LOOP_LAG', '0.2'))
+        
+        # Файл с ответами и весами категорий по языкам (JSON). Если файла нет,
+        # используются встроенные ответы из src/responses
+        cls.RESPONSES_FILE = os.getenv('RESPONSES_FILE', 'config/responses.json')
+        # Как часто (сек) проверять, изменился ли файл ответов. 0 - не перечитывать
+        cls.RESPONSES_RELOAD_INTERVAL = float(os.getenv('RESPONSES_RELOAD_INTERVAL', '5'))
+        
+        # Хранилище статистики: 'memory' (теряется при перезапуске) или 'mmap'
+        # (файл фиксированного размера, переживает перезапуск и kill -9)
+        cls.STATS_BACKEND = os.getenv('STATS_BACKEND', 'memory').lower()
+        cls.STATS_FILE = os.getenv('STATS_FILE', 'data/stats.bin')
+        # Как часто (сек) снимок статистики сбрасывается в хранилище
+        cls.STATS_FLUSH_INTERVAL = float(os.getenv('STATS_FLUSH_INTERVAL', '5'))
+        
+        # Служебный HTTP-сервер: метрики Prometheus (/metrics) и проверка
+        # живости (/health). 0 - не запускать
+        cls.METRICS_LISTEN = os.getenv('METRICS_LISTEN', '0.0.0.0')
+        cls.METRICS_PORT = int(os.getenv('METRICS_PORT', '8000'))
+        # Задержка event loop (сек), после которой /health сообщает о проблеме
+        cls.HEALTH_MAX_LOOP_LAG = float(os.getenv('HEALTH_MAX_LOOP_LAG', '5'))
+        
+        # Telegram id администраторов через запятую: им доступна команда /profile
+        cls.ADMIN_USER_IDS = frozenset(
+            int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').replace(' ', '').split(',') if user_id
+        )
+        # Каталог для файлов профилей (/profile) и ограничение длительности окна (сек)
+        cls.PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+        cls.PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '300'))
+        # Период сэмплирования стека при /profile cpu (мс)
+        cls.PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+        # Постоянный учет времени работы обработчиков (метрики handler_*)
+        cls.HANDLER_TIMING = os.getenv('HANDLER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+        
+        # Запись поступающих обновлений в двоичный лог для воспроизведения
+        # (benchmarks/replay_updates.py). id пользователей хешируются с солью
+        cls.RECORD_UPDATES = os.getenv('RECORD_UPDATES', 'false').lower() in ('1', 'true', 'yes')
+        cls.RECORD_DIR = os.getenv('RECORD_DIR', 'data/recordings')
+        # Заменять тексты запросов и сообщений текстом той же формы
+        cls.RECORD_SCRUB_TEXT = os.getenv('RECORD_SCRUB_TEXT', 'false').lower() in ('1', 'true', 'yes')
+        # Размер сегмента лога и общий предел размера сегментов (МБ)
+        cls.RECORD_SEGMENT_MB = float(os.getenv('RECORD_SEGMENT_MB', '16'))
+        cls.RECORD_MAX_MB = float(os.getenv('RECORD_MAX_MB', '256'))
+        # Соль хеша id пользователей; без нее - случайная при каждом запуске
+        # (пользователи разных запусков не сопоставляются)
+        cls.RECORD_SALT = os.getenv('RECORD_SALT', '')
+        
+        # Передача long polling новому процессу при перезапуске: файл с offset,
+        # счетчиками и необработанными обновлениями (пусто - не передавать).
+        # Должен лежать в каталоге, общем для старого и нового процесса.
+        # Используется только в режиме polling с одним ботом (без EXTRA_BOTS)
+        cls.HANDOFF_FILE = os.getenv('HANDOFF_FILE', '')
+        # Через сколько секунд ожидания передачи от предыдущего процесса предупредить в логе
+        # (ожидание продолжается, пока предыдущий процесс не перестанет принимать обновления)
+        cls.HANDOFF_WAIT = float(os.getenv('HANDOFF_WAIT', '60'))
+        # Сколько по SIGTERM ждать ответов на уже полученные обновления, сек
+        cls.SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '5'))
+        
+        # Количество процессов-воркеров. При значении больше 1 бот работает
+        # супервизором: принимает webhook и распределяет обновления по воркерам
+        # по id пользователя. Требует BOT_RUN_MODE=webhook
+        cls.WORKERS = int(os.getenv('BOT_WORKERS', '1'))
+        
+        # Настройки webhook-режима
+        cls.WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+        cls.WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+        # Публичный адрес, на который Telegram будет отправлять обновления,
+        # например https://bot.example.com (без пути)
+        cls.WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+        # Секретный путь webhook - не должен быть угадываемым
+        cls.WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'webhook')
+        # Секрет, который Telegram передает в заголовке X-Telegram-Bot-Api-Secret-Token
+        cls.WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN') or None
+        cls.WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+        # Сертификат и ключ для TLS. Если не заданы, TLS терминируется
+        # обратным прокси (TLS offload), а бот слушает обычный HTTP
+        cls.WEBHOOK_CERT = os.getenv('WEBHOOK_CERT') or None
+        cls.WEBHOOK_KEY = os.getenv('WEBHOOK_KEY') or None
+    
     @classmethod
     def validate_config(cls) -> bool:
         """
@@ -40,28 +235,159 @@ class BotConfig:
         if not cls.BOT_TOKEN:
             raise ValueError("BOT_TOKEN не установлен! Укажите токен бота в переменной окружения.")
         
+        if cls.RUN_MODE not in ('polling', 'webhook'):
+            raise ValueError(f"Неизвестный режим BOT_RUN_MODE: {cls.RUN_MODE} (ожидается polling или webhook)")
+        
+        if cls.LOG_MODE not in ('sync', 'async'):
+            raise ValueError(f"Неизвестный режим LOG_MODE: {cls.LOG_MODE} (ожидается sync или async)")
+        
+        if not 0.0 <= cls.LOG_QUERY_SAMPLE_RATE <= 1.0:
+            raise ValueError("LOG_QUERY_SAMPLE_RATE должен быть в диапазоне от 0 до 1.")
+        
+        if cls.LOG_QUERY_RATE_LIMIT < 0:
+            raise ValueError("LOG_QUERY_RATE_LIMIT не может быть отрицательным.")
+        
+        if cls.BOT_API_POOL_SIZE < 1:
+            raise ValueError("BOT_API_POOL_SIZE должен быть не меньше 1.")
+        
+        if min(cls.BOT_API_CONNECT_TIMEOUT, cls.BOT_API_READ_TIMEOUT,
+               cls.BOT_API_WRITE_TIMEOUT, cls.BOT_API_POOL_TIMEOUT) <= 0:
+            raise ValueError("Таймауты BOT_API_*_TIMEOUT должны быть положительными.")
+        
+        if cls.BOT_API_KEEPALIVE_EXPIRY < 0:
+            raise ValueError("BOT_API_KEEPALIVE_EXPIRY не может быть отрицательным.")
+        
+        if cls.BOT_API_HTTP_VERSION not in ('1.1', '2'):
+            raise ValueError(f"Неизвестная версия BOT_API_HTTP_VERSION: {cls.BOT_API_HTTP_VERSION} (ожидается 1.1 или 2)")
+        
+        if cls.BOT_API_HTTP_VERSION == '2' and importlib.util.find_spec('h2') is None:
+            raise ValueError(
+                "BOT_API_HTTP_VERSION=2 требует пакет h2: pip install \"python-telegram-bot[http2]\"."
+            )
+        
+        if cls.MAX_CONCURRENT_UPDATES < 0:
+            raise ValueError("MAX_CONCURRENT_UPDATES не может быть отрицательным.")
+        
+        if cls.INLINE_QUIET_WINDOW_MS < 0:
+            raise ValueError("INLINE_QUIET_WINDOW_MS не может быть отрицательным.")
+        
+        if cls.DETERMINISTIC_WINDOW <= 0:
+            raise ValueError("DETERMINISTIC_WINDOW должен быть положительным.")
+        
+        if cls.INLINE_CACHE_TIME < 0:
+            raise ValueError("INLINE_CACHE_TIME не может быть отрицательным.")
+        
+        if cls.OUTBOUND_RATE_LIMIT < 0 or cls.OUTBOUND_CHAT_RATE_LIMIT < 0:
+            raise ValueError("OUTBOUND_RATE_LIMIT и OUTBOUND_CHAT_RATE_LIMIT не могут быть отрицательными.")
+        
+        if cls.OUTBOUND_MAX_RETRIES < 0:
+            raise ValueError("OUTBOUND_MAX_RETRIES не может быть отрицательным.")
+        
+        if cls.INLINE_ANSWER_DEADLINE <= 0:
+            raise ValueError("INLINE_ANSWER_DEADLINE должен быть положительным.")
+        
+        if cls.ADMISSION_DEGRADE_AGE <= 0 or cls.ADMISSION_DEGRADE_LOOP_LAG <= 0:
+            raise ValueError("ADMISSION_DEGRADE_AGE и ADMISSION_DEGRADE_LOOP_LAG должны быть положительными.")
+        
+        if cls.ADMISSION_SHED_AGE < cls.ADMISSION_DEGRADE_AGE:
+            raise ValueError("ADMISSION_SHED_AGE не может быть меньше ADMISSION_DEGRADE_AGE.")
+        
+        if cls.RESPONSES_RELOAD_INTERVAL < 0:
+            raise ValueError("RESPONSES_RELOAD_INTERVAL не может быть отрицательным.")
+        
+        if cls.STATS_BACKEND not in ('memory', 'mmap'):
+            raise ValueError(f"Неизвестный бэкенд STATS_BACKEND: {cls.STATS_BACKEND} (ожидается memory или mmap)")
+        
+        if cls.STATS_FLUSH_INTERVAL <= 0:
+            raise ValueError("STATS_FLUSH_INTERVAL должен быть положительным.")
+        
+        if not 0 <= cls.METRICS_PORT <= 65535:
+            raise ValueError(f"Некорректный METRICS_PORT: {cls.METRICS_PORT}")
+        
+        if cls.HEALTH_MAX_LOOP_LAG <= 0:
+            raise ValueError("HEALTH_MAX_LOOP_LAG должен быть положительным.")
+        
+        if cls.PROFILE_MAX_SECONDS <= 0 or cls.PROFILE_SAMPLE_INTERVAL_MS <= 0:
+            raise ValueError("PROFILE_MAX_SECONDS и PROFILE_SAMPLE_INTERVAL_MS должны быть положительными.")
+        
+        if cls.WORKERS < 1:
+            raise ValueError("BOT_WORKERS должен быть не меньше 1.")
+        
+        if cls.WORKERS > 1 and cls.RUN_MODE != 'webhook':
+            raise ValueError("BOT_WORKERS > 1 работает только в режиме BOT_RUN_MODE=webhook.")
+        
+        if cls.EXTRA_BOTS:
+            if cls.RUN_MODE != 'polling' or cls.WORKERS > 1:
+                raise ValueError("EXTRA_BOTS работает только в режиме BOT_RUN_MODE=polling без BOT_WORKERS.")
+            tokens = [cls.BOT_TOKEN] + [token for token, _ in cls.EXTRA_BOTS]
+            if any(':' not in token for token in tokens[1:]):
+                raise ValueError("EXTRA_BOTS: ожидается список 'токен@username' через запятую.")
+            if len(set(tokens)) != len(tokens):
+                raise ValueError("EXTRA_BOTS: токены ботов повторяются.")
+        
+        if cls.RECORD_SEGMENT_MB <= 0 or cls.RECORD_MAX_MB < cls.RECORD_SEGMENT_MB:
+            raise ValueError("RECORD_SEGMENT_MB должен быть положительным и не больше RECORD_MAX_MB.")
+        
+        if cls.HANDOFF_WAIT < 0 or cls.SHUTDOWN_DRAIN_TIMEOUT < 0:
+            raise ValueError("HANDOFF_WAIT и SHUTDOWN_DRAIN_TIMEOUT не могут быть отрицательными.")
+        
+        if cls.RUN_MODE == 'webhook':
+            if not cls.WEBHOOK_URL:
+                raise ValueError("WEBHOOK_URL не установлен! Он обязателен в режиме webhook.")
+            if bool(cls.WEBHOOK_CERT) != bool(cls.WEBHOOK_KEY):
+                raise ValueError("WEBHOOK_CERT и WEBHOOK_KEY должны быть указаны вместе.")
+        
         return True
     
+    @classmethod
+    def get_webhook_url(cls) -> str:
+        """
+        Возвращает полный URL webhook, который регистрируется в Telegram.
+        
+        Returns:
+            str: URL вида https://bot.example.com/<WEBHOOK_PATH>
+        """
+        return f"{(cls.WEBHOOK_URL or '').rstrip('/')}/{cls.WEBHOOK_PATH.strip('/')}"
+    
+    # Фоновый поток записи логов (в режиме async) и фильтр строк на каждый запрос
+    log_listener = None
+    query_log_filter = None
+    
     @classmethod
     def setup_logging(cls):
         """
         Настраивает логирование для бота.
+        
+        В режиме LOG_MODE=async записи кладутся в очередь без форматирования,
+        а форматирует и пишет их фоновый поток QueueListener. Строки на каждый
+        запрос (логгер QUERY_LOGGER_NAME) сэмплируются и ограничиваются по частоте.
         """
-        logging.basicConfig(
-            format=cls.LOG_FORMAT,
-            level=getattr(logging, cls.LOG_LEVEL, logging.INFO)
-        )
+        root = logging.getLogger()
+        root.setLevel(getattr(logging, cls.LOG_LEVEL, logging.INFO))
+        
+        if not root.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(JsonFormatter() if cls.LOG_JSON else logging.Formatter(cls.LOG_FORMAT))
+            
+            if cls.LOG_MODE == 'async':
+                log_queue = queue.SimpleQueue()
+                cls.log_listener = logging.handlers.QueueListener(log_queue, handler)
+                cls.log_listener.start()
+                # Дописываем оставшиеся записи при завершении процесса
+                atexit.register(cls.log_listener.stop)
+                handler = LazyQueueHandler(log_queue)
+            
+            root.addHandler(handler)
+        
+        if cls.query_log_filter is None and (cls.LOG_QUERY_SAMPLE_RATE < 1.0 or cls.LOG_QUERY_RATE_LIMIT > 0):
+            cls.query_log_filter = RateLimitFilter(cls.LOG_QUERY_SAMPLE_RATE, cls.LOG_QUERY_RATE_LIMIT)
+            logging.getLogger(cls.QUERY_LOGGER_NAME).addFilter(cls.query_log_filter)
         
         # Устанавливаем уровень логирования для telegram бота
         logging.getLogger("httpx").setLevel(logging.WARNING)
         logging.getLogger("telegram").setLevel(logging.INFO)
 
 
-# Проверяем конфигурацию при импорте (только если не в режиме тестирования)
-if __name__ != "__main__" and "test" not in sys.modules:
-    try:
-        BotConfig.validate_config()
-    except ValueError as e:
-        print(f"Ошибка конфигурации: {e}")
-        print("Создайте файл .env с BOT_TOKEN=ваш_токен_бота")
-        # Не выходим при импорте для тестирования
\ No newline at end of file
+# Значения по умолчанию и переменные окружения процесса; без чтения .env и
+# без проверки - их выполняет точка входа через BotConfig.load()
+BotConfig._read_environment()
@@ -0,0 +1,125 @@
+import logging
+import time
+from typing import Callable, Dict
+
+from telegram import Update
+
+from src.expiring_table import ExpiringTable
+
+# Решения о допуске inline-запроса
+ADMIT = 'admit'
+DEGRADE = 'degrade'
+SHED = 'shed'
+
+
+class AdmissionController:
+    """
+    Допуск inline-запросов к обработке при перегрузке.
+
+    Когда бот не успевает за потоком обновлений, запросы ждут в очереди, и
+    полная обработка каждого из них только увеличивает задержку для всех
+    следующих. Поэтому решение принимается по возрасту запроса в очереди
+    (от поступления в update_queue до начала обработчика) и задержке event
+    loop:
+
+    - запрос старше shed_age отбрасывается без ответа: пользователь уже не
+      ждет его, а Telegram не примет ответ на устаревший query_id;
+    - запрос старше degrade_age или при задержке event loop больше
+      degrade_loop_lag обрабатывается по упрощенному пути (заранее
+      подготовленный ответ, без записи в лог);
+    - остальные запросы обрабатываются как обычно.
+
+    Время поступления запросов контроллер узнает из очереди обновлений
+    (on_arrival), как и схлопыватель inline-запросов.
+    """
+
+    # Порог размера таблицы, после которого из нее удаляются давние записи
+    PRUNE_THRESHOLD = 10000
+    # Возраст записи (сек), после которой обновление считается брошенным
+    STALE_ENTRY_AGE = 60.0
+    # Как часто (в секундах) можно писать в лог предупреждение о перегрузке
+    OVERLOAD_LOG_INTERVAL = 60.0
+
+    def __init__(self, shed_age: float, degrade_age: float, degrade_loop_lag: float,
+                 loop_lag: Callable[[], float]):
+        """
+        Args:
+            shed_age: Возраст запроса в очереди (сек), после которого он отбрасывается
+            degrade_age: Возраст запроса (сек), после которого ответ упрощается
+            degrade_loop_lag: Задержка event loop (сек), после которой ответы упрощаются
+            loop_lag: Функция, возвращающая последнее измерение задержки event loop
+        """
+        self.shed_age = shed_age
+        self.degrade_age = degrade_age
+        self.degrade_loop_lag = degrade_loop_lag
+        self._loop_lag = loop_lag
+        self.logger = logging.getLogger(__name__)
+
+        # Время поступления по update_id еще не обработанных inline-запросов
+        self._arrivals = ExpiringTable(self.STALE_ENTRY_AGE, self.PRUNE_THRESHOLD)
+        self._last_overload_log = 0.0
+
+        # Счетчики
+        self.admitted = 0
+        self.degraded = 0
+        self.shed = 0
+        self.max_queue_age = 0.0
+
+    def on_arrival(self, update: object):
+        """Запоминает время поступления inline-запроса (обработчик ArrivalQueue)."""
+        if not isinstance(update, Update) or not update.inline_query:
+            return
+        self._arrivals.put(update.update_id, None)
+
+    def check(self, update: Update) -> str:
+        """
+        Решает, как обработать inline-запрос.
+
+        Вызывается в начале обработчика один раз на обновление.
+
+        Args:
+            update: Обновление с inline-запросом
+
+        Returns:
+            str: ADMIT, DEGRADE или SHED
+        """
+        arrived_at = self._arrivals.pop_arrival(update.update_id)
+        # Запрос прошел мимо очереди обновлений - возраст неизвестен
+        age = time.monotonic() - arrived_at if arrived_at is not None else 0.0
+        if age > self.max_queue_age:
+            self.max_queue_age = age
+
+        if age > self.shed_age:
+            self.shed += 1
+            self._log_overload(age)
+            return SHED
+        if age > self.degrade_age or self._loop_lag() > self.degrade_loop_lag:
+            self.degraded += 1
+            self._log_overload(age)
+            return DEGRADE
+        self.admitted += 1
+        return ADMIT
+
+    def _log_overload(self, age: float):
+        now = time.monotonic()
+        if now - self._last_overload_log >= self.OVERLOAD_LOG_INTERVAL:
+            self._last_overload_log = now
+            self.logger.warning(
+                "Перегрузка: inline-запрос ждал в очереди %.1f с, задержка event loop %.2f с; "
+                "ответы упрощаются, устаревшие запросы отбрасываются", age, self._loop_lag()
+            )
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        Возвращает счетчики допуска.
+
+        Returns:
+            Dict[str, float]: admitted, degraded, shed, max_queue_age_seconds, pending
+        """
+        return {
+            'admitted': self.admitted,
+            'degraded': self.degraded,
+            'shed': self.shed,
+            'max_queue_age_seconds': self.max_queue_age,
+            'pending': len(self._arrivals),
+        }
@@ -1,7 +1,14 @@
+import os
 import sys
 import sys
+import json
+import time
+import signal
+import asyncio
 import logging
+import random
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple
 from datetime import datetime
 from collections import defaultdict
 
@@ -9,10 +16,34 @@ from collections import defaultdict
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
-from telegram import Update, InlineQueryResultArticle, InputTextMessageContent, InlineQueryResultsButton
-from telegram.ext import Application, InlineQueryHandler, ContextTypes, CommandHandler
+from telegram import Update
+from telegram.error import RetryAfter
+from telegram.helpers import escape_markdown
+from telegram.ext import Application, InlineQueryHandler, ContextTypes, CommandHandler, TypeHandler, filters
 from config.settings import BotConfig
 from src.response_generator import response_generator
+from src.response_corpus import CorpusFile
+from src.update_scheduler import ArrivalQueue, ConcurrentApplication, UpdateScheduler
+from src.inline_coalescer import InlineQueryCoalescer
+from src.admission import DEGRADE, SHED, AdmissionController
+from src.inline_templates import InlineResultTemplates
+from src.stats_store import create_stats_store, restore_stats, snapshot_stats
+from src.handoff import PollingHandoff
+from src.update_recorder import UpdateRecorder
+from src.timeline import MinuteTimeline
+from src.sketches import TOP_QUERIES_MIN_COUNT, HyperLogLog, SpaceSaving, sketch_key
+from src.rate_limiter import FloodControlLimiter, RequestDropped
+from src.transport import KeepAliveHTTPXRequest, build_requests
+from src.metrics import LoopLagMonitor, MetricsRegistry, MetricsServer
+from src.profiler import HandlerTimer, ProfileBusy, ProfileSession
+
+if TYPE_CHECKING:
+    # Супервизор (multiprocessing, разделяемая память) нужен только в режиме
+    # BOT_WORKERS > 1 и импортируется там, где используется
+    from src.supervisor import WorkerContext
+
+# Сколько заранее подготовленных ответов упрощенного пути держать на каждый язык
+DEGRADED_ANSWERS_PER_LANGUAGE = 32
 
 
 class IsItTrueBot:
@@ -21,10 +52,26 @@ class IsItTrueBot:
     Обрабатывает inline-запросы и возвращает случайные "фактчекинговые" ответы.
     """
     
-    def __init__(self):
+    def __init__(self, worker: Optional['WorkerContext'] = None, token: Optional[str] = None,
+                 username: Optional[str] = None, request: Optional[KeepAliveHTTPXRequest] = None):
+        """
+        Args:
+            worker: Параметры воркера супервизора (None - самостоятельный бот)
+            token: Токен дополнительного бота из EXTRA_BOTS (None - основной бот, BOT_TOKEN)
+            username: Имя дополнительного бота (None - узнать через getMe)
+            request: HTTP-клиент исходящих методов, общий с другими ботами процесса
+        """
+        self.worker = worker
+        # Основной бот процесса загружает и перечитывает ответы и держит
+        # служебный HTTP-сервер; дополнительные боты пользуются общими
+        self.primary = token is None
+        
         # Настройка логирования
         BotConfig.setup_logging()
         self.logger = logging.getLogger(__name__)
+        # Строки, которые пишутся на каждый запрос, идут в отдельный логгер
+        # с сэмплированием и ограничением частоты
+        self.query_logger = logging.getLogger(BotConfig.QUERY_LOGGER_NAME)
         
         # Простая статистика в памяти (без базы данных)
         self.stats = {
@@ -41,35 +88,295 @@ class IsItTrueBot:
         try:
             BotConfig.validate_config()
         except ValueError as e:
-            self.logger.error(f"Ошибка конфигурации: {e}")
+            self.logger.error("Ошибка конфигурации: %s", e)
             raise
         
-        # Создание приложения бота
         # После валидации config мы знаем, что BOT_TOKEN не None
-        bot_token = BotConfig.BOT_TOKEN
+        bot_token = token or BotConfig.BOT_TOKEN
         assert bot_token is not None, "BOT_TOKEN должен быть установлен после валидации"
-        self.application = Application.builder().token(bot_token).build()
+        # Числовой id бота - первая часть токена
+        self.bot_id = bot_token.split(':', 1)[0]
+        self.username = username if token else BotConfig.BOT_USERNAME
+        
+        # Ответы загружаются до создания статистики: от набора категорий
+        # зависят счетчики поминутной истории. Корпус ответов один на процесс
+        self.corpus_file = CorpusFile(BotConfig.RESPONSES_FILE)
+        if self.primary:
+            if self.corpus_file.exists():
+                try:
+                    response_generator.load_corpus(self.corpus_file.load())
+                except ValueError as e:
+                    self.logger.error("Ошибка конфигурации: %s", e)
+                    raise
+                self.logger.info("Ответы загружены из %s, языки: %s",
+                                 BotConfig.RESPONSES_FILE, ', '.join(response_generator.languages))
+            else:
+                self.logger.warning("Файл ответов %s не найден, используются встроенные ответы",
+                                    BotConfig.RESPONSES_FILE)
+        self._responses_reload_task = None
+        
+        # Восстанавливаем статистику из хранилища; дальше она сбрасывается
+        # туда фоновой задачей, а обработчики меняют только словарь в памяти
+        stats_file = Path(BotConfig.STATS_FILE)
+        if worker:
+            # У каждого воркера свой файл статистики
+            stats_file = stats_file.with_name(f"{stats_file.stem}.worker{worker.index}{stats_file.suffix}")
+        if not self.primary:
+            # И у каждого дополнительного бота
+            stats_file = stats_file.with_name(f"{stats_file.stem}.bot{self.bot_id}{stats_file.suffix}")
+        self.stats_store = create_stats_store(BotConfig.STATS_BACKEND, str(stats_file))
+        saved_stats = self.stats_store.load()
+        if worker:
+            # Перезапущенный воркер продолжает с последних опубликованных счетчиков
+            published = worker.stats_table.read_snapshot(worker.index)
+            if published and published['total_queries'] > (saved_stats or {}).get('total_queries', -1):
+                saved_stats = published
+        if saved_stats:
+            restore_stats(self.stats, saved_stats)
+            self.logger.info("Статистика восстановлена: всего %s запросов", self.stats['total_queries'])
+        self._flushed_stats = saved_stats
+        self._stats_flush_task = None
+        # В режиме передачи приема сброс статистики начинается только под блокировкой
+        self._defer_stats_flush = False
+        self._stats_publish_task = None
+        
+        # Поминутная история за сутки для /stats: QPS, пиковая минута, тренд
+        self.timeline = MinuteTimeline(('total', 'text', 'button', *response_generator.responses))
+        # Уникальные пользователи и частые вопросы за день в фиксированной памяти
+        self.unique_users = HyperLogLog()
+        self.top_queries = SpaceSaving()
+        
+        # Создание приложения бота
+        self.update_queue = ArrivalQueue()
+        # Все исходящие запросы (ответы, сообщения) проходят через планировщик:
+        # лимиты Telegram, приоритет inline-ответов, повтор после RetryAfter
+        self.rate_limiter = FloodControlLimiter(
+            global_rate=BotConfig.OUTBOUND_RATE_LIMIT,
+            chat_rate=BotConfig.OUTBOUND_CHAT_RATE_LIMIT,
+            max_retries=BotConfig.OUTBOUND_MAX_RETRIES,
+            inline_deadline=BotConfig.INLINE_ANSWER_DEADLINE,
+        )
+        # Срок ответа на inline-запрос считается от его поступления в очередь
+        self.update_queue.add_arrival_listener(self.rate_limiter.on_arrival)
+        # Раздельные пулы соединений для getUpdates и исходящих методов
+        request, get_updates_request = build_requests(request)
+        self.request = request
+        builder = (
+            Application.builder()
+            .token(bot_token)
+            .application_class(ConcurrentApplication)
+            .update_queue(self.update_queue)
+            .rate_limiter(self.rate_limiter)
+            .request(request)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+        )
+        if BotConfig.API_BASE_URL:
+            builder = builder.base_url(BotConfig.API_BASE_URL)
+        if worker:
+            # Обновления воркеру передает супервизор
+            builder = builder.updater(None)
+        else:
+            builder = builder.get_updates_request(get_updates_request)
+        self.application = builder.build()
+        
+        # Конкурентная обработка обновлений (если включена)
+        self.update_scheduler = None
+        if BotConfig.MAX_CONCURRENT_UPDATES > 0:
+            self.update_scheduler = UpdateScheduler(
+                BotConfig.MAX_CONCURRENT_UPDATES,
+                create_task=self.application.create_task,
+                queue_size=self.application.update_queue.qsize,
+            )
+            self.application.update_scheduler = self.update_scheduler
+        
+        # Схлопывание inline-запросов при наборе текста (если включено)
+        self.coalescer = None
+        if BotConfig.INLINE_COALESCING:
+            quiet_window = BotConfig.INLINE_QUIET_WINDOW_MS / 1000
+            if quiet_window and not self.update_scheduler:
+                self.logger.warning(
+                    "Окно тишины INLINE_QUIET_WINDOW_MS требует MAX_CONCURRENT_UPDATES > 0 и отключено"
+                )
+                quiet_window = 0.0
+            self.coalescer = InlineQueryCoalescer(quiet_window)
+            self.update_queue.add_arrival_listener(self.coalescer.on_arrival)
+        
+        # Допуск inline-запросов при перегрузке (если включен)
+        self.admission = None
+        if BotConfig.ADMISSION_CONTROL:
+            self.admission = AdmissionController(
+                shed_age=BotConfig.ADMISSION_SHED_AGE,
+                degrade_age=BotConfig.ADMISSION_DEGRADE_AGE,
+                degrade_loop_lag=BotConfig.ADMISSION_DEGRADE_LOOP_LAG,
+                loop_lag=lambda: self.loop_lag.last_lag,
+            )
+            self.update_queue.add_arrival_listener(self.admission.on_arrival)
+        # Ответы упрощенного пути по языкам: (набор ответов, [(results, категория), ...])
+        self._degraded_answers = {}
+        
+        # Запись поступающих обновлений для воспроизведения (если включена)
+        self.recorder = None
+        if BotConfig.RECORD_UPDATES:
+            stream = f"bot{self.bot_id}" + (f".worker{worker.index}" if worker else "")
+            self.recorder = UpdateRecorder(
+                BotConfig.RECORD_DIR,
+                stream,
+                segment_bytes=int(BotConfig.RECORD_SEGMENT_MB * 1024 * 1024),
+                max_bytes=int(BotConfig.RECORD_MAX_MB * 1024 * 1024),
+                scrub=BotConfig.RECORD_SCRUB_TEXT,
+                salt=BotConfig.RECORD_SALT.encode('utf-8') or None,
+            )
+            self.update_queue.add_arrival_listener(self.recorder.on_arrival)
+        
+        # Шаблоны inline-ответов: постоянные части сериализуются один раз
+        self.templates = InlineResultTemplates(
+            icon_url=self._get_neutral_icon_url(),
+            command_text=BotConfig.INLINE_COMMAND_TEXT,
+            command_description=BotConfig.INLINE_COMMAND_DESCRIPTION,
+            button_text="Как это работает?",
+            start_parameter="help",
+        )
+        
+        # Профилирование по команде администратора и учет времени обработчиков
+        self.profiler = ProfileSession(BotConfig.PROFILE_DIR, BotConfig.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        self._profile_task = None
+        self.handler_timer = HandlerTimer() if BotConfig.HANDLER_TIMING else None
+        
+        # Метрики для Prometheus
+        self.metrics = MetricsRegistry(prefix='isittruebot_')
+        self._register_metrics()
+        self.metrics_server = None
+        # Время (unix) последнего обработанного обновления - для /health
+        self.last_update_at = None
         
         # Регистрация обработчиков
         self._register_handlers()
         
-        self.logger.info("Бот 'Это правда?' инициализирован")
+        if self.primary:
+            self.logger.info("Бот 'Это правда?' инициализирован")
+        else:
+            self.logger.info("Дополнительный бот %s инициализирован", username or self.bot_id)
     
     def _register_handlers(self):
         """Регистрирует обработчики событий бота"""
+        # С HANDLER_TIMING обработчики оборачиваются учетом времени
+        timed = self.handler_timer.wrap if self.handler_timer else (lambda name, callback: callback)
+        
         # Обработчик команд
-        self.application.add_handler(CommandHandler('start', self.cmd_start))
-        self.application.add_handler(CommandHandler('help', self.cmd_help))
-        self.application.add_handler(CommandHandler('stats', self.cmd_stats))
+        self.application.add_handler(CommandHandler('start', timed('start', self.cmd_start)))
+        self.application.add_handler(CommandHandler('help', timed('help', self.cmd_help)))
+        self.application.add_handler(CommandHandler('stats', timed('stats', self.cmd_stats)))
+        
+        # Профилирование - только для администраторов; остальным команда не отвечает
+        if BotConfig.ADMIN_USER_IDS:
+            self.application.add_handler(CommandHandler(
+                'profile', timed('profile', self.cmd_profile), filters=filters.User(user_id=BotConfig.ADMIN_USER_IDS)
+            ))
         
         # Обработчик inline-запросов
-        inline_handler = InlineQueryHandler(self.handle_inline_query)
+        inline_handler = InlineQueryHandler(timed('inline_query', self.handle_inline_query))
         self.application.add_handler(inline_handler)
+        
+        # Отметка о каждом обработанном обновлении (группа после основных обработчиков)
+        self.application.add_handler(TypeHandler(Update, self._track_update), group=1)
+    
+    async def _track_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Запоминает время последнего обработанного обновления."""
+        self.last_update_at = time.time()
+    
+    def _register_metrics(self):
+        """
+        Регистрирует метрики бота.
+        
+        Счетчики self.stats, планировщика и схлопывателя читаются при запросе
+        /metrics и не добавляют работы обработчикам. На горячем пути остаются
+        только гистограммы задержек и счетчик ошибок.
+        """
+        metrics = self.metrics
+        for field in ('total_queries', 'text_queries', 'button_queries'):
+            metrics.callback(
+                f'{field}_total', f'Счетчик {field} из статистики бота',
+                lambda field=field: self.stats[field], type_name='counter'
+            )
+        metrics.callback('today_queries', 'Запросов за текущий день', lambda: self.stats['today_queries'])
+        metrics.callback_family(
+            'responses_total', 'Сгенерированные ответы по категориям', 'category',
+            lambda: dict(self.stats['categories']), type_name='counter'
+        )
+        metrics.callback('unique_users_today', 'Оценка числа уникальных пользователей за день (HyperLogLog)',
+                         self.unique_users.estimate)
+        metrics.callback_family(
+            'top_queries_today', 'Оценка числа повторов самых частых вопросов за день (Space-Saving)', 'query',
+            lambda: {key: count for key, count, _ in self.top_queries.top(10, TOP_QUERIES_MIN_COUNT)}
+        )
+        metrics.callback(
+            'start_time_seconds', 'Время запуска бота (unix time)', lambda: self.stats['start_time'].timestamp()
+        )
+        
+        self.inline_latency = metrics.histogram(
+            'inline_query_duration_seconds', 'Время обработки inline-запроса от начала обработчика до ответа'
+        )
+        self.answer_latency = metrics.histogram(
+            'answer_inline_query_duration_seconds', 'Время запроса answerInlineQuery к Bot API'
+        )
+        self.errors = metrics.labeled_counter('errors_total', 'Ошибки обработки обновлений по типам', 'type')
+        
+        self.loop_lag = LoopLagMonitor(
+            histogram=metrics.histogram('event_loop_lag_seconds', 'Задержка event loop относительно расписания')
+        )
+        metrics.callback('event_loop_lag_last_seconds', 'Последнее измерение задержки event loop',
+                         lambda: self.loop_lag.last_lag)
+        
+        if self.handler_timer:
+            timer = self.handler_timer
+            metrics.callback_family('handler_calls_total', 'Вызовы обработчиков', 'handler',
+                                    lambda: timer.calls, type_name='counter')
+            metrics.callback_family('handler_seconds_total', 'Суммарное время работы обработчиков', 'handler',
+                                    lambda: timer.seconds, type_name='counter')
+            metrics.callback_family('handler_max_seconds', 'Максимальное время одного вызова обработчика',
+                                    'handler', lambda: timer.max_seconds)
+        
+        if BotConfig.query_log_filter:
+            log_filter = BotConfig.query_log_filter
+            metrics.callback_family('log_suppressed_total', 'Строки лога запросов, отброшенные сэмплированием '
+                                    'и ограничением частоты', 'message', log_filter.get_suppressed,
+                                    type_name='counter')
+        
+        rate_limiter = self.rate_limiter
+        for key in rate_limiter.get_metrics():
+            metrics.callback(f'outbound_{key}', f'Исходящие запросы к Bot API: {key}',
+                             lambda key=key: rate_limiter.get_metrics()[key])
+        
+        if self.update_scheduler:
+            scheduler = self.update_scheduler
+            for key in scheduler.get_metrics():
+                metrics.callback(f'scheduler_{key}', f'Планировщик обновлений: {key}',
+                                 lambda key=key: scheduler.get_metrics()[key])
+        if self.coalescer:
+            coalescer = self.coalescer
+            for key in coalescer.get_metrics():
+                metrics.callback(f'coalescer_{key}', f'Схлопывание inline-запросов: {key}',
+                                 lambda key=key: coalescer.get_metrics()[key])
+        if self.admission:
+            admission = self.admission
+            for key in admission.get_metrics():
+                metrics.callback(f'admission_{key}', f'Допуск inline-запросов при перегрузке: {key}',
+                                 lambda key=key: admission.get_metrics()[key])
+        if self.recorder:
+            recorder = self.recorder
+            for key in recorder.get_metrics():
+                metrics.callback(f'recorder_{key}', f'Запись обновлений: {key}',
+                                 lambda key=key: recorder.get_metrics()[key])
     
     async def handle_inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         Обрабатывает inline-запросы пользователей.
         
+        При конкурентной обработке несколько вызовов могут выполняться
+        одновременно. Все изменения self.stats выполняются синхронно, без await
+        между чтением и записью, поэтому счетчики остаются корректными.
+        
         Args:
             update: Объект обновления от Telegram
             context: Контекст бота
@@ -78,90 +385,183 @@ class IsItTrueBot:
         if not update.inline_query:
             self.logger.warning("Получен update без inline_query")
             return
+        
+        # При перегрузке устаревший запрос отбрасывается до любой работы над ним
+        decision = self.admission.check(update) if self.admission else None
+        if decision == SHED:
+            return
+        
+        # Пользователь продолжает печатать - отвечаем только на последний запрос
+        if self.coalescer and not await self.coalescer.admit(update.inline_query):
+            return
+        
+        started = time.perf_counter()
             
         query = update.inline_query.query
         user_id = update.inline_query.from_user.id if update.inline_query.from_user else "unknown"
-        self.logger.info(f"Получен inline-запрос: '{query}' от пользователя {user_id}")
+        language = update.inline_query.from_user.language_code if update.inline_query.from_user else None
+        if decision != DEGRADE:
+            self.query_logger.info("Получен inline-запрос: '%s' от пользователя %s", query, user_id)
         
         # Обновляем статистику
         self._update_stats()
+        if update.inline_query.from_user:
+            self.unique_users.add(update.inline_query.from_user.id)
         
         # Проверяем, есть ли текст запроса после имени бота
         query_text = query.strip()
         has_text_query = bool(query_text)
         
-        if has_text_query:
+        # По умолчанию ответы случайные и персональные - кешировать их нельзя
+        cache_time = 0
+        is_personal = True
+        
+        if decision == DEGRADE:
+            # Перегрузка: кнопка с заранее подготовленным ответом - без генерации,
+            # оформления вопроса и записи в лог. В статистике запрос считается
+            # по тому, что спросили, а не по виду упрощенного ответа
+            results_json, category = self._degraded_answer(language)
+            query_type = 'text' if has_text_query else 'button'
+            self.stats[f'{query_type}_queries'] += 1
+            self.stats['categories'][category] += 1
+            self.timeline.add(query_type)
+            self.timeline.add(category)
+        elif has_text_query:
             # Режим с текстом: сразу генерируем ответ с упоминанием запроса
-            response_text, category = response_generator.generate_random_response()
+            if BotConfig.DETERMINISTIC_ANSWERS:
+                # Ответ зависит только от вопроса, окна и языка - его может кешировать
+                # Telegram. Общий кеш Telegram различает запросы только по тексту, не по
+                # языку пользователя: при нескольких языках ответов общий кеш отдал бы
+                # пользователю ответ на чужом языке, поэтому кеш остается
+                # персональным (меньше попаданий, но ответ всегда на своем языке)
+                salt, cache_time = self._deterministic_salt()
+                is_personal = len(response_generator.languages) > 1
+                response_text, category = response_generator.generate_deterministic_response(
+                    query_text, salt, language
+                )
+            else:
+                response_text, category = response_generator.generate_random_response(language)
             
             # Формируем авторитетный ответ с упоминанием запроса
-            formatted_response = self._format_query_response(query_text, response_text, category)
+            formatted_response = self._format_query_response(query_text, response_text, category, language)
             
             # Обновляем статистику
             self.stats['text_queries'] += 1
             self.stats['categories'][category] += 1
+            self.timeline.add('text')
+            self.timeline.add(category)
+            query_key = sketch_key(query_text)
+            if query_key:
+                self.top_queries.add(query_key)
             
-            results = [
-                InlineQueryResultArticle(
-                    id="fact_check_query_result",
-                    title=f"Проверка: {query_text[:50]}{'...' if len(query_text) > 50 else ''}",
-                    description="Нажмите для получения результата фактчека",
-                    input_message_content=InputTextMessageContent(
-                        message_text=formatted_response,
-                        parse_mode=None
-                    ),
-                    thumbnail_url=self._get_neutral_icon_url()
-                )
-            ]
+            results_json = self.templates.query_result.render(
+                title=f"Проверка: {query_text[:50]}{'...' if len(query_text) > 50 else ''}",
+                message_text=formatted_response
+            )
             
-            self.logger.info(f"Сгенерирован ответ категории '{category}' для запроса: '{query_text[:30]}...'")
+            self.query_logger.info("Сгенерирован ответ категории '%s' для запроса: '%.30s...'", category, query_text)
         else:
             # Обычный режим: показываем кнопку, ответ генерируется при клике
             self.stats['button_queries'] += 1
+            self.timeline.add('button')
             
-            results = [
-                InlineQueryResultArticle(
-                    id="fact_check_result",
-                    title=BotConfig.INLINE_COMMAND_TEXT,
-                    description=BotConfig.INLINE_COMMAND_DESCRIPTION,
-                    input_message_content=InputTextMessageContent(
-                        message_text=self._generate_delayed_response(),  # Ответ генерируется при клике
-                        parse_mode=None
-                    ),
-                    thumbnail_url=self._get_neutral_icon_url()
-                )
-            ]
+            results_json = self.templates.button_result.render(
+                message_text=self._generate_delayed_response(language)  # Ответ генерируется при клике
+            )
             
-            self.logger.info(f"Показана кнопка для кнопочного режима")
+            self.query_logger.info("Показана кнопка для кнопочного режима")
         
         # Отправляем результат пользователю
-        await update.inline_query.answer(
-            results,
-            cache_time=0,  # Не кешируем результаты для получения разных ответов
-            is_personal=True,
-            button=InlineQueryResultsButton(
-                text="Как это работает?",
-                start_parameter="help"
+        # Результаты и кнопка уже сериализованы шаблонами и передаются как есть
+        answer_started = time.perf_counter()
+        try:
+            await update.inline_query.answer(
+                [],
+                cache_time=cache_time,
+                is_personal=is_personal,
+                **self.templates.answer_kwargs(results_json)
             )
-        )
+        except RequestDropped as e:
+            # Ответ устарел в очереди исходящих запросов - учтен в метриках планировщика
+            self.query_logger.info("Ответ на inline-запрос не отправлен: %s", e)
+            return
+        finished = time.perf_counter()
+        self.answer_latency.observe(finished - answer_started)
+        self.inline_latency.observe(finished - started)
+        self.timeline.observe_latency(finished - started)
     
-    def _generate_delayed_response(self) -> str:
+    def _deterministic_salt(self) -> Tuple[str, int]:
+        """
+        Возвращает соль текущего временного окна детерминированных ответов
+        и допустимое время кеширования ответа в Telegram.
+        
+        Кеш не должен пережить смену окна, иначе после ротации соли Telegram
+        продолжит показывать ответы из прошлого окна.
+        
+        Returns:
+            Tuple[str, int]: (соль, cache_time в секундах)
+        """
+        now = time.time()
+        window = int(now // BotConfig.DETERMINISTIC_WINDOW)
+        seconds_left = int((window + 1) * BotConfig.DETERMINISTIC_WINDOW - now)
+        salt = f"{BotConfig.DETERMINISTIC_SECRET}:{window}"
+        return salt, max(0, min(BotConfig.INLINE_CACHE_TIME, seconds_left))
+    
+    def _generate_delayed_response(self, language: Optional[str] = None) -> str:
         """
         Генерирует случайный ответ на момент отправки сообщения.
         Этот метод вызывается только когда пользователь нажимает на inline результат.
         
+        Args:
+            language: Код языка пользователя
+            
         Returns:
             str: Случайный ответ
         """
-        response_text, category = response_generator.generate_random_response()
+        response_text, category = response_generator.generate_random_response(language)
         
         # Обновляем статистику категорий при фактической генерации ответа
         self.stats['categories'][category] += 1
+        self.timeline.add(category)
         
-        self.logger.info(f"Сгенерирован ответ категории '{category}' при клике на кнопку: {response_text[:50]}...")
+        self.query_logger.info("Сгенерирован ответ категории '%s' при клике на кнопку: %.50s...", category, response_text)
         return response_text
     
-    def _format_query_response(self, query_text: str, response_text: str, category: str) -> str:
+    def _degraded_answer(self, language: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Возвращает заранее подготовленный ответ упрощенного пути (перегрузка).
+        
+        Для каждого языка ответов один раз генерируется и сериализуется
+        DEGRADED_ANSWERS_PER_LANGUAGE кнопочных результатов; при ответе один
+        из них выбирается случайно. После перезагрузки файла ответов набор
+        готовится заново.
+        
+        Args:
+            language: Код языка пользователя
+            
+        Returns:
+            Tuple[str, str]: (готовое значение results, категория ответа)
+        """
+        languages = response_generator.languages
+        code = (language or '').lower()
+        if code not in languages:
+            code = code.split('-')[0]
+        key = code if code in languages else None
+        
+        cached = self._degraded_answers.get(key)
+        if cached is None or cached[0] is not response_generator.corpus:
+            answers = [
+                (self.templates.button_result.render(message_text=response_text), category)
+                for response_text, category in response_generator.generate_batch(
+                    DEGRADED_ANSWERS_PER_LANGUAGE, key
+                )
+            ]
+            cached = (response_generator.corpus, answers)
+            self._degraded_answers[key] = cached
+        return random.choice(cached[1])
+    
+    def _format_query_response(self, query_text: str, response_text: str, category: str,
+                               language: Optional[str] = None) -> str:
         """
         Формирует авторитетный ответ с упоминанием запроса.
         
@@ -169,12 +569,13 @@ class IsItTrueBot:
             query_text: Текст запроса пользователя
             response_text: Стандартный ответ бота
             category: Категория ответа
+            language: Код языка пользователя (шаблон оформления берется из набора ответов)
             
         Returns:
             str: Форматированный ответ с упоминанием запроса
         """
         # Формируем итоговый ответ без префикса - только запрос и результат
-        formatted_response = f"📝 Запрос: \"{query_text}\"\n\n{response_text}"
+        formatted_response = response_generator.format_query_response(query_text, response_text, language)
         
         return formatted_response
     
@@ -214,26 +615,297 @@ class IsItTrueBot:
             update: Объект обновления
             context: Контекст с информацией об ошибке
         """
-        self.logger.error(f"Ошибка при обработке обновления: {context.error}")
+        self.logger.error("Ошибка при обработке обновления: %s", context.error)
+        self.errors.inc(type(context.error).__name__)
+        
+        # Telegram просит подождать или ответ уже устарел - еще один запрос
+        # только усугубит ограничение
+        if isinstance(context.error, (RetryAfter, RequestDropped)):
+            return
         
         # Если ошибка связана с inline-запросом, отправляем пустой результат
         if isinstance(update, Update) and update.inline_query:
             try:
                 await update.inline_query.answer([])
             except Exception as e:
-                self.logger.error(f"Не удалось отправить пустой ответ на inline-запрос: {e}")
+                self.logger.error("Не удалось отправить пустой ответ на inline-запрос: %s", e)
+    
+    async def _post_init(self, application: Application):
+        """Запускает фоновые задачи: сброс статистики, замер задержки loop и сервер метрик."""
+        if self.stats_store.persistent and not self._defer_stats_flush:
+            self._start_stats_flush()
+        
+        if self.worker:
+            self._stats_publish_task = asyncio.get_running_loop().create_task(self._stats_publish_loop())
+        
+        # Имя дополнительного бота без username в EXTRA_BOTS - из getMe
+        if not self.username:
+            self.username = application.bot.username
+        
+        if self.recorder:
+            self.recorder.start()
+        
+        if BotConfig.RESPONSES_RELOAD_INTERVAL and self.primary:
+            self._responses_reload_task = asyncio.get_running_loop().create_task(self._responses_reload_loop())
+        
+        self.loop_lag.start()
+        # Служебный порт у воркеров занимает супервизор, у дополнительных
+        # ботов - основной бот процесса
+        if BotConfig.METRICS_PORT and not self.worker and self.primary:
+            self.metrics_server = MetricsServer(BotConfig.METRICS_LISTEN, BotConfig.METRICS_PORT)
+            self.metrics_server.add_registry('/metrics', self.metrics)
+            self.metrics_server.add_route('/health', self._health)
+            await self.metrics_server.start()
+    
+    async def _health(self) -> Tuple[int, str, bytes]:
+        """
+        Проверка живости для Docker healthcheck.
+        
+        Ответ формирует сам event loop бота, поэтому зависший loop не ответит
+        вовсе. Бот считается нездоровым, если прием обновлений (polling или
+        webhook) остановлен или задержка loop превышает HEALTH_MAX_LOOP_LAG.
+        Время последнего обновления только сообщается: у бота могут быть
+        долгие периоды без запросов.
+        
+        Returns:
+            Tuple[int, str, bytes]: (200 или 503, Content-Type, JSON)
+        """
+        healthy, payload = self.health_status()
+        return (200 if healthy else 503), 'application/json', json.dumps(payload).encode('utf-8')
+    
+    def health_status(self) -> Tuple[bool, dict]:
+        """
+        Состояние бота для /health.
+        
+        Returns:
+            Tuple[bool, dict]: Здоров ли бот и данные ответа
+        """
+        updater = self.application.updater
+        receiving = bool(updater and updater.running)
+        loop_lag = self.loop_lag.last_lag
+        healthy = self.application.running and receiving and loop_lag <= BotConfig.HEALTH_MAX_LOOP_LAG
+        
+        now = time.time()
+        payload = {
+            'status': 'ok' if healthy else 'unhealthy',
+            'mode': BotConfig.RUN_MODE,
+            'receiving_updates': receiving,
+            'last_update_at': self.last_update_at,
+            'last_update_age_seconds': round(now - self.last_update_at, 3) if self.last_update_at else None,
+            'loop_lag_seconds': round(loop_lag, 4),
+            'uptime_seconds': round(now - self.stats['start_time'].timestamp(), 1),
+        }
+        return healthy, payload
+    
+    async def _post_shutdown(self, application: Application):
+        """Останавливает фоновые задачи и сохраняет последний снимок статистики."""
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await self.loop_lag.stop()
+        
+        if self._profile_task:
+            self._profile_task.cancel()
+            try:
+                await self._profile_task
+            except asyncio.CancelledError:
+                pass
+        
+        if self._responses_reload_task:
+            self._responses_reload_task.cancel()
+            try:
+                await self._responses_reload_task
+            except asyncio.CancelledError:
+                pass
+        
+        await self._stop_stats_flush()
+        self.stats_store.close()
+        
+        if self.recorder:
+            await self.recorder.stop()
+        
+        if self._stats_publish_task:
+            self._stats_publish_task.cancel()
+            try:
+                await self._stats_publish_task
+            except asyncio.CancelledError:
+                pass
+            self.worker.stats_table.write_row(self.worker.index, snapshot_stats(self.stats))
+    
+    async def _stats_publish_loop(self):
+        """Публикует статистику воркера в общую таблицу для /stats других воркеров."""
+        from src.supervisor import SHARED_STATS_INTERVAL
+        
+        while True:
+            self.worker.stats_table.write_row(self.worker.index, snapshot_stats(self.stats))
+            await asyncio.sleep(SHARED_STATS_INTERVAL)
+    
+    async def _responses_reload_loop(self):
+        """Раз в RESPONSES_RELOAD_INTERVAL секунд проверяет файл ответов и применяет изменения."""
+        while True:
+            await asyncio.sleep(BotConfig.RESPONSES_RELOAD_INTERVAL)
+            if self.corpus_file.changed():
+                await self._reload_responses()
+    
+    async def _reload_responses(self):
+        """
+        Загружает и применяет измененный файл ответов.
+        
+        Чтение и компиляция таблиц выполняются в отдельном потоке, подмена -
+        одним присваиванием в event loop, поэтому обработка запросов не
+        прерывается. Некорректный файл не применяется: бот продолжает
+        работать с прежними ответами.
+        """
+        def load():
+            corpus = self.corpus_file.load()
+            return corpus, response_generator.compile_corpus(corpus)
+        
+        try:
+            corpus, compiled = await asyncio.to_thread(load)
+        except ValueError as e:
+            self.logger.error("Изменения файла ответов не применены: %s", e)
+            return
+        
+        # Счетчики статистики созданы под набор категорий при запуске
+        if set(corpus.categories) != set(response_generator.responses):
+            self.logger.error(
+                "Изменения файла ответов не применены: набор категорий нельзя менять без перезапуска"
+            )
+            return
+        
+        response_generator.install(corpus, compiled)
+        self.logger.info("Ответы перезагружены из %s, языки: %s",
+                         BotConfig.RESPONSES_FILE, ', '.join(response_generator.languages))
+    
+    def _start_stats_flush(self):
+        self._stats_flush_task = asyncio.get_running_loop().create_task(self._stats_flush_loop())
+    
+    async def _stop_stats_flush(self):
+        """Останавливает периодический сброс и сохраняет статистику последний раз."""
+        if self._stats_flush_task:
+            self._stats_flush_task.cancel()
+            try:
+                await self._stats_flush_task
+            except asyncio.CancelledError:
+                pass
+            self._stats_flush_task = None
+            await self._flush_stats()
+    
+    async def _stats_flush_loop(self):
+        """Раз в STATS_FLUSH_INTERVAL секунд сбрасывает статистику в хранилище."""
+        while True:
+            await asyncio.sleep(BotConfig.STATS_FLUSH_INTERVAL)
+            await self._flush_stats()
+    
+    async def _flush_stats(self):
+        """
+        Сохраняет снимок статистики, если он изменился с прошлого сброса.
+        
+        Снимок снимается в event loop (согласованно с обработчиками),
+        а запись на диск выполняется в отдельном потоке.
+        """
+        snapshot = snapshot_stats(self.stats)
+        if snapshot == self._flushed_stats:
+            return
+        try:
+            await asyncio.to_thread(self.stats_store.save, snapshot)
+            self._flushed_stats = snapshot
+        except Exception as e:
+            self.logger.error("Не удалось сохранить статистику: %s", e)
     
     def _update_stats(self):
-        """Обновляет простую статистику"""
+        """
+        Обновляет простую статистику.
+        
+        Метод синхронный и не уступает управление event loop, поэтому
+        безопасен при конкурентной обработке обновлений.
+        """
         today = datetime.now().date()
         
         # Сбрасываем счетчик на новый день
         if today != self.stats['last_reset']:
             self.stats['today_queries'] = 0
             self.stats['last_reset'] = today
+            self.unique_users.clear()
+            self.top_queries.clear()
         
         self.stats['total_queries'] += 1
         self.stats['today_queries'] += 1
+        self.timeline.add('total')
+    
+    def _global_stats(self) -> dict:
+        """
+        Возвращает статистику для /stats.
+        
+        У воркера супервизора - сумма по всем воркерам из разделяемой памяти
+        (собственная строка берется из актуального словаря в памяти).
+        
+        Returns:
+            dict: Словарь в формате self.stats
+        """
+        if not self.worker:
+            return self.stats
+        stats = self.worker.stats_table.aggregate(self.worker.index, snapshot_stats(self.stats))
+        stats['categories'] = defaultdict(int, stats['categories'])
+        stats['start_time'] = self.stats['start_time']
+        return stats
+    
+    def _format_timeline(self) -> str:
+        """
+        Формирует строки /stats о форме трафика из поминутной истории.
+        
+        Все значения берутся из скользящих сумм и очереди пиков,
+        без обхода суточного буфера.
+        
+        Returns:
+            str: Фрагмент сообщения /stats
+        """
+        timeline = self.timeline
+        title = "⏳ **Динамика"
+        if self.worker:
+            # История не складывается между процессами - показываем свою
+            title += f" (воркер {self.worker.index + 1})"
+        lines = [f"{title}:**"]
+        
+        lines.append(f"⚡ Сейчас: {timeline.qps(5):.2f} запросов/с (за 5 мин)")
+        lines.append(f"🕐 За час: {timeline.window_sum('total', 60)} запросов")
+        
+        peak_count, peak_start = timeline.peak()
+        if peak_start is not None:
+            peak_time = datetime.fromtimestamp(peak_start).strftime('%H:%M')
+            lines.append(f"🏔 Пик за сутки: {peak_count} запросов/мин в {peak_time}")
+        
+        trend = timeline.trend(15)
+        if trend is not None:
+            arrow = "📈" if trend > 0.05 else "📉" if trend < -0.05 else "➡️"
+            lines.append(f"{arrow} Тренд: {trend:+.0%} за 15 мин к предыдущим 15 мин")
+        
+        latency_avg, latency_max = timeline.latency(5)
+        if latency_avg is not None:
+            lines.append(f"⏱ Время ответа (5 мин): ср. {latency_avg * 1000:.0f} мс, макс. {latency_max * 1000:.0f} мс")
+        
+        return "\n".join(lines) + "\n\n"
+    
+    def _format_audience(self) -> str:
+        """
+        Формирует строки /stats об уникальных пользователях и частых вопросах.
+        
+        Returns:
+            str: Фрагмент сообщения /stats
+        """
+        title = "👥 **Аудитория за сегодня"
+        if self.worker:
+            title += f" (воркер {self.worker.index + 1})"
+        lines = [f"{title}:**", f"🙋 Уникальных пользователей: ~{self.unique_users.estimate()}"]
+        
+        top = self.top_queries.top(5, TOP_QUERIES_MIN_COUNT)
+        if top:
+            lines.append("🔥 Частые вопросы:")
+            for position, (query_key, count, error) in enumerate(top, 1):
+                # Оценка Space-Saving может быть завышена на величину погрешности
+                count_str = f"{count}" if not error else f"~{count}"
+                lines.append(f"{position}. {escape_markdown(query_key)} - {count_str}")
+        
+        return "\n".join(lines) + "\n\n"
     
     async def cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
@@ -247,11 +919,11 @@ class IsItTrueBot:
             "2️⃣ Текстовый режим: `@{bot_username} ваш вопрос`\n\n"
             "🎯 **Пример:** `@{bot_username} правда что вода мокрая?`\n\n"
             "ℹ️ Команды: /help - помощь, /stats - статистика"
-        ).format(bot_username=BotConfig.BOT_USERNAME or 'bot_name')
+        ).format(bot_username=self.username or 'bot_name')
         
         await update.message.reply_text(start_message, parse_mode='Markdown')
         user_id = update.effective_user.id if update.effective_user else 'unknown'
-        self.logger.info(f"Отправлен ответ на /start пользователю {user_id}")
+        self.logger.info("Отправлен ответ на /start пользователю %s", user_id)
     
     async def cmd_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /help"""
@@ -272,75 +944,365 @@ class IsItTrueBot:
             "❌ 40% - отрицательные ответы\n"
             "⚠️ 20% - неопределённые ответы\n\n"
             "📈 Команды: /stats - статистика бота"
-        ).format(bot_username=BotConfig.BOT_USERNAME or 'bot_name')
+        ).format(bot_username=self.username or 'bot_name')
         
         await update.message.reply_text(help_message, parse_mode='Markdown')
         user_id = update.effective_user.id if update.effective_user else 'unknown'
-        self.logger.info(f"Отправлен ответ на /help пользователю {user_id}")
+        self.logger.info("Отправлен ответ на /help пользователю %s", user_id)
     
     async def cmd_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /stats"""
         if not update.message:
             return
-            
-        uptime = datetime.now() - self.stats['start_time']
+        
+        stats = self._global_stats()
+        uptime = datetime.now() - stats['start_time']
         uptime_str = f"{uptime.days} дн. {uptime.seconds // 3600} ч. {(uptime.seconds % 3600) // 60} мин."
         
         # Вычисляем проценты категорий
-        total_responses = sum(self.stats['categories'].values())
+        total_responses = sum(stats['categories'].values())
         if total_responses > 0:
-            positive_pct = (self.stats['categories']['positive'] / total_responses) * 100
-            negative_pct = (self.stats['categories']['negative'] / total_responses) * 100
-            uncertain_pct = (self.stats['categories']['uncertain'] / total_responses) * 100
+            positive_pct = (stats['categories']['positive'] / total_responses) * 100
+            negative_pct = (stats['categories']['negative'] / total_responses) * 100
+            uncertain_pct = (stats['categories']['uncertain'] / total_responses) * 100
         else:
             positive_pct = negative_pct = uncertain_pct = 0
         
         stats_message = (
             "📈 **Статистика бота**\n\n"
             f"🔄 **Время работы:** {uptime_str}\n"
-            f"📅 **За сегодня:** {self.stats['today_queries']} запросов\n"
-            f"📈 **Всего:** {self.stats['total_queries']} запросов\n\n"
+            f"📅 **За сегодня:** {stats['today_queries']} запросов\n"
+            f"📈 **Всего:** {stats['total_queries']} запросов\n\n"
             "📊 **По типам:**\n"
-            f"📝 Текстовые: {self.stats['text_queries']}\n"
-            f"🔘 Кнопка: {self.stats['button_queries']}\n\n"
+            f"📝 Текстовые: {stats['text_queries']}\n"
+            f"🔘 Кнопка: {stats['button_queries']}\n\n"
         )
+        stats_message += self._format_timeline()
+        stats_message += self._format_audience()
         
         if total_responses > 0:
             stats_message += (
                 "🎯 **Категории ответов:**\n"
-                f"✅ Положительные: {self.stats['categories']['positive']} ({positive_pct:.1f}%)\n"
-                f"❌ Отрицательные: {self.stats['categories']['negative']} ({negative_pct:.1f}%)\n"
-                f"⚠️ Неопределённые: {self.stats['categories']['uncertain']} ({uncertain_pct:.1f}%)\n"
+                f"✅ Положительные: {stats['categories']['positive']} ({positive_pct:.1f}%)\n"
+                f"❌ Отрицательные: {stats['categories']['negative']} ({negative_pct:.1f}%)\n"
+                f"⚠️ Неопределённые: {stats['categories']['uncertain']} ({uncertain_pct:.1f}%)\n"
             )
         
+        if self.coalescer:
+            stats_message += f"\n⏩ Схлопнуто устаревших запросов: {self.coalescer.superseded}\n"
+        
         stats_message += "\n📌 *Статистика обновляется в реальном времени*"
         
         await update.message.reply_text(stats_message, parse_mode='Markdown')
         user_id = update.effective_user.id if update.effective_user else 'unknown'
-        self.logger.info(f"Отправлена статистика пользователю {user_id}")
+        self.logger.info("Отправлена статистика пользователю %s", user_id)
+    
+    async def cmd_profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /profile (только для ADMIN_USER_IDS).
+        
+        /profile cpu [сек] - сэмплирующий профиль event loop,
+        /profile memory [сек] - рост памяти по tracemalloc.
+        Профиль снимается в фоне, результат приходит отдельным сообщением.
+        """
+        if not update.message:
+            return
+        
+        args = context.args or []
+        usage = (
+            "Использование: /profile cpu|memory [секунд]\n"
+            f"Окно - не больше {BotConfig.PROFILE_MAX_SECONDS:g} с, файлы - в {BotConfig.PROFILE_DIR}"
+        )
+        if not args or args[0] not in ProfileSession.KINDS:
+            status = f"Идет профилирование: {self.profiler.running}\n\n" if self.profiler.running else ""
+            await update.message.reply_text(status + usage)
+            return
+        
+        kind = args[0]
+        try:
+            seconds = float(args[1]) if len(args) > 1 else 30.0
+        except ValueError:
+            await update.message.reply_text(usage)
+            return
+        seconds = min(max(seconds, 1.0), BotConfig.PROFILE_MAX_SECONDS)
+        
+        if self._profile_task and not self._profile_task.done():
+            await update.message.reply_text(f"Уже идет профилирование: {self.profiler.running or kind}")
+            return
+        
+        self._profile_task = asyncio.get_running_loop().create_task(
+            self._profile_and_report(kind, seconds, update.message.chat_id)
+        )
+        await update.message.reply_text(f"Профилирование {kind} на {seconds:g} с запущено (pid {os.getpid()})")
+        self.logger.info("Профилирование %s на %s с по команде пользователя %s", kind, seconds, update.effective_user.id)
+    
+    async def _profile_and_report(self, kind: str, seconds: float, chat_id: int):
+        """Снимает профиль и отправляет сводку администратору."""
+        try:
+            files, summary = await self.profiler.run(kind, seconds)
+        except ProfileBusy as e:
+            await self.application.bot.send_message(chat_id, str(e))
+            return
+        except Exception as e:
+            self.logger.error("Не удалось снять профиль %s: %s", kind, e)
+            await self.application.bot.send_message(chat_id, f"Не удалось снять профиль: {e}")
+            return
+        
+        self.logger.info("Профиль %s записан: %s", kind, ', '.join(str(path) for path in files))
+        text = "Профиль готов:\n" + "\n".join(str(path) for path in files) + "\n\n" + "\n".join(summary)
+        await self.application.bot.send_message(chat_id, text)
     
     def run(self):
-        """Запускает бота"""
-        self.logger.info("Запуск бота 'Это правда?'...")
+        """Запускает бота в режиме, выбранном в BotConfig.RUN_MODE"""
+        self.logger.info("Запуск бота 'Это правда?' (режим: %s)...", BotConfig.RUN_MODE)
         
         # Добавляем обработчик ошибок
         self.application.add_error_handler(self.error_handler)
         
-        # Запускаем бота
-        self.application.run_polling(
-            allowed_updates=['inline_query', 'message']
+        if self.worker:
+            asyncio.run(self._run_worker())
+        elif BotConfig.RUN_MODE == 'webhook':
+            self._run_webhook()
+        elif BotConfig.HANDOFF_FILE:
+            asyncio.run(self._run_polling_handoff())
+        else:
+            self.application.run_polling(
+                allowed_updates=BotConfig.ALLOWED_UPDATES
+            )
+    
+    def _run_webhook(self):
+        """
+        Запускает бота в режиме webhook.
+        
+        Telegram сам доставляет обновления POST-запросами, поэтому каждое
+        обновление попадает в обработчики сразу, без цикла getUpdates.
+        Если сертификат не указан, считается, что TLS терминирует прокси.
+        """
+        webhook_url = BotConfig.get_webhook_url()
+        tls_mode = "TLS на стороне бота" if BotConfig.WEBHOOK_CERT else "TLS offload на прокси"
+        self.logger.info(
+            "Webhook: слушаем %s:%s, max_connections=%s, %s",
+            BotConfig.WEBHOOK_LISTEN, BotConfig.WEBHOOK_PORT, BotConfig.WEBHOOK_MAX_CONNECTIONS, tls_mode
+        )
+        
+        self.application.run_webhook(
+            listen=BotConfig.WEBHOOK_LISTEN,
+            port=BotConfig.WEBHOOK_PORT,
+            url_path=BotConfig.WEBHOOK_PATH.strip('/'),
+            cert=BotConfig.WEBHOOK_CERT,
+            key=BotConfig.WEBHOOK_KEY,
+            webhook_url=webhook_url,
+            allowed_updates=BotConfig.ALLOWED_UPDATES,
+            max_connections=BotConfig.WEBHOOK_MAX_CONNECTIONS,
+            secret_token=BotConfig.WEBHOOK_SECRET_TOKEN,
         )
+    
+    async def _run_polling_handoff(self):
+        """
+        Long polling с передачей приема обновлений между процессами (HANDOFF_FILE).
+        
+        Новый процесс полностью запускается, пока старый еще отвечает, и
+        начинает getUpdates с переданного offset сразу после того, как старый
+        отпустит блокировку. По SIGTERM/SIGINT прием останавливается, бот
+        дожидается ответов на полученные обновления (не дольше
+        SHUTDOWN_DRAIN_TIMEOUT) и передает offset, счетчики и оставшиеся
+        обновления следующему процессу. Порядок запуска и остановки - как
+        у Application.run_polling.
+        
+        Старый и новый процессы работают с одним файлом статистики (том data),
+        поэтому пишет в него только процесс, держащий блокировку: новый
+        начинает сброс статистики после получения блокировки, перечитав файл,
+        а старый сохраняет ее последний раз до того, как отпустить блокировку.
+        
+        Offset хранится в закрытом атрибуте Updater._last_update_id
+        (python-telegram-bot 20.3, версия закреплена в requirements.txt). Если
+        в установленной версии его нет, блокировка по-прежнему не дает двум
+        процессам запрашивать getUpdates одновременно, но состояние не
+        передается: прием запускается и останавливается как обычно.
+        """
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        
+        application = self.application
+        handoff = PollingHandoff(BotConfig.HANDOFF_FILE)
+        can_handoff = hasattr(application.updater, '_last_update_id')
+        if not can_handoff:
+            self.logger.warning("Updater не хранит offset в _last_update_id: прием обновлений "
+                                "не передается, только блокировка от одновременного getUpdates")
+        
+        def error_callback(exc):
+            application.create_task(application.process_error(error=exc, update=None))
+        
+        self._defer_stats_flush = True
+        try:
+            async with application:
+                await self._post_init(application)
+                state = await handoff.acquire(BotConfig.HANDOFF_WAIT)
+                if self.stats_store.persistent:
+                    # Пока блокировку держал старый процесс, файл статистики менял он:
+                    # перечитываем последний снимок (и номер слота для следующей записи)
+                    saved_stats = self.stats_store.load()
+                    if saved_stats and saved_stats['total_queries'] > self.stats['total_queries']:
+                        restore_stats(self.stats, saved_stats)
+                if state and can_handoff:
+                    self._apply_handoff(state)
+                if self.stats_store.persistent:
+                    self._start_stats_flush()
+                await application.updater.start_polling(
+                    allowed_updates=BotConfig.ALLOWED_UPDATES, error_callback=error_callback
+                )
+                await application.start()
+                await stop.wait()
+                
+                # Новых обновлений не запрашиваем; запрос getUpdates, прерванный
+                # на ответе, не подтвердил обновления - их получит новый процесс
+                await application.updater.stop()
+                if can_handoff:
+                    started = time.monotonic()
+                    pending = await self._drain(BotConfig.SHUTDOWN_DRAIN_TIMEOUT)
+                    # Последний сброс статистики - под блокировкой; после передачи
+                    # файл статистики принадлежит новому процессу
+                    await self._stop_stats_flush()
+                    # Offset следующего запроса хранит Updater (offset последнего + 1)
+                    handoff.save(application.updater._last_update_id, snapshot_stats(self.stats), pending)
+                    self.logger.info(
+                        "Прием обновлений передан за %.3f с: offset %s, необработанных обновлений %s",
+                        time.monotonic() - started, application.updater._last_update_id, len(pending)
+                    )
+                await application.stop()
+                if not can_handoff:
+                    await self._stop_stats_flush()
+        finally:
+            handoff.release()
+        await self._post_shutdown(application)
+    
+    def _apply_handoff(self, state: dict):
+        """Продолжает с состояния, переданного предыдущим процессом."""
+        self.application.updater._last_update_id = state['offset']
+        
+        stats = state.get('stats')
+        if stats and stats['total_queries'] > self.stats['total_queries']:
+            restore_stats(self.stats, stats)
+        
+        # Обновления, которые предыдущий процесс получил, но не успел обработать
+        updates = state.get('updates') or []
+        for data in updates:
+            self.update_queue.put_nowait(Update.de_json(data, self.application.bot))
+        self.logger.info("Прием обновлений принят от процесса %s: offset %s, необработанных обновлений %s",
+                         state.get('pid'), state['offset'], len(updates))
+    
+    async def _drain(self, timeout: float) -> list:
+        """
+        Дожидается обработки уже полученных обновлений, но не дольше timeout.
+        
+        Обработка включает ответ Bot API (answer() ждет планировщик исходящих
+        запросов), поэтому после drain ответы на полученные обновления отправлены.
+        
+        Args:
+            timeout: Сколько ждать, сек
+        
+        Returns:
+            list: Обновления, до которых очередь не дошла (JSON Telegram), -
+            их обработает следующий процесс
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        queue = self.update_queue
+        try:
+            await asyncio.wait_for(asyncio.shield(queue.join()), timeout)
+        except asyncio.TimeoutError:
+            pass
+        # При конкурентной обработке очередь пустеет, когда обновления
+        # переданы планировщику, а не обработаны
+        while self.update_scheduler and self.update_scheduler.in_flight and loop.time() < deadline:
+            await asyncio.sleep(0.01)
+        
+        pending = []
+        while not queue.empty():
+            update = queue.get_nowait()
+            queue.task_done()
+            if isinstance(update, Update):
+                pending.append(update.to_dict())
+        in_flight = self.update_scheduler.in_flight if self.update_scheduler else 0
+        if pending or in_flight:
+            self.logger.warning("За %s с не обработано обновлений: %s в очереди, %s в обработке",
+                                timeout, len(pending), in_flight)
+        return pending
+    
+    async def _run_worker(self):
+        """
+        Работает воркером супервизора до получения SIGTERM/SIGINT.
+        
+        Updater не используется: обновления приходят от супервизора кадрами
+        (длина + JSON) через unix-сокет и кладутся в очередь обновлений.
+        """
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        self._worker_connections = set()
+        
+        async with self.application:
+            await self._post_init(self.application)
+            await self.application.start()
+            server = await asyncio.start_unix_server(self._receive_updates, path=self.worker.socket_path)
+            self.logger.info("Воркер %s запущен", self.worker.index)
+            await stop.wait()
+            server.close()
+            for task in list(self._worker_connections):
+                task.cancel()
+            await asyncio.gather(*self._worker_connections, return_exceptions=True)
+            await server.wait_closed()
+            await self.application.stop()
+        await self._post_shutdown(self.application)
+    
+    async def _receive_updates(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Читает обновления от супервизора и передает их приложению."""
+        from src.supervisor import FRAME_ACK, FRAME_HEADER
+        
+        self._worker_connections.add(asyncio.current_task())
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                body = await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+                update = Update.de_json(json.loads(body), self.application.bot)
+                await self.application.update_queue.put(update)
+                # Супервизор отвечает Telegram 200 только после подтверждения
+                writer.write(FRAME_ACK)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # CancelledError - остановка воркера, соединение просто закрывается
+            pass
+        finally:
+            self._worker_connections.discard(asyncio.current_task())
+            writer.close()
 
 
 def main():
     """Главная функция для запуска бота"""
     try:
+        BotConfig.load()
+        if BotConfig.WORKERS > 1:
+            # Несколько процессов-воркеров за одним webhook
+            from src.supervisor import Supervisor
+            
+            BotConfig.setup_logging()
+            BotConfig.validate_config()
+            Supervisor(BotConfig.WORKERS).run()
+            return
+        if BotConfig.EXTRA_BOTS:
+            # Несколько ботов в одном процессе
+            from src.multibot import BotHost
+            
+            BotHost().run()
+            return
         bot = IsItTrueBot()
         bot.run()
     except KeyboardInterrupt:
         print("\nБот остановлен пользователем")
     except Exception as e:
-        logging.error(f"Критическая ошибка при запуске бота: {e}")
+        logging.error("Критическая ошибка при запуске бота: %s", e)
         sys.exit(1)
 
 
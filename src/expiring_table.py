@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator, Optional, Tuple
+
+
+class ExpiringTable:
+    """
+    Таблица записей в порядке поступления с удалением давних записей.
+
+    Записи хранятся в порядке времени поступления (повторная запись ключа
+    переносит его в конец), поэтому давние записи всегда в начале таблицы и
+    удаляются с начала, пока не встретится свежая. Удаление начинается, только
+    когда размер таблицы достиг prune_threshold: при перегрузке, когда все
+    записи свежие, проверка обходится в одно сравнение, а не в обход таблицы.
+    """
+
+    def __init__(self, max_age: float, prune_threshold: int):
+        """
+        Args:
+            max_age: Возраст записи (сек), после которого она считается брошенной
+            prune_threshold: Размер таблицы, начиная с которого удаляются давние записи
+        """
+        self.max_age = max_age
+        self.prune_threshold = prune_threshold
+        # key -> (время поступления по time.monotonic, значение)
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+
+    def put(self, key: Hashable, value: Any):
+        """Записывает значение с текущим временем поступления."""
+        now = time.monotonic()
+        if len(self._entries) >= self.prune_threshold:
+            self._expire(now - self.max_age)
+        self._entries.pop(key, None)
+        self._entries[key] = (now, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else default
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else default
+
+    def pop_arrival(self, key: Hashable) -> Optional[float]:
+        """Удаляет запись и возвращает время ее поступления (None - записи нет)."""
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def _expire(self, threshold: float):
+        entries = self._entries
+        while entries:
+            key, (arrived_at, _) = next(iter(entries.items()))
+            if arrived_at >= threshold:
+                break
+            del entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._entries)
@@ -0,0 +1,135 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Как часто новый процесс проверяет, отпустил ли старый блокировку, сек
+LOCK_POLL_INTERVAL = 0.02
+FORMAT_VERSION = 1
+
+
+class PollingHandoff:
+    """
+    Передача long polling от старого процесса бота новому при перезапуске.
+
+    Процесс, получающий обновления, держит блокировку (flock) файла
+    <path>.lock. Новый процесс заранее проходит весь запуск (импорт,
+    getMe, фоновые задачи) и ждет только эту блокировку. Старый процесс
+    по SIGTERM перестает запрашивать getUpdates, дожидается ответов на уже
+    полученные обновления, записывает в path offset следующего обновления,
+    счетчики статистики и не обработанные за отведенное время обновления,
+    и отпускает блокировку. Новый процесс продолжает с этого offset: Telegram
+    уже считает подтвержденными все обновления до него, поэтому повторов нет,
+    а не обработанные старым процессом обновления новый берет из файла.
+
+    Блокировка также не дает двум процессам одновременно вызывать getUpdates
+    (Telegram отвечает на это ошибкой Conflict). Файл и блокировка должны
+    лежать в каталоге, общем для старого и нового контейнера (том data).
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Файл передачи (JSON); рядом создается <path>.lock
+        """
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.logger = logging.getLogger(__name__)
+        self._lock_fd: Optional[int] = None
+
+    async def acquire(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Ждет, пока предыдущий процесс отпустит блокировку, и забирает его состояние.
+
+        Пока блокировка занята, старый процесс может запрашивать getUpdates,
+        и одновременный прием закончился бы ошибкой Conflict. Поэтому если
+        за timeout секунд блокировка не освободилась (старый процесс завис),
+        в лог пишется предупреждение, а ожидание продолжается: flock
+        отпускается и при завершении старого процесса, в том числе по kill.
+
+        Args:
+            timeout: Через сколько секунд ожидания предупредить о зависшем процессе
+
+        Returns:
+            Optional[Dict[str, Any]]: offset, stats и updates предыдущего
+            процесса или None, если передавать нечего
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + timeout
+        waited = False
+        warned = False
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._lock_fd = fd
+                break
+            except BlockingIOError:
+                if not warned and time.monotonic() >= deadline:
+                    warned = True
+                    self.logger.warning(
+                        "Предыдущий процесс не передал прием обновлений за %s с; ждем, пока он остановится "
+                        "(блокировка %s)", timeout, self.lock_path
+                    )
+                if not waited:
+                    self.logger.info("Ждем передачи приема обновлений от предыдущего процесса...")
+                    waited = True
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+        return self._take_state()
+
+    def _take_state(self) -> Optional[Dict[str, Any]]:
+        """Читает и удаляет файл передачи: состояние применяется один раз."""
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.error("Файл передачи %s не прочитан: %s", self.path, e)
+            return None
+        finally:
+            self.path.unlink(missing_ok=True)
+
+        if data.get('version') != FORMAT_VERSION:
+            self.logger.error("Неизвестная версия файла передачи %s: %s", self.path, data.get('version'))
+            return None
+        stats = data.get('stats')
+        if stats:
+            stats['last_reset'] = date.fromisoformat(stats['last_reset'])
+        return data
+
+    def save(self, offset: int, stats: Optional[Dict[str, Any]], updates: List[Dict[str, Any]]):
+        """
+        Записывает состояние для следующего процесса и отпускает блокировку.
+
+        Args:
+            offset: offset следующего запроса getUpdates
+            stats: Снимок статистики (snapshot_stats)
+            updates: Полученные, но не обработанные обновления (JSON Telegram)
+        """
+        if stats:
+            stats = dict(stats, last_reset=stats['last_reset'].isoformat())
+        data = {
+            'version': FORMAT_VERSION,
+            'saved_at': time.time(),
+            'pid': os.getpid(),
+            'offset': offset,
+            'stats': stats,
+            'updates': updates,
+        }
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+        self.release()
+
+    def release(self):
+        """Отпускает блокировку приема обновлений."""
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
@@ -1,17 +1,19 @@
 #!/usr/bin/env python3
 """
 Простая проверка здоровья бота для Docker
-Проверяет, что процесс бота запущен и отвечает
+Запрашивает /health у запущенного процесса бота
 """
-import sys
 import os
-import logging
-import signal
-from pathlib import Path
+import sys
+import json
+import urllib.error
+import urllib.request
+
+# Не импортируем модули бота: проверка должна стоить как можно меньше,
+# а о состоянии бота знает только сам процесс бота
+HEALTH_URL = os.getenv('HEALTH_URL') or f"http://127.0.0.1:{os.getenv('METRICS_PORT', '8000')}/health"
+TIMEOUT = float(os.getenv('HEALTH_TIMEOUT', '5'))
 
-# Добавляем корневую папку проекта в путь для импорта
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
 
 def check_bot_health():
     """
@@ -19,39 +21,20 @@ def check_bot_health():
     Возвращает 0 при успехе, 1 при ошибке
     """
     try:
-        # Проверяем, что можем импортировать основные модули
-        from config.settings import BotConfig
-        
-        # Проверяем, что конфигурация валидна
-        BotConfig.validate_config()
-        
-        # Проверяем, что BOT_TOKEN установлен
-        if not BotConfig.BOT_TOKEN:
-            print("ERROR: BOT_TOKEN не установлен")
-            return 1
-            
-        # Проверяем, что можем импортировать response generator
-        from src.response_generator import response_generator
-        
-        # Тестируем генерацию ответа
-        response_text, category = response_generator.generate_random_response()
-        if not response_text or not category:
-            print("ERROR: Не удалось сгенерировать ответ")
-            return 1
-            
-        print("OK: Бот здоров и готов к работе")
-        return 0
-        
-    except ImportError as e:
-        print(f"ERROR: Ошибка импорта модулей: {e}")
-        return 1
-    except ValueError as e:
-        print(f"ERROR: Ошибка конфигурации: {e}")
+        with urllib.request.urlopen(HEALTH_URL, timeout=TIMEOUT) as response:
+            payload = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        # 503 - процесс отвечает, но бот нездоров; тело содержит подробности
+        print(f"ERROR: {e.code} {e.read().decode('utf-8', 'replace')}")
         return 1
     except Exception as e:
-        print(f"ERROR: Неожиданная ошибка: {e}")
+        print(f"ERROR: Бот не отвечает на {HEALTH_URL}: {e}")
         return 1
 
+    print(f"OK: {json.dumps(payload, ensure_ascii=False)}")
+    return 0
+
+
 if __name__ == "__main__":
     exit_code = check_bot_health()
-    sys.exit(exit_code)
\ No newline at end of file
+    sys.exit(exit_code)
@@ -0,0 +1,122 @@
+import asyncio
+from typing import Dict, Optional
+
+from telegram import InlineQuery, Update
+
+from src.expiring_table import ExpiringTable
+
+
+class _UserQueryState:
+    """Последний inline-запрос пользователя и событие его вытеснения."""
+
+    __slots__ = ('query_id', 'superseded')
+
+    def __init__(self, query_id: str):
+        self.query_id = query_id
+        self.superseded = asyncio.Event()
+
+
+class InlineQueryCoalescer:
+    """
+    Схлопывание "шторма" inline-запросов при наборе текста.
+
+    Telegram присылает новый inline-запрос почти на каждый введенный символ.
+    Ответ нужен только на последний из них, поэтому:
+    - при поступлении нового запроса пользователя все его предыдущие запросы
+      считаются устаревшими и отбрасываются без генерации ответа;
+    - если задано окно тишины, запрос ждет его окончания и отвечается,
+      только если за это время от пользователя не пришло ничего нового.
+      Ожидающий запрос просыпается сразу, как только его вытеснили.
+
+    О поступлении запросов схлопыватель узнает из очереди обновлений
+    (on_arrival), то есть раньше, чем запрос дойдет до обработчика.
+    """
+
+    # Порог размера таблицы, после которого из нее удаляются давние записи
+    PRUNE_THRESHOLD = 10000
+    # Возраст записи (сек), после которого она считается брошенной
+    STALE_ENTRY_AGE = 60.0
+
+    def __init__(self, quiet_window: float = 0.0):
+        """
+        Args:
+            quiet_window: Окно тишины в секундах (0 - только отбрасывать устаревшие)
+        """
+        self.quiet_window = quiet_window
+        # user_id -> _UserQueryState в порядке поступления запросов
+        self._latest = ExpiringTable(self.STALE_ENTRY_AGE, self.PRUNE_THRESHOLD)
+
+        # Счетчики
+        self.received = 0
+        self.admitted = 0
+        self.superseded = 0
+
+    @staticmethod
+    def _user_id(inline_query: InlineQuery) -> Optional[int]:
+        return inline_query.from_user.id if inline_query.from_user else None
+
+    def on_arrival(self, update: object):
+        """Регистрирует поступивший inline-запрос как последний для пользователя."""
+        if not isinstance(update, Update) or not update.inline_query:
+            return
+        user_id = self._user_id(update.inline_query)
+        if user_id is None:
+            return
+
+        self.received += 1
+        previous = self._latest.get(user_id)
+        if previous is not None:
+            previous.superseded.set()
+        self._latest.put(user_id, _UserQueryState(update.inline_query.id))
+
+    async def admit(self, inline_query: InlineQuery) -> bool:
+        """
+        Решает, нужно ли отвечать на inline-запрос.
+
+        Args:
+            inline_query: Inline-запрос
+
+        Returns:
+            bool: False, если запрос вытеснен более новым запросом того же пользователя
+        """
+        user_id = self._user_id(inline_query)
+        if user_id is None:
+            return True
+
+        state = self._latest.get(user_id)
+        if state is None:
+            # Запрос прошел мимо очереди обновлений - обрабатываем как обычно
+            return True
+        if state.query_id != inline_query.id:
+            self.superseded += 1
+            return False
+
+        if self.quiet_window > 0:
+            try:
+                await asyncio.wait_for(state.superseded.wait(), self.quiet_window)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                self.superseded += 1
+                return False
+
+        # Запрос допущен к ответу - запись пользователя больше не нужна
+        if self._latest.get(user_id) is state:
+            self._latest.pop(user_id)
+        self.admitted += 1
+        return True
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        Возвращает счетчики схлопывания.
+
+        Returns:
+            Dict[str, float]: received, admitted, superseded (сэкономленные ответы), pending_users
+        """
+        return {
+            'quiet_window': self.quiet_window,
+            'received': self.received,
+            'admitted': self.admitted,
+            'superseded': self.superseded,
+            'pending_users': len(self._latest),
+        }
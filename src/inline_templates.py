@@ -0,0 +1,124 @@
+import json
+import re
+from typing import Callable, Dict, List, Sequence
+
+from telegram import InlineQueryResult, InlineQueryResultArticle, InlineQueryResultsButton, InputTextMessageContent
+
+
+def _text_content(message_text: str) -> InputTextMessageContent:
+    # Явные None вместо DefaultValue: без telegram.ext.Defaults бот подставил бы то же самое
+    return InputTextMessageContent(message_text=message_text, parse_mode=None, disable_web_page_preview=None)
+
+
+class ResultTemplate:
+    """
+    Заранее сериализованный список inline-результатов с переменными полями.
+
+    Объект результата строится один раз с маркерами вместо переменных полей,
+    сериализуется в JSON и разрезается по маркерам. При ответе в готовую
+    строку подставляются только JSON-закодированные значения полей - без
+    создания объектов telegram и без повторного to_dict()/json.dumps().
+    """
+
+    def __init__(self, factory: Callable[..., InlineQueryResult], fields: Sequence[str]):
+        """
+        Args:
+            factory: Функция, строящая результат по значениям переменных полей
+            fields: Имена переменных полей (аргументы factory)
+        """
+        markers = {field: f'\x00{field}\x00' for field in fields}
+        payload = json.dumps([factory(**markers).to_dict()], ensure_ascii=False)
+
+        pattern = '|'.join(re.escape(json.dumps(marker)) for marker in markers.values())
+        by_marker = {json.dumps(marker): field for field, marker in markers.items()}
+
+        self._parts: List[str] = []
+        self._fields: List[str] = []
+        position = 0
+        for match in re.finditer(pattern, payload):
+            self._parts.append(payload[position:match.start()])
+            self._fields.append(by_marker[match.group(0)])
+            position = match.end()
+        self._parts.append(payload[position:])
+
+        missing = set(fields) - set(self._fields)
+        if missing:
+            raise ValueError(f"Поля не найдены в результате: {', '.join(sorted(missing))}")
+
+    def render(self, **values: str) -> str:
+        """
+        Возвращает JSON-строку параметра results с подставленными значениями.
+
+        Args:
+            **values: Значения переменных полей
+
+        Returns:
+            str: Готовое значение параметра results для answerInlineQuery
+        """
+        parts = self._parts
+        chunks = [parts[0]]
+        for index, field in enumerate(self._fields):
+            chunks.append(json.dumps(values[field], ensure_ascii=False))
+            chunks.append(parts[index + 1])
+        return ''.join(chunks)
+
+
+class InlineResultTemplates:
+    """
+    Шаблоны всех типов inline-ответов бота, собираемые один раз при запуске.
+
+    Используются вместе с api_kwargs метода answer(): готовые JSON-строки
+    передаются в параметры results и button как есть.
+    """
+
+    def __init__(self, icon_url: str, command_text: str, command_description: str,
+                 button_text: str, start_parameter: str):
+        """
+        Args:
+            icon_url: Иконка результатов
+            command_text: Заголовок результата в кнопочном режиме
+            command_description: Описание результата в кнопочном режиме
+            button_text: Текст кнопки над результатами
+            start_parameter: Параметр /start для кнопки
+        """
+        # Кнопочный режим: меняется только текст сообщения
+        self.button_result = ResultTemplate(
+            lambda message_text: InlineQueryResultArticle(
+                id="fact_check_result",
+                title=command_text,
+                description=command_description,
+                input_message_content=_text_content(message_text),
+                thumbnail_url=icon_url,
+            ),
+            ('message_text',),
+        )
+
+        # Текстовый режим: меняются заголовок и текст сообщения
+        self.query_result = ResultTemplate(
+            lambda title, message_text: InlineQueryResultArticle(
+                id="fact_check_query_result",
+                title=title,
+                description="Нажмите для получения результата фактчека",
+                input_message_content=_text_content(message_text),
+                thumbnail_url=icon_url,
+            ),
+            ('title', 'message_text'),
+        )
+
+        # Кнопка над результатами постоянна целиком
+        self.button_json = json.dumps(
+            InlineQueryResultsButton(text=button_text, start_parameter=start_parameter).to_dict(),
+            ensure_ascii=False,
+        )
+
+    def answer_kwargs(self, results_json: str) -> Dict[str, Dict[str, str]]:
+        """
+        Возвращает аргументы для InlineQuery.answer с готовыми JSON-строками.
+
+        Args:
+            results_json: Результат ResultTemplate.render()
+
+        Returns:
+            Dict: {'api_kwargs': {...}} - передается в answer() вместе с пустым списком результатов
+        """
+        return {'api_kwargs': {'results': results_json, 'button': self.button_json}}
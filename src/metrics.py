@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Границы бакетов (сек) для задержек обработки и ответов Bot API
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(str(value))}"' for name, value in labels.items()) + '}'
+
+
+class Metric:
+    """Базовый класс метрики в текстовом формате Prometheus."""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, help_text: str):
+        """
+        Args:
+            name: Имя метрики
+            help_text: Описание для строки # HELP
+        """
+        self.name = name
+        self.help_text = help_text
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        """Возвращает тройки (имя, метки, значение) для вывода."""
+        return ()
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.type_name}']
+        for name, labels, value in self.samples():
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    """Монотонный счетчик. inc() - одно сложение, без выделения памяти."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def samples(self):
+        yield self.name, {}, self.value
+
+
+class LabeledCounter(Metric):
+    """
+    Счетчик с одной меткой (например, тип ошибки).
+
+    Значения меток заранее неизвестны, поэтому дочерний счетчик создается
+    при первом появлении метки; дальше inc() - поиск в словаре и сложение.
+    """
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str, label: str):
+        super().__init__(name, help_text)
+        self.label = label
+        self.values: Dict[str, int] = {}
+
+    def inc(self, label_value: str, amount: int = 1):
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def samples(self):
+        for label_value, value in self.values.items():
+            yield self.name, {self.label: label_value}, value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма с фиксированными бакетами.
+
+    Массив счетчиков выделяется один раз; observe() - двоичный поиск по
+    границам и два сложения. Накопительные значения бакетов считаются
+    только при выводе.
+    """
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Args:
+            name: Имя метрики
+            help_text: Описание для строки # HELP
+            buckets: Возрастающие верхние границы бакетов (+Inf добавляется автоматически)
+        """
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            yield f'{self.name}_bucket', {'le': _format_value(bound)}, cumulative
+        yield f'{self.name}_sum', {}, self.sum
+        yield f'{self.name}_count', {}, self.count
+
+
+class CallbackMetric(Metric):
+    """
+    Метрика, значение которой читается при выводе.
+
+    Подходит для счетчиков, которые уже ведутся в другом месте
+    (self.stats, планировщик, схлопыватель): на горячем пути они ничего
+    дополнительно не стоят.
+    """
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float],
+                 type_name: str = 'gauge'):
+        """
+        Args:
+            name: Имя метрики
+            help_text: Описание для строки # HELP
+            callback: Функция, возвращающая текущее значение
+            type_name: 'gauge' или 'counter'
+        """
+        super().__init__(name, help_text)
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self):
+        yield self.name, {}, self.callback()
+
+
+class CallbackFamily(Metric):
+    """Метрика с одной меткой, значения которой читаются при выводе из словаря."""
+
+    def __init__(self, name: str, help_text: str, label: str,
+                 callback: Callable[[], Dict[str, float]], type_name: str = 'gauge'):
+        super().__init__(name, help_text)
+        self.label = label
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self):
+        for label_value, value in self.callback().items():
+            yield self.name, {self.label: label_value}, value
+
+
+class MetricsRegistry:
+    """Набор метрик, выводимых одной страницей /metrics."""
+
+    def __init__(self, prefix: str = ''):
+        """
+        Args:
+            prefix: Префикс имен всех метрик
+        """
+        self.prefix = prefix
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        metric.name = self.prefix + metric.name
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self.register(Counter(name, help_text))
+
+    def labeled_counter(self, name: str, help_text: str, label: str) -> LabeledCounter:
+        return self.register(LabeledCounter(name, help_text, label))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, buckets))
+
+    def callback(self, name: str, help_text: str, callback: Callable[[], float],
+                 type_name: str = 'gauge') -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, callback, type_name))
+
+    def callback_family(self, name: str, help_text: str, label: str,
+                        callback: Callable[[], Dict[str, float]], type_name: str = 'gauge') -> CallbackFamily:
+        return self.register(CallbackFamily(name, help_text, label, callback, type_name))
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+
+        Returns:
+            str: Тело ответа /metrics
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class LoopLagMonitor:
+    """
+    Измеряет задержку event loop.
+
+    Задача засыпает на interval секунд и смотрит, насколько позже она
+    проснулась. Если обработчики надолго занимают loop (CPU, блокирующий
+    ввод-вывод), задержка растет.
+    """
+
+    def __init__(self, interval: float = 0.5, histogram: Optional[Histogram] = None):
+        """
+        Args:
+            interval: Период измерений, сек
+            histogram: Гистограмма, в которую пишутся измерения (необязательно)
+        """
+        self.interval = interval
+        self.histogram = histogram
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.last_lag = lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if self.histogram:
+                self.histogram.observe(lag)
+
+
+# Обработчик пути: возвращает (код ответа, Content-Type, тело)
+RouteHandler = Callable[[], Awaitable[Tuple[int, str, bytes]]]
+
+
+class MetricsServer:
+    """
+    Минимальный HTTP-сервер для служебных эндпоинтов (/metrics и т.п.).
+
+    Работает в том же event loop, что и бот, поэтому отдает актуальные
+    значения без синхронизации. Понимает только GET без тела запроса,
+    каждое соединение закрывается после ответа.
+    """
+
+    def __init__(self, host: str, port: int):
+        """
+        Args:
+            host: Адрес, на котором слушает сервер
+            port: Порт
+        """
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger(__name__)
+        self._routes: Dict[str, RouteHandler] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def add_route(self, path: str, handler: RouteHandler):
+        """
+        Регистрирует обработчик пути.
+
+        Args:
+            path: Путь, например '/metrics'
+            handler: Корутина без аргументов, возвращающая (код, Content-Type, тело)
+        """
+        self._routes[path] = handler
+
+    def add_registry(self, path: str, registry: MetricsRegistry):
+        """Отдает метрики реестра по указанному пути."""
+        async def handler():
+            return 200, 'text/plain; version=0.0.4; charset=utf-8', registry.render().encode('utf-8')
+        self.add_route(path, handler)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info("Служебный HTTP-сервер слушает %s:%s", self.host, self.port)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            # Заголовки не нужны, но их надо дочитать до пустой строки
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) < 2 or parts[0] != 'GET':
+                status, content_type, body = 405, 'text/plain', b'Method Not Allowed\n'
+            else:
+                handler = self._routes.get(parts[1].split('?', 1)[0])
+                if handler is None:
+                    status, content_type, body = 404, 'text/plain', b'Not Found\n'
+                else:
+                    status, content_type, body = await handler()
+
+            reason = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed', 503: 'Service Unavailable'}
+            writer.write(
+                f'HTTP/1.1 {status} {reason.get(status, "")}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                'Connection: close\r\n\r\n'.encode('latin-1') + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            self.logger.error("Ошибка служебного HTTP-сервера: %s", e)
+        finally:
+            writer.close()
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+import signal
+from typing import List, Tuple
+
+from config.settings import BotConfig
+from src.bot import IsItTrueBot
+
+
+class BotHost:
+    """
+    Несколько ботов (BOT_TOKEN и EXTRA_BOTS) в одном процессе.
+
+    Каждый бот - обычный IsItTrueBot со своим Application, статистикой,
+    лимитами исходящих запросов и long polling. Общие на весь процесс:
+    event loop, пул соединений исходящих методов Bot API, корпус ответов
+    (response_generator) и сеанс /profile. Дополнительный бот добавляет
+    к процессу только свои объекты, а не интерпретатор с библиотеками.
+
+    Служебный HTTP-сервер держит основной бот: метрики дополнительных
+    ботов отдаются по /metrics/<id бота>, /health сообщает о всех ботах.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        primary = IsItTrueBot()
+        self.bots: List[IsItTrueBot] = [primary]
+        for token, username in BotConfig.EXTRA_BOTS:
+            bot = IsItTrueBot(token=token, username=username, request=primary.request)
+            bot.profiler = primary.profiler
+            self.bots.append(bot)
+
+    def run(self):
+        """Запускает всех ботов в режиме polling до получения SIGTERM/SIGINT."""
+        self.logger.info("Запуск %s ботов 'Это правда?' в одном процессе...", len(self.bots))
+        asyncio.run(self._run())
+
+    async def _run(self):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        started: List[IsItTrueBot] = []
+        try:
+            # Тот же порядок, что у Application.run_polling
+            for bot in self.bots:
+                await self._start_bot(bot)
+                started.append(bot)
+
+            metrics_server = self.bots[0].metrics_server
+            if metrics_server:
+                for bot in self.bots[1:]:
+                    metrics_server.add_registry(f'/metrics/{bot.bot_id}', bot.metrics)
+                metrics_server.add_route('/health', self._health)
+
+            self.logger.info("Боты запущены: %s", ', '.join(f'@{bot.username}' for bot in self.bots))
+            await stop.wait()
+        finally:
+            # Основной бот останавливается последним: его сервер метрик и
+            # перечитывание ответов нужны остальным
+            for bot in reversed(started):
+                await self._stop_bot(bot)
+
+    async def _start_bot(self, bot: IsItTrueBot):
+        application = bot.application
+        application.add_error_handler(bot.error_handler)
+
+        def error_callback(exc):
+            application.create_task(application.process_error(error=exc, update=None))
+
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.updater.start_polling(allowed_updates=BotConfig.ALLOWED_UPDATES,
+                                                error_callback=error_callback)
+        await application.start()
+
+    async def _stop_bot(self, bot: IsItTrueBot):
+        application = bot.application
+        try:
+            if application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await application.shutdown()
+        finally:
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+
+    async def _health(self) -> Tuple[int, str, bytes]:
+        """Процесс здоров, только если здоровы все боты."""
+        statuses = [bot.health_status() for bot in self.bots]
+        healthy = all(bot_healthy for bot_healthy, _ in statuses)
+        payload = {
+            'status': 'ok' if healthy else 'unhealthy',
+            'mode': BotConfig.RUN_MODE,
+            'bots': {bot.username or bot.bot_id: status for bot, (_, status) in zip(self.bots, statuses)},
+        }
+        return (200 if healthy else 503), 'application/json', json.dumps(payload).encode('utf-8')
@@ -0,0 +1,256 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Сколько кадров стека хранит tracemalloc для каждого выделения памяти
+TRACEMALLOC_FRAMES = 10
+# Сколько строк попадает в краткую сводку профиля
+SUMMARY_LINES = 10
+# Вершина стека потока event loop, ожидающего событий (selectors.*.select):
+# такие сэмплы - простой
+IDLE_FUNCTIONS = frozenset({'select'})
+
+
+class ProfileBusy(Exception):
+    """Профилирование уже идет: одновременно возможен только один сеанс."""
+
+
+def _frame_label(code, cache: Dict[Any, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        label = cache[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик одного потока.
+
+    Фоновый поток раз в interval секунд читает текущий стек целевого
+    потока через sys._current_frames() и считает одинаковые стеки.
+    Целевой поток не инструментируется, поэтому накладные расходы
+    ограничены частотой сэмплов, а не числом вызовов функций.
+    Результат - свернутые стеки (формат flamegraph.pl и speedscope).
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        """
+        Args:
+            thread_id: Идентификатор профилируемого потока (threading.get_ident())
+            interval: Период сэмплирования, сек
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        labels = self._labels
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code, labels))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[';'.join(stack)] += 1
+                self.samples += 1
+
+    def folded(self) -> str:
+        """Свернутые стеки: 'корень;...;лист количество' по строке на стек."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit: int = SUMMARY_LINES) -> List[str]:
+        """
+        Краткая сводка: доля простоя и функции, чаще всего оказывавшиеся на вершине стека.
+
+        Returns:
+            List[str]: Строки сводки
+        """
+        idle = 0
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            if leaf.split(' ', 1)[0] in IDLE_FUNCTIONS:
+                idle += count
+            else:
+                leaves[leaf] += count
+        total = self.samples or 1
+        lines = [f"Сэмплов: {self.samples}, простой event loop: {idle / total:.0%}"]
+        for leaf, count in leaves.most_common(limit):
+            lines.append(f"{count / total:6.1%}  {leaf}")
+        return lines
+
+
+def _tracemalloc_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+                        limit: int) -> Tuple[List[str], List[str]]:
+    """Разница снимков памяти: полный отчет по строкам и краткая сводка."""
+    stats = after.compare_to(before, 'lineno')
+    current = sum(stat.size for stat in after.statistics('filename'))
+    report = [f"Отслеживается {current / 1024:.1f} КиБ; рост по строкам кода:"]
+    report.extend(str(stat) for stat in stats)
+
+    growth = sum(stat.size_diff for stat in stats)
+    summary = [f"Отслеживается {current / 1024:.1f} КиБ, изменение за окно {growth / 1024:+.1f} КиБ"]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        summary.append(
+            f"{stat.size_diff / 1024:+8.1f} КиБ {stat.count_diff:+6d}  {os.path.basename(frame.filename)}:{frame.lineno}"
+        )
+    return report, summary
+
+
+class ProfileSession:
+    """
+    Профилирование по запросу на ограниченное время.
+
+    - 'cpu' - сэмплы стека потока event loop; файл .folded со свернутыми
+      стеками открывается flamegraph.pl или https://www.speedscope.app;
+    - 'memory' - tracemalloc на время окна; снимок в конце сохраняется в
+      .tracemalloc (tracemalloc.Snapshot.load), разница с началом окна -
+      в .txt. tracemalloc заметно замедляет выделение памяти, поэтому
+      включается только на окно.
+
+    Одновременно идет не больше одного сеанса.
+    """
+
+    KINDS = ('cpu', 'memory')
+
+    def __init__(self, directory: str, sample_interval: float = 0.005):
+        """
+        Args:
+            directory: Каталог для файлов профилей
+            sample_interval: Период сэмплирования стека для 'cpu', сек
+        """
+        self.directory = Path(directory)
+        self.sample_interval = sample_interval
+        self.running: Optional[str] = None
+
+    def _path(self, kind: str, suffix: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        return self.directory / f"{kind}-{stamp}-{os.getpid()}{suffix}"
+
+    async def run(self, kind: str, seconds: float) -> Tuple[List[Path], List[str]]:
+        """
+        Профилирует текущий процесс seconds секунд.
+
+        Должна вызываться из потока event loop: для 'cpu' профилируется именно он.
+
+        Args:
+            kind: 'cpu' или 'memory'
+            seconds: Длительность окна
+
+        Returns:
+            Tuple[List[Path], List[str]]: Записанные файлы и строки краткой сводки
+
+        Raises:
+            ProfileBusy: Если уже идет другой сеанс
+            ValueError: Если kind неизвестен
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Неизвестный вид профиля: {kind} (ожидается {' или '.join(self.KINDS)})")
+        if self.running:
+            raise ProfileBusy(f"Уже идет профилирование: {self.running}")
+
+        self.running = kind
+        try:
+            if kind == 'cpu':
+                return await self._run_cpu(seconds)
+            return await self._run_memory(seconds)
+        finally:
+            self.running = None
+
+    async def _run_cpu(self, seconds: float) -> Tuple[List[Path], List[str]]:
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+
+        path = self._path('cpu', '.folded')
+        await asyncio.to_thread(path.write_text, sampler.folded(), 'utf-8')
+        return [path], sampler.summary()
+
+    async def _run_memory(self, seconds: float) -> Tuple[List[Path], List[str]]:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot()
+            await asyncio.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started_here:
+                tracemalloc.stop()
+
+        # Сравнение и запись - в отдельном потоке, чтобы не задерживать обработчики
+        snapshot_path = self._path('memory', '.tracemalloc')
+        report_path = snapshot_path.with_suffix('.txt')
+        report, summary = await asyncio.to_thread(_tracemalloc_report, before, after, SUMMARY_LINES)
+        await asyncio.to_thread(after.dump, str(snapshot_path))
+        await asyncio.to_thread(report_path.write_text, '\n'.join(report) + '\n', 'utf-8')
+        return [snapshot_path, report_path], summary
+
+
+class HandlerTimer:
+    """
+    Счетчики времени работы обработчиков: вызовы, суммарное и максимальное время.
+
+    Время - от входа в обработчик до выхода, включая ожидание ответа
+    Bot API. Учет - два сложения и сравнение на вызов.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.max_seconds: Dict[str, float] = {}
+
+    def wrap(self, name: str, callback: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """
+        Оборачивает обработчик PTB учетом времени.
+
+        Args:
+            name: Имя обработчика в метриках
+            callback: Корутина-обработчик (update, context)
+
+        Returns:
+            Callable: Обработчик с учетом времени
+        """
+        self.calls[name] = 0
+        self.seconds[name] = 0.0
+        self.max_seconds[name] = 0.0
+
+        async def timed(update, context):
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.calls[name] += 1
+                self.seconds[name] += elapsed
+                if elapsed > self.max_seconds[name]:
+                    self.max_seconds[name] = elapsed
+
+        return timed
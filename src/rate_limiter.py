@@ -0,0 +1,311 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+from telegram import Update
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import BaseRateLimiter
+
+from src.expiring_table import ExpiringTable
+
+# Приоритеты исходящих запросов: меньше - раньше
+PRIORITY_INLINE = 0
+PRIORITY_DEFAULT = 1
+
+# Сколько сообщений подряд можно отправить в один чат без паузы
+CHAT_BURST = 3
+# Лимит Telegram для групп - 20 сообщений в минуту
+GROUP_CHAT_RATE = 20 / 60
+# Больше стольких корзин чатов - удаляем полные (давно неактивные)
+CHAT_BUCKETS_MAX = 10000
+# Размер таблицы времени поступления inline-запросов, с которого удаляются давние
+INLINE_ARRIVALS_PRUNE_THRESHOLD = 1000
+
+
+class RequestDropped(TelegramError):
+    """Запрос к Bot API не отправлен: ответ устарел бы раньше, чем его можно отправить."""
+
+
+class TokenBucket:
+    """
+    Корзина токенов: rate запросов в секунду с допустимым всплеском capacity.
+
+    rate = 0 - без ограничения.
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Сколько секунд ждать до появления токена."""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        """Забирает токен (должен быть доступен - см. wait_time)."""
+        if self.rate:
+            self._refill(now)
+            self.tokens -= 1
+
+    def reserve(self, now: float) -> float:
+        """
+        Резервирует токен, даже если его еще нет.
+
+        Returns:
+            float: Через сколько секунд зарезервированный токен станет доступен
+        """
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class FloodControlLimiter(BaseRateLimiter[int]):
+    """
+    Планировщик исходящих запросов к Bot API.
+
+    - Общая корзина токенов (global_rate запросов в секунду) на все запросы
+      бота. Когда токенов нет, запросы ждут в очереди с приоритетами: ответы
+      на inline-запросы (PRIORITY_INLINE) отправляются раньше ответов на
+      команды. Приоритет можно передать и через rate_limit_args.
+    - Корзина на каждый чат для запросов с chat_id (chat_rate в секунду,
+      для групп не больше 20 в минуту); сообщения одного чата уходят по порядку.
+    - RetryAfter от Telegram приостанавливает все запросы на указанное время,
+      затем запрос повторяется (не больше max_retries раз).
+    - Ответ на inline-запрос, который не успеет уйти до inline_deadline
+      секунд с момента поступления запроса в очередь обновлений (on_arrival),
+      не отправляется: Telegram все равно отклонит устаревший query_id.
+      Время в очереди обновлений, схлопывателе и обработчике входит в срок.
+      Вместо повтора выбрасывается RequestDropped.
+
+    Когда очередь пуста и токен есть, запрос отправляется сразу, без
+    переключения на задачу-диспетчер.
+    """
+
+    def __init__(self, global_rate: float = 0.0, chat_rate: float = 1.0,
+                 max_retries: int = 2, inline_deadline: float = 10.0):
+        """
+        Args:
+            global_rate: Запросов в секунду на весь бот (0 - без ограничения)
+            chat_rate: Запросов в секунду в один чат (0 - без ограничения)
+            max_retries: Сколько раз повторять запрос после RetryAfter
+            inline_deadline: За сколько секунд ответ на inline-запрос должен уйти
+        """
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.inline_deadline = inline_deadline
+        self.logger = logging.getLogger(__name__)
+
+        now = time.monotonic()
+        self._global = TokenBucket(global_rate, max(1.0, global_rate), now)
+        self._chats: Dict[Union[int, str], TokenBucket] = {}
+        # Очередь ожидающих общего токена: (приоритет, номер, future, крайний срок)
+        self._queue: List[Tuple[int, int, asyncio.Future, Optional[float]]] = []
+        self._sequence = 0
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        # Время поступления inline-запросов по query_id; запись снимается при
+        # ответе, а запросы без ответа (вытесненные, отброшенные) устаревают
+        self._inline_arrivals = ExpiringTable(max(60.0, inline_deadline), INLINE_ARRIVALS_PRUNE_THRESHOLD)
+
+        # Метрики
+        self.sent = 0
+        self.delayed = 0
+        self.waiting_chat = 0
+        self.retry_after = 0
+        self.retry_after_seconds = 0.0
+        self.dropped_expired = 0
+        self.dropped_retries = 0
+
+    def on_arrival(self, update: object):
+        """Запоминает время поступления inline-запроса (обработчик ArrivalQueue)."""
+        if isinstance(update, Update) and update.inline_query:
+            self._inline_arrivals.put(update.inline_query.id, None)
+
+    async def initialize(self):
+        # Bot.initialize вызывается и приложением, и Updater
+        if self._dispatcher:
+            return
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def shutdown(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for _, _, future, _ in self._queue:
+            if not future.done():
+                future.set_exception(RequestDropped("Бот останавливается"))
+        self._queue.clear()
+
+    def prune_chats(self, now: Optional[float] = None) -> int:
+        """
+        Удаляет корзины чатов, которые снова полны (чат давно неактивен).
+
+        Вызывается сама, когда корзин становится CHAT_BUCKETS_MAX; удаленная
+        корзина при следующем сообщении в чат создается заново полной,
+        поэтому ограничения не ослабляются.
+
+        Returns:
+            int: Сколько корзин осталось
+        """
+        now = time.monotonic() if now is None else now
+        self._chats = {key: value for key, value in self._chats.items() if not value.full(now)}
+        return len(self._chats)
+
+    def _chat_bucket(self, chat_id: Union[int, str], now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= CHAT_BUCKETS_MAX:
+                self.prune_chats(now)
+            rate = self.chat_rate
+            if isinstance(chat_id, str) or chat_id < 0:
+                # Группы, супергруппы и каналы
+                rate = min(rate, GROUP_CHAT_RATE) if rate else GROUP_CHAT_RATE
+            bucket = self._chats[chat_id] = TokenBucket(rate, CHAT_BURST, now)
+        return bucket
+
+    async def _acquire(self, priority: int, deadline: Optional[float]):
+        """Ждет общий токен в порядке приоритета."""
+        now = time.monotonic()
+        if not self._queue and self._paused_until <= now and not self._global.wait_time(now):
+            self._global.consume(now)
+            return
+
+        self.delayed += 1
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._queue, (priority, self._sequence, future, deadline))
+        self._wakeup.set()
+        await future
+
+    async def _dispatch_loop(self):
+        """Выдает общие токены ожидающим запросам по приоритету."""
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            wait = max(self._paused_until - now, self._global.wait_time(now))
+            if wait > 0:
+                # Запрос выбирается после ожидания: за это время мог прийти более важный
+                await asyncio.sleep(wait)
+                continue
+
+            _, _, future, deadline = heapq.heappop(self._queue)
+            if future.done():
+                # Вызывающая задача отменена
+                continue
+            if deadline is not None and now > deadline:
+                future.set_exception(self._drop_expired("Ответ на inline-запрос устарел в очереди"))
+                continue
+            self._global.consume(now)
+            future.set_result(None)
+
+    def _drop_expired(self, message: str) -> RequestDropped:
+        self.dropped_expired += 1
+        return RequestDropped(message)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        is_inline = endpoint == 'answerInlineQuery'
+        if rate_limit_args is not None:
+            priority = rate_limit_args
+        else:
+            priority = PRIORITY_INLINE if is_inline else PRIORITY_DEFAULT
+        deadline = None
+        if is_inline:
+            # Срок считается от поступления запроса; запрос, прошедший мимо
+            # очереди обновлений, - от вызова answer()
+            arrived_at = self._inline_arrivals.pop_arrival(data.get('inline_query_id'))
+            now = time.monotonic()
+            deadline = (arrived_at if arrived_at is not None else now) + self.inline_deadline
+            if now > deadline:
+                raise self._drop_expired("Ответ на inline-запрос устарел до отправки")
+        chat_id = data.get('chat_id')
+
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                now = time.monotonic()
+                wait = self._chat_bucket(chat_id, now).reserve(now)
+                if wait > 0:
+                    self.waiting_chat += 1
+                    try:
+                        await asyncio.sleep(wait)
+                    finally:
+                        self.waiting_chat -= 1
+
+            await self._acquire(priority, deadline)
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                retry_after = float(e.retry_after)
+                self.retry_after += 1
+                self.retry_after_seconds += retry_after
+                resume_at = time.monotonic() + retry_after
+                self._paused_until = max(self._paused_until, resume_at)
+                self.logger.warning("Telegram просит подождать %s с (%s), запросы приостановлены",
+                                    retry_after, endpoint)
+
+                if deadline is not None and resume_at > deadline:
+                    raise self._drop_expired("Ответ на inline-запрос устареет до конца паузы RetryAfter") from e
+                if attempt >= self.max_retries:
+                    self.dropped_retries += 1
+                    raise
+                attempt += 1
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        Возвращает метрики планировщика исходящих запросов.
+
+        Returns:
+            Dict[str, float]: Счетчики и текущее состояние очереди
+        """
+        return {
+            'queue_size': len(self._queue),
+            'waiting_chat': self.waiting_chat,
+            'sent': self.sent,
+            'delayed': self.delayed,
+            'retry_after': self.retry_after,
+            'retry_after_seconds': self.retry_after_seconds,
+            'paused_seconds': max(0.0, self._paused_until - time.monotonic()),
+            'dropped_expired': self.dropped_expired,
+            'dropped_retries': self.dropped_retries,
+        }
@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from .responses import POSITIVE_RESPONSES, NEGATIVE_RESPONSES, UNCERTAIN_RESPONSES
+
+CORPUS_VERSION = 1
+# Как ответ на текстовый вопрос оформляется по умолчанию
+DEFAULT_QUERY_FORMAT = "📝 Запрос: \"{query}\"\n\n{response}"
+
+
+class LanguageCorpus:
+    """Ответы, веса категорий и оформление ответа для одного языка."""
+
+    def __init__(self, weights: Dict[str, float], responses: Dict[str, List[str]],
+                 query_format: str = DEFAULT_QUERY_FORMAT):
+        """
+        Args:
+            weights: Словарь {категория: вес}
+            responses: Словарь {категория: тексты ответов}
+            query_format: Шаблон ответа на текстовый вопрос с полями {query} и {response}
+        """
+        self.weights = weights
+        self.responses = responses
+        self.query_format = query_format
+
+
+class ResponseCorpus:
+    """Наборы ответов по языкам (ключ - код языка Telegram, например 'ru' или 'en')."""
+
+    def __init__(self, default_language: str, languages: Dict[str, LanguageCorpus]):
+        """
+        Args:
+            default_language: Язык для пользователей, чей язык не найден
+            languages: Словарь {код языка: LanguageCorpus}
+        """
+        self.default_language = default_language
+        self.languages = languages
+
+    @property
+    def categories(self) -> Tuple[str, ...]:
+        """Категории ответов языка по умолчанию (у остальных языков - подмножество)."""
+        return tuple(self.languages[self.default_language].responses)
+
+
+def builtin_corpus() -> ResponseCorpus:
+    """
+    Возвращает встроенные ответы из src/responses.
+
+    Используются, если файла с ответами нет.
+    """
+    return ResponseCorpus('ru', {
+        'ru': LanguageCorpus(
+            weights={
+                'positive': 0.5,    # 50% - положительные ответы
+                'negative': 0.3,    # 30% - отрицательные ответы
+                'uncertain': 0.2    # 20% - неопределенные ответы
+            },
+            responses={
+                'positive': list(POSITIVE_RESPONSES),
+                'negative': list(NEGATIVE_RESPONSES),
+                'uncertain': list(UNCERTAIN_RESPONSES)
+            },
+        )
+    })
+
+
+def _parse_language(code: str, data: Any) -> LanguageCorpus:
+    if not isinstance(data, dict):
+        raise ValueError(f"Язык {code}: ожидается объект")
+
+    responses = data.get('responses')
+    if not isinstance(responses, dict) or not responses:
+        raise ValueError(f"Язык {code}: нет ответов (responses)")
+    for category, texts in responses.items():
+        if not isinstance(texts, list) or not texts:
+            raise ValueError(f"Язык {code}: пустой список ответов категории {category}")
+        if not all(isinstance(text, str) and text.strip() for text in texts):
+            raise ValueError(f"Язык {code}: ответы категории {category} должны быть непустыми строками")
+
+    weights = data.get('weights')
+    if not isinstance(weights, dict):
+        raise ValueError(f"Язык {code}: нет весов категорий (weights)")
+    if set(weights) != set(responses):
+        raise ValueError(f"Язык {code}: веса должны быть заданы ровно для категорий из responses")
+    for category, weight in weights.items():
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"Язык {code}: вес категории {category} должен быть неотрицательным числом")
+    if sum(weights.values()) <= 0:
+        raise ValueError(f"Язык {code}: сумма весов категорий должна быть положительной")
+
+    query_format = data.get('query_format', DEFAULT_QUERY_FORMAT)
+    try:
+        query_format.format(query='', response='')
+    except (AttributeError, KeyError, IndexError, ValueError):
+        raise ValueError(f"Язык {code}: query_format должен быть строкой с полями {{query}} и {{response}}")
+
+    return LanguageCorpus(
+        weights={category: float(weight) for category, weight in weights.items()},
+        responses={category: list(texts) for category, texts in responses.items()},
+        query_format=query_format,
+    )
+
+
+def parse_corpus(data: Any) -> ResponseCorpus:
+    """
+    Проверяет и разбирает содержимое файла ответов.
+
+    Args:
+        data: Разобранный JSON
+
+    Returns:
+        ResponseCorpus: Наборы ответов по языкам
+
+    Raises:
+        ValueError: Если структура файла некорректна
+    """
+    if not isinstance(data, dict) or data.get('version') != CORPUS_VERSION:
+        raise ValueError(f"Ожидается объект с version = {CORPUS_VERSION}")
+
+    languages = data.get('languages')
+    if not isinstance(languages, dict) or not languages:
+        raise ValueError("Нет ни одного языка (languages)")
+    default_language = data.get('default_language')
+    if default_language not in languages:
+        raise ValueError(f"Язык по умолчанию {default_language!r} не описан в languages")
+
+    parsed = {str(code).lower(): _parse_language(code, value) for code, value in languages.items()}
+    categories = set(parsed[default_language.lower()].responses)
+    for code, language in parsed.items():
+        extra = set(language.responses) - categories
+        if extra:
+            raise ValueError(
+                f"Язык {code}: категории {', '.join(sorted(extra))} отсутствуют в языке по умолчанию"
+            )
+    return ResponseCorpus(default_language.lower(), parsed)
+
+
+def load_corpus(path: str) -> ResponseCorpus:
+    """
+    Загружает файл ответов.
+
+    Args:
+        path: Путь к JSON-файлу
+
+    Returns:
+        ResponseCorpus: Наборы ответов по языкам
+
+    Raises:
+        ValueError: Если файл не читается или его структура некорректна
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Не удалось прочитать файл ответов {path}: {e}")
+    try:
+        return parse_corpus(data)
+    except ValueError as e:
+        raise ValueError(f"Файл ответов {path}: {e}")
+
+
+class CorpusFile:
+    """
+    Файл ответов с дешевой проверкой изменений.
+
+    Изменение определяется по stat() - времени модификации, размеру и inode
+    (редакторы и `mv` часто заменяют файл целиком), без чтения содержимого.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к JSON-файлу ответов
+        """
+        self.path = path
+        self._signature: Optional[Tuple[int, int, int]] = None
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def exists(self) -> bool:
+        return self._stat() is not None
+
+    def changed(self) -> bool:
+        """Проверяет, изменился ли файл с последней загрузки (удаленный файл не считается изменением)."""
+        signature = self._stat()
+        return signature is not None and signature != self._signature
+
+    def load(self) -> ResponseCorpus:
+        """
+        Загружает файл и запоминает его состояние.
+
+        Состояние снимается до чтения: если файл перезапишут во время чтения,
+        следующая проверка увидит изменение и загрузит его снова.
+
+        Raises:
+            ValueError: Если файл не читается или его структура некорректна
+        """
+        signature = self._stat()
+        try:
+            return load_corpus(self.path)
+        finally:
+            # Некорректный файл не перечитывается, пока его не исправят
+            self._signature = signature
+
+
+def intern_texts(texts: List[str]) -> List[str]:
+    """Интернирует тексты ответов: одинаковые строки разных языков и перезагрузок хранятся один раз."""
+    return [sys.intern(text) for text in texts]
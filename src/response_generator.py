@@ -1,66 +1,345 @@
+import hashlib
 import random
-from typing import Dict, List, Tuple
-from .responses import POSITIVE_RESPONSES, NEGATIVE_RESPONSES, UNCERTAIN_RESPONSES
+import re
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+from .response_corpus import LanguageCorpus, ResponseCorpus, builtin_corpus, intern_texts
+
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = ' ?!.,;:…'
+
+
+def normalize_query(text: str) -> str:
+    """
+    Приводит текст вопроса к канонической форме для детерминированных ответов.
+
+    Регистр, ё/е, повторные пробелы и завершающая пунктуация не влияют на ответ:
+    "Правда, что вода мокрая?" и "правда,  что вода мокрая" - один и тот же вопрос.
+
+    Args:
+        text: Исходный текст запроса
+
+    Returns:
+        str: Нормализованный текст
+    """
+    text = text.casefold().replace('ё', 'е')
+    return _WHITESPACE_RE.sub(' ', text).strip(_TRAILING_PUNCTUATION)
+
+
+def build_alias_table(probabilities: Sequence[float]) -> Tuple[List[float], List[int]]:
+    """
+    Строит таблицу псевдонимов (алгоритм Vose) для выборки за O(1).
+
+    Args:
+        probabilities: Вероятности исходов (сумма равна 1)
+
+    Returns:
+        Tuple[List[float], List[int]]: (порог для каждой колонки, индекс-псевдоним)
+    """
+    size = len(probabilities)
+    scaled = [p * size for p in probabilities]
+    threshold = [1.0] * size
+    alias = list(range(size))
+
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        threshold[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = scaled[more] + scaled[less] - 1.0
+        (small if scaled[more] < 1.0 else large).append(more)
+
+    # Оставшиеся колонки заполнены целиком (погрешности округления)
+    for i in small + large:
+        threshold[i] = 1.0
+
+    return threshold, alias
+
+
+class _AliasTable:
+    """Скомпилированный набор ответов одного языка: таблица псевдонимов и оформление."""
+
+    __slots__ = ('size', 'threshold', 'primary', 'alias', 'query_format')
+
+    def __init__(self, language: LanguageCorpus):
+        total_weight = sum(language.weights.values())
+        if total_weight <= 0:
+            raise ValueError("Сумма весов категорий должна быть положительной")
+
+        entries = []
+        probabilities = []
+        for category, weight in language.weights.items():
+            responses = language.responses.get(category)
+            if not responses or weight <= 0:
+                continue
+            category = sys.intern(category)
+            share = weight / total_weight / len(responses)
+            for response_text in intern_texts(responses):
+                entries.append((response_text, category))
+                probabilities.append(share)
+
+        if not entries:
+            raise ValueError("Нет ни одного ответа с положительным весом")
+
+        threshold, alias = build_alias_table(probabilities)
+
+        # Готовые кортежи для обеих половин каждой колонки - выборка ничего не создает
+        self.size = len(entries)
+        self.threshold = tuple(threshold)
+        self.primary = tuple(entries)
+        self.alias = tuple(entries[i] for i in alias)
+        self.query_format = language.query_format
 
 
 class ResponseGenerator:
     """
     Генератор случайных ответов для бота "Это правда?"
     Имитирует авторитетный фактчекинг через честный рандом.
+
+    Все пары (ответ, категория) с учетом весов категорий заранее собираются
+    в таблицу псевдонимов, поэтому выбор ответа стоит одно случайное число
+    и два обращения к кортежам. Таблицы собираются для каждого языка набора
+    ответов (ResponseCorpus) и пересобираются только при изменении весов,
+    ответов или загрузке нового набора.
+
+    Новый набор сначала компилируется целиком, а затем подменяется одним
+    присваиванием: запрос, уже получивший таблицу, дорабатывает со старой,
+    следующие получают новую.
     """
-    
-    def __init__(self):
-        # Весовые коэффициенты для категорий ответов
-        self.category_weights = {
-            'positive': 0.5,    # 50% - положительные ответы
-            'negative': 0.3,    # 30% - отрицательные ответы  
-            'uncertain': 0.2    # 20% - неопределенные ответы
-        }
-        
-        # Словарь с ответами по категориям
-        self.responses = {
-            'positive': POSITIVE_RESPONSES,
-            'negative': NEGATIVE_RESPONSES,
-            'uncertain': UNCERTAIN_RESPONSES
-        }
-    
-    def generate_random_response(self) -> Tuple[str, str]:
+
+    def __init__(self, rng: Optional[random.Random] = None, seed: Optional[int] = None,
+                 corpus: Optional[ResponseCorpus] = None):
+        """
+        Args:
+            rng: Собственный генератор случайных чисел (например, для тестов)
+            seed: Seed для воспроизводимой последовательности ответов
+            corpus: Наборы ответов по языкам (по умолчанию - встроенные из src/responses)
+        """
+        self._rng = rng if rng is not None else random.Random(seed)
+        self.load_corpus(corpus or builtin_corpus())
+
+    @staticmethod
+    def compile_corpus(corpus: ResponseCorpus) -> Tuple[str, Dict[str, _AliasTable]]:
+        """
+        Компилирует наборы ответов всех языков в таблицы псевдонимов.
+
+        Не меняет состояние генератора, поэтому может выполняться в отдельном потоке.
+
+        Args:
+            corpus: Наборы ответов по языкам
+
+        Returns:
+            Tuple[str, Dict[str, _AliasTable]]: (язык по умолчанию, таблицы по языкам)
+        """
+        tables = {code: _AliasTable(language) for code, language in corpus.languages.items()}
+        return corpus.default_language, tables
+
+    def install(self, corpus: ResponseCorpus, compiled: Tuple[str, Dict[str, _AliasTable]]):
+        """
+        Атомарно подменяет наборы ответов заранее скомпилированными таблицами.
+
+        Args:
+            corpus: Наборы ответов по языкам
+            compiled: Результат compile_corpus(corpus)
+        """
+        default_language, tables = compiled
+        default = corpus.languages[default_language]
+        self.corpus = corpus
+        self.default_language = default_language
+        # Веса и ответы языка по умолчанию - для set_category_weights и статистики
+        self.category_weights = dict(default.weights)
+        self.responses = {category: list(texts) for category, texts in default.responses.items()}
+        self._language_tables = {}
+        self._tables = tables
+        self._table = tables[default_language]
+
+    def load_corpus(self, corpus: ResponseCorpus):
+        """
+        Компилирует и подменяет наборы ответов.
+
+        Args:
+            corpus: Наборы ответов по языкам
+        """
+        self.install(corpus, self.compile_corpus(corpus))
+
+    @property
+    def languages(self) -> Tuple[str, ...]:
+        """Коды языков, для которых есть ответы."""
+        return tuple(self._tables)
+
+    def _table_for(self, language: Optional[str]) -> _AliasTable:
+        """
+        Возвращает таблицу для кода языка пользователя.
+
+        Код ищется целиком ('pt-br'), затем основной язык ('pt'), иначе
+        берется язык по умолчанию. Результат кешируется: различных кодов
+        языка у пользователей Telegram немного.
+        """
+        if not language:
+            return self._table
+        table = self._language_tables.get(language)
+        if table is None:
+            code = language.lower()
+            table = self._tables.get(code) or self._tables.get(code.split('-')[0]) or self._table
+            if len(self._language_tables) < 256:
+                self._language_tables[language] = table
+        return table
+
+    def recompile(self):
+        """
+        Пересобирает таблицу языка по умолчанию из текущих весов и ответов.
+
+        Вызывается автоматически из set_category_weights и set_responses;
+        при прямом изменении category_weights или responses нужно вызвать вручную.
+        """
+        default = LanguageCorpus(
+            self.category_weights,
+            self.responses,
+            self.corpus.languages[self.default_language].query_format,
+        )
+        table = _AliasTable(default)
+        self._tables = {**self._tables, self.default_language: table}
+        self._language_tables = {}
+        self._table = table
+
+    def set_category_weights(self, weights: Dict[str, float]):
+        """
+        Задает новые веса категорий и пересобирает таблицу.
+
+        Args:
+            weights: Словарь {категория: вес}
+        """
+        unknown = set(weights) - set(self.responses)
+        if unknown:
+            raise ValueError(f"Неизвестные категории: {', '.join(sorted(unknown))}")
+        self.category_weights = dict(weights)
+        self.recompile()
+
+    def set_responses(self, category: str, responses: Sequence[str]):
+        """
+        Заменяет набор ответов категории и пересобирает таблицу.
+
+        Args:
+            category: Категория ответа
+            responses: Новые тексты ответов
+        """
+        self.responses[category] = list(responses)
+        self.category_weights.setdefault(category, 0.0)
+        self.recompile()
+
+    def seed(self, value: Optional[int] = None):
+        """Переинициализирует генератор случайных чисел."""
+        self._rng.seed(value)
+
+    def generate_random_response(self, language: Optional[str] = None) -> Tuple[str, str]:
         """
         Генерирует случайный ответ с авторитетным тоном.
-        
+
+        Args:
+            language: Код языка пользователя (None - язык по умолчанию)
+
+        Returns:
+            Tuple[str, str]: (response_text, category)
+        """
+        # Кеш языков проверяется на месте: этот метод вызывается на каждый запрос
+        table = self._language_tables.get(language) if language else self._table
+        if table is None:
+            table = self._table_for(language)
+        # Целая часть выбирает колонку таблицы, дробная - половину колонки
+        r = self._rng.random() * table.size
+        column = int(r)
+        if r - column < table.threshold[column]:
+            return table.primary[column]
+        return table.alias[column]
+
+    def generate_deterministic_response(self, query_text: str, salt: str = '',
+                                        language: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Возвращает ответ, однозначно определяемый текстом вопроса и солью.
+
+        Стабильный хеш нормализованного вопроса заменяет случайное число,
+        поэтому распределение категорий остается тем же, что и у случайных ответов.
+
+        Args:
+            query_text: Текст вопроса
+            salt: Соль (например, номер временного окна), меняющая ответы
+            language: Код языка пользователя (None - язык по умолчанию)
+
         Returns:
             Tuple[str, str]: (response_text, category)
         """
-        # Выбираем категорию с учетом весов
-        categories = list(self.category_weights.keys())
-        weights = list(self.category_weights.values())
-        
-        selected_category = random.choices(categories, weights=weights)[0]
-        
-        # Выбираем случайный ответ из выбранной категории
-        response_text = random.choice(self.responses[selected_category])
-        
-        return response_text, selected_category
-    
+        table = self._table_for(language)
+        key = f"{salt}\x00{normalize_query(query_text)}".encode('utf-8')
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        # Старшие 53 бита дают равномерное число из [0, 1) без округления до 1.0
+        r = (int.from_bytes(digest, 'big') >> 11) / 2 ** 53 * table.size
+        column = int(r)
+        if r - column < table.threshold[column]:
+            return table.primary[column]
+        return table.alias[column]
+
+    def generate_batch(self, n: int, language: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        Генерирует сразу n случайных ответов за один проход.
+
+        Args:
+            n: Количество ответов
+            language: Код языка пользователя (None - язык по умолчанию)
+
+        Returns:
+            List[Tuple[str, str]]: Список пар (response_text, category)
+        """
+        table = self._table_for(language)
+        rand = self._rng.random
+        size = table.size
+        threshold = table.threshold
+        primary = table.primary
+        alias = table.alias
+
+        result = []
+        append = result.append
+        for r in [rand() * size for _ in range(n)]:
+            column = int(r)
+            append(primary[column] if r - column < threshold[column] else alias[column])
+        return result
+
+    def format_query_response(self, query_text: str, response_text: str, language: Optional[str] = None) -> str:
+        """
+        Оформляет ответ на текстовый вопрос по шаблону языка.
+
+        Args:
+            query_text: Текст вопроса
+            response_text: Сгенерированный ответ
+            language: Код языка пользователя (None - язык по умолчанию)
+
+        Returns:
+            str: Текст сообщения
+        """
+        return self._table_for(language).query_format.format(query=query_text, response=response_text)
+
     def get_response_by_category(self, category: str) -> str:
         """
         Возвращает случайный ответ из определенной категории.
-        
+
         Args:
             category: Категория ответа ('positive', 'negative', 'uncertain')
-            
+
         Returns:
             str: Текст ответа
         """
         if category not in self.responses:
             raise ValueError(f"Неизвестная категория: {category}")
-        
-        return random.choice(self.responses[category])
-    
+
+        return self._rng.choice(self.responses[category])
+
     def get_statistics(self) -> Dict[str, float]:
         """
         Возвращает статистику распределения ответов по категориям.
-        
+
         Returns:
             Dict[str, float]: Словарь с весами категорий
         """
@@ -68,4 +347,4 @@ class ResponseGenerator:
 
 
 # Создаем глобальный экземпляр генератора для использования в боте
-response_generator = ResponseGenerator()
\ No newline at end of file
+response_generator = ResponseGenerator()
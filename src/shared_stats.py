@@ -0,0 +1,146 @@
+from datetime import date
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence
+
+from .stats_store import PERSISTED_COUNTERS
+
+
+class SharedStatsTable:
+    """
+    Таблица статистики воркеров в разделяемой памяти.
+
+    У каждого воркера своя строка из 64-битных счетчиков, в которую пишет
+    только он сам, поэтому блокировки не нужны. Согласованность строки при
+    чтении обеспечивает seqlock: перед записью номер версии становится
+    нечетным, после - четным; читатель повторяет чтение, если версия
+    нечетная или изменилась за время чтения.
+
+    Раскладка строки: версия, PERSISTED_COUNTERS, дата последнего сброса
+    (ordinal), затем по счетчику на каждую категорию из categories.
+    """
+
+    _VERSION = 0
+    _FIRST_COUNTER = 1
+    # Сколько раз читатель повторяет чтение строки, которую сейчас пишут
+    READ_ATTEMPTS = 10000
+
+    def __init__(self, rows: int, categories: Sequence[str], name: Optional[str] = None):
+        """
+        Args:
+            rows: Количество строк (воркеров)
+            categories: Категории ответов - порядок должен совпадать во всех процессах
+            name: Имя существующего сегмента (None - создать новый)
+        """
+        self.rows = rows
+        self.categories = tuple(categories)
+        self._last_reset = self._FIRST_COUNTER + len(PERSISTED_COUNTERS)
+        self._first_category = self._last_reset + 1
+        self.row_size = self._first_category + len(self.categories)
+
+        size = rows * self.row_size * 8
+        self._owner = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size if self._owner else 0)
+        self._values = self._shm.buf.cast('Q')
+
+    @property
+    def name(self) -> str:
+        """Имя сегмента для подключения из других процессов."""
+        return self._shm.name
+
+    def write_row(self, row: int, snapshot: Dict[str, Any]):
+        """
+        Записывает снимок статистики воркера в его строку.
+
+        Args:
+            row: Номер строки (индекс воркера)
+            snapshot: Результат stats_store.snapshot_stats()
+        """
+        values = self._values
+        base = row * self.row_size
+        values[base + self._VERSION] += 1
+        for offset, name in enumerate(PERSISTED_COUNTERS, self._FIRST_COUNTER):
+            values[base + offset] = snapshot[name]
+        values[base + self._last_reset] = snapshot['last_reset'].toordinal()
+        categories = snapshot['categories']
+        for offset, category in enumerate(self.categories, self._first_category):
+            values[base + offset] = categories.get(category, 0)
+        values[base + self._VERSION] += 1
+
+    def read_row(self, row: int) -> Optional[List[int]]:
+        """
+        Читает согласованную копию строки.
+
+        Returns:
+            Optional[List[int]]: Значения строки или None, если воркер еще ничего не записал
+        """
+        values = self._values
+        base = row * self.row_size
+        # Запись строки занимает микросекунды; если версия так и не стала
+        # четной, воркер умер посреди записи - строку пропускаем
+        for _ in range(self.READ_ATTEMPTS):
+            version = values[base + self._VERSION]
+            if version == 0:
+                return None
+            if version % 2:
+                continue
+            copy = values[base:base + self.row_size].tolist()
+            if values[base + self._VERSION] == version:
+                return copy
+        return None
+
+    def read_snapshot(self, row: int) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает статистику строки в формате snapshot_stats().
+
+        Returns:
+            Optional[Dict[str, Any]]: Снимок или None, если строка пуста
+        """
+        values = self.read_row(row)
+        if values is None:
+            return None
+        snapshot = dict(zip(PERSISTED_COUNTERS, values[self._FIRST_COUNTER:self._last_reset]))
+        snapshot['last_reset'] = date.fromordinal(values[self._last_reset])
+        snapshot['categories'] = dict(zip(self.categories, values[self._first_category:]))
+        return snapshot
+
+    def aggregate(self, own_row: Optional[int] = None,
+                  own_snapshot: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Суммирует статистику всех воркеров.
+
+        Счетчики за день учитываются только у строк, сброшенных сегодня:
+        воркер без запросов мог еще не обнулить вчерашний день.
+
+        Args:
+            own_row: Строка вызывающего воркера - вместо нее берется own_snapshot
+            own_snapshot: Актуальный снимок вызывающего воркера
+
+        Returns:
+            Dict[str, Any]: Суммарные счетчики в формате snapshot_stats()
+        """
+        today = date.today()
+        total = {name: 0 for name in PERSISTED_COUNTERS}
+        categories = dict.fromkeys(self.categories, 0)
+
+        for row in range(self.rows):
+            snapshot = own_snapshot if row == own_row and own_snapshot is not None else self.read_snapshot(row)
+            if snapshot is None:
+                continue
+
+            for name in PERSISTED_COUNTERS:
+                if name == 'today_queries' and snapshot['last_reset'] != today:
+                    continue
+                total[name] += snapshot[name]
+            for category, count in snapshot['categories'].items():
+                categories[category] = categories.get(category, 0) + count
+
+        total['last_reset'] = today
+        total['categories'] = categories
+        return total
+
+    def close(self):
+        """Отключается от сегмента; создатель сегмента также удаляет его."""
+        self._values.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,211 @@
+import math
+from typing import Dict, List, Tuple
+
+from src.response_generator import normalize_query
+
+# Точность HyperLogLog: 2^12 = 4096 регистров (4 КБ), стандартная ошибка ~1.6%
+HLL_PRECISION = 12
+# Сколько вопросов одновременно отслеживает Space-Saving
+TOP_QUERIES_CAPACITY = 100
+# Сколько раз вопрос должен гарантированно встретиться, чтобы попасть в /stats:
+# единичные вопросы могут содержать личные данные
+TOP_QUERIES_MIN_COUNT = 3
+# Длина нормализованного вопроса; длинные вопросы обрезаются
+QUERY_KEY_LENGTH = 64
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(value: int) -> int:
+    """Перемешивает 64-битное целое (финализатор splitmix64)."""
+    z = (value + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def sketch_key(text: str) -> str:
+    """
+    Приводит вопрос к ключу для подсчета частоты.
+
+    Вопросы группируются так же, как для детерминированных ответов
+    (response_generator.normalize_query: регистр, ё/е, лишние пробелы и
+    завершающая пунктуация не различаются), а ключ обрезается до
+    QUERY_KEY_LENGTH, чтобы длинные вопросы не раздували таблицу.
+
+    Args:
+        text: Текст inline-запроса
+
+    Returns:
+        str: Ключ не длиннее QUERY_KEY_LENGTH (может быть пустым)
+    """
+    return normalize_query(text)[:QUERY_KEY_LENGTH].rstrip()
+
+
+class HyperLogLog:
+    """
+    Оценка числа различных целых значений (например, id пользователей).
+
+    Память - 2^precision байт независимо от числа значений, добавление - O(1).
+    Стандартная ошибка оценки - 1.04 / sqrt(2^precision): для precision=12
+    около 1.6%. Сумма 2^-register поддерживается при каждом изменении
+    регистра в целых числах, поэтому оценка тоже O(1).
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        """
+        Args:
+            precision: Число бит хеша на номер регистра (4..16)
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("Точность HyperLogLog должна быть от 4 до 16")
+        self.precision = precision
+        self.size = 1 << precision
+        self._value_bits = 64 - precision
+        self._value_mask = (1 << self._value_bits) - 1
+        self._alpha = 0.7213 / (1 + 1.079 / self.size)
+        self.clear()
+
+    def clear(self):
+        """Сбрасывает оценку."""
+        self._registers = bytearray(self.size)
+        self._zeros = self.size
+        # Сумма 2^-register по всем регистрам, умноженная на 2^64
+        self._inverse_sum = self.size << 64
+
+    def add(self, value: int):
+        """
+        Добавляет значение.
+
+        Args:
+            value: Целое значение (id пользователя)
+        """
+        hashed = _mix64(value)
+        index = hashed >> self._value_bits
+        rank = self._value_bits - (hashed & self._value_mask).bit_length() + 1
+        old = self._registers[index]
+        if rank > old:
+            self._registers[index] = rank
+            if not old:
+                self._zeros -= 1
+            self._inverse_sum += (1 << (64 - rank)) - (1 << (64 - old))
+
+    def estimate(self) -> int:
+        """
+        Возвращает оценку числа различных значений.
+
+        При малом заполнении используется линейный подсчет по пустым
+        регистрам - он точнее основной формулы.
+
+        Returns:
+            int: Оценка
+        """
+        m = self.size
+        raw = self._alpha * m * m / (self._inverse_sum / (1 << 64))
+        if raw <= 2.5 * m and self._zeros:
+            return round(m * math.log(m / self._zeros))
+        return round(raw)
+
+
+class SpaceSaving:
+    """
+    Самые частые ключи потока (алгоритм Space-Saving).
+
+    Отслеживается не больше capacity ключей. Новый ключ при заполненной
+    таблице вытесняет ключ с минимальным счетчиком и наследует его значение
+    как погрешность: оценка счетчика завышена не больше, чем на погрешность,
+    а погрешность не превышает N / capacity для N добавлений. Любой ключ,
+    встретившийся чаще N / capacity раз, гарантированно есть в таблице.
+
+    Ключи сгруппированы по значению счетчика (stream summary), поэтому
+    добавление и вытеснение выполняются за O(1).
+    """
+
+    def __init__(self, capacity: int = TOP_QUERIES_CAPACITY):
+        """
+        Args:
+            capacity: Максимум отслеживаемых ключей
+        """
+        if capacity < 1:
+            raise ValueError("Емкость Space-Saving должна быть положительной")
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        """Сбрасывает таблицу."""
+        self.total = 0
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        # Значение счетчика -> ключи с этим значением (в порядке добавления)
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._min_count = 0
+
+    def _move(self, key: str, old: int, new: int):
+        bucket = self._buckets[old]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[old]
+            if self._min_count == old:
+                self._min_count = new
+        self._buckets.setdefault(new, {})[key] = None
+
+    def add(self, key: str):
+        """
+        Учитывает одно появление ключа.
+
+        Args:
+            key: Ключ (нормализованный вопрос)
+        """
+        self.total += 1
+        count = self._counts.get(key)
+        if count is not None:
+            self._counts[key] = count + 1
+            self._move(key, count, count + 1)
+            return
+
+        if len(self._counts) < self.capacity:
+            self._counts[key] = 1
+            self._errors[key] = 0
+            self._buckets.setdefault(1, {})[key] = None
+            self._min_count = 1
+            return
+
+        # Вытесняем самый старый ключ с минимальным счетчиком
+        minimum = self._min_count
+        bucket = self._buckets[minimum]
+        evicted = next(iter(bucket))
+        del bucket[evicted]
+        del self._counts[evicted]
+        del self._errors[evicted]
+        if not bucket:
+            del self._buckets[minimum]
+            self._min_count = minimum + 1
+        self._counts[key] = minimum + 1
+        self._errors[key] = minimum
+        self._buckets.setdefault(minimum + 1, {})[key] = None
+
+    def top(self, k: int, min_count: int = 1) -> List[Tuple[str, int, int]]:
+        """
+        Возвращает k самых частых ключей.
+
+        Сортируются только отслеживаемые ключи (не больше capacity).
+
+        Args:
+            k: Сколько ключей вернуть
+            min_count: Минимальное гарантированное число появлений (счетчик минус погрешность)
+
+        Returns:
+            List[Tuple[str, int, int]]: (ключ, оценка счетчика, погрешность) по убыванию оценки
+        """
+        ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        result = []
+        for key, count in ranked:
+            error = self._errors[key]
+            if count - error >= min_count:
+                result.append((key, count, error))
+                if len(result) == k:
+                    break
+        return result
+
+    def __len__(self) -> int:
+        return len(self._counts)
@@ -0,0 +1,256 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+# Поля статистики, которые переживают перезапуск (время запуска - нет)
+PERSISTED_COUNTERS = ('total_queries', 'text_queries', 'button_queries', 'today_queries')
+
+
+class StatsStore:
+    """
+    Хранилище статистики бота.
+
+    Хранилище не участвует в обработке запросов: счетчики по-прежнему
+    обновляются в словаре в памяти за O(1), а бот периодически передает
+    в save() снимок этого словаря.
+    """
+
+    # Нужно ли боту периодически сбрасывать статистику в хранилище
+    persistent = False
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает сохраненный снимок статистики.
+
+        Returns:
+            Optional[Dict[str, Any]]: Снимок или None, если сохранений нет
+        """
+        return None
+
+    def save(self, snapshot: Dict[str, Any]):
+        """
+        Сохраняет снимок статистики.
+
+        Args:
+            snapshot: Результат snapshot_stats()
+        """
+
+    def close(self):
+        """Освобождает ресурсы хранилища."""
+
+
+class MemoryStatsStore(StatsStore):
+    """Статистика только в памяти - теряется при перезапуске (прежнее поведение)."""
+
+
+class MmapStatsStore(StatsStore):
+    """
+    Статистика в файле фиксированного размера, отображенном в память.
+
+    Файл состоит из заголовка и двух слотов. Каждый снимок пишется в слот,
+    противоположный последнему записанному, с порядковым номером и CRC32.
+    При чтении берется валидный слот с наибольшим номером, поэтому
+    оборванная запись (kill -9, отключение питания) портит только
+    записываемый слот, а предыдущий снимок остается целым.
+
+    Запись на диск (msync) выполняется вызывающим кодом вне event loop.
+    Сохранения и закрытие сериализуются блокировкой: задача сброса может быть
+    отменена, пока ее save() еще работает в потоке, и тогда следующий save()
+    при остановке бота или close() дождутся его завершения.
+    """
+
+    persistent = True
+
+    MAGIC = b'ITTSTAT1'
+    VERSION = 1
+    # Сколько категорий ответов помещается в слот
+    MAX_CATEGORIES = 8
+    CATEGORY_NAME_SIZE = 16
+
+    _HEADER = struct.Struct('<8sH6x')
+    # Номер снимка и CRC32 остальной части слота
+    _SLOT_HEADER = struct.Struct('<QI')
+    # Счетчики PERSISTED_COUNTERS, дата последнего сброса (ordinal), число категорий
+    _COUNTERS = struct.Struct('<4QII')
+    _CATEGORY = struct.Struct(f'<{CATEGORY_NAME_SIZE}sQ')
+    SLOT_SIZE = 256
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к файлу статистики (создается при отсутствии)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self._file_size = self._HEADER.size + 2 * self.SLOT_SIZE
+        self._seq = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = None
+        if size is None or size < self._file_size:
+            if size is not None:
+                # Создание файла оборвалось (файлы прежних версий создавались
+                # на месте): целых слотов в нем нет, сохранять нечего
+                self.logger.warning("Файл статистики %s неполный (%s байт), создается заново", self.path, size)
+            self._create()
+        elif size != self._file_size:
+            raise ValueError(f"Файл статистики {self.path} имеет неожиданный размер: {size} байт")
+
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            self._mmap = mmap.mmap(fd, self._file_size)
+        finally:
+            os.close(fd)
+
+        magic, version = self._HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self._mmap.close()
+            raise ValueError(f"Файл {self.path} не является файлом статистики версии {self.VERSION}")
+
+    def _create(self):
+        """
+        Создает пустой файл статистики.
+
+        Файл полного размера собирается во временном файле и атомарно
+        переименовывается, поэтому при kill -9 на любом шаге на месте
+        path либо нет файла, либо он целый.
+        """
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, self._HEADER.pack(self.MAGIC, self.VERSION))
+            os.ftruncate(fd, self._file_size)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self.path)
+        dir_fd = os.open(self.path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _slot_offset(self, seq: int) -> int:
+        return self._HEADER.size + (seq % 2) * self.SLOT_SIZE
+
+    def _read_slot(self, index: int) -> Optional[Dict[str, Any]]:
+        offset = self._HEADER.size + index * self.SLOT_SIZE
+        seq, crc = self._SLOT_HEADER.unpack_from(self._mmap, offset)
+        body_offset = offset + self._SLOT_HEADER.size
+        body = self._mmap[body_offset:offset + self.SLOT_SIZE]
+        if seq == 0 or zlib.crc32(body, seq & 0xFFFFFFFF) != crc:
+            return None
+
+        *counters, last_reset, category_count = self._COUNTERS.unpack_from(body, 0)
+        categories = {}
+        for i in range(min(category_count, self.MAX_CATEGORIES)):
+            name, count = self._CATEGORY.unpack_from(body, self._COUNTERS.size + i * self._CATEGORY.size)
+            categories[name.rstrip(b'\x00').decode('utf-8')] = count
+
+        snapshot = dict(zip(PERSISTED_COUNTERS, counters))
+        snapshot['last_reset'] = date.fromordinal(last_reset)
+        snapshot['categories'] = categories
+        snapshot['seq'] = seq
+        return snapshot
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        slots = [snapshot for snapshot in (self._read_slot(0), self._read_slot(1)) if snapshot]
+        if not slots:
+            return None
+        latest = max(slots, key=lambda snapshot: snapshot['seq'])
+        self._seq = latest.pop('seq')
+        return latest
+
+    def save(self, snapshot: Dict[str, Any]):
+        categories = list(snapshot['categories'].items())
+        if len(categories) > self.MAX_CATEGORIES:
+            self.logger.warning("Сохраняются только первые %s категорий статистики", self.MAX_CATEGORIES)
+            categories = categories[:self.MAX_CATEGORIES]
+
+        body = bytearray(self.SLOT_SIZE - self._SLOT_HEADER.size)
+        self._COUNTERS.pack_into(
+            body, 0,
+            *(snapshot[name] for name in PERSISTED_COUNTERS),
+            snapshot['last_reset'].toordinal(),
+            len(categories),
+        )
+        for i, (name, count) in enumerate(categories):
+            encoded = name.encode('utf-8')[:self.CATEGORY_NAME_SIZE]
+            self._CATEGORY.pack_into(body, self._COUNTERS.size + i * self._CATEGORY.size, encoded, count)
+
+        with self._lock:
+            seq = self._seq + 1
+            offset = self._slot_offset(seq)
+            self._mmap[offset + self._SLOT_HEADER.size:offset + self.SLOT_SIZE] = body
+            self._SLOT_HEADER.pack_into(self._mmap, offset, seq, zlib.crc32(body, seq & 0xFFFFFFFF))
+            # Файл меньше страницы памяти - msync всегда затрагивает одну страницу
+            self._mmap.flush()
+            self._seq = seq
+
+    def close(self):
+        with self._lock:
+            if not self._mmap.closed:
+                self._mmap.close()
+
+
+def snapshot_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Копирует сохраняемую часть статистики бота.
+
+    Вызывается в event loop, поэтому снимок согласован: между чтением
+    полей нет переключения на другие обработчики.
+
+    Args:
+        stats: Словарь IsItTrueBot.stats
+
+    Returns:
+        Dict[str, Any]: Снимок для StatsStore.save()
+    """
+    snapshot = {name: stats[name] for name in PERSISTED_COUNTERS}
+    snapshot['last_reset'] = stats['last_reset']
+    snapshot['categories'] = dict(stats['categories'])
+    return snapshot
+
+
+def restore_stats(stats: Dict[str, Any], snapshot: Dict[str, Any]):
+    """
+    Переносит сохраненный снимок в словарь статистики бота.
+
+    Args:
+        stats: Словарь IsItTrueBot.stats
+        snapshot: Результат StatsStore.load()
+    """
+    for name in PERSISTED_COUNTERS:
+        stats[name] = snapshot[name]
+    stats['last_reset'] = snapshot['last_reset']
+    stats['categories'].clear()
+    stats['categories'].update(snapshot['categories'])
+
+
+def create_stats_store(backend: str, path: str) -> StatsStore:
+    """
+    Создает хранилище статистики по имени бэкенда.
+
+    Args:
+        backend: 'memory' или 'mmap'
+        path: Путь к файлу (для mmap)
+
+    Returns:
+        StatsStore: Хранилище статистики
+    """
+    if backend == 'mmap':
+        return MmapStatsStore(path)
+    if backend == 'memory':
+        return MemoryStatsStore()
+    raise ValueError(f"Неизвестный бэкенд статистики: {backend}")
@@ -0,0 +1,434 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import ssl
+import struct
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram import Bot
+
+from config.settings import BotConfig
+from src.metrics import MetricsRegistry, MetricsServer
+from src.response_corpus import CorpusFile, builtin_corpus
+from src.shared_stats import SharedStatsTable
+
+# Длина кадра обновления в канале супервизор -> воркер
+FRAME_HEADER = struct.Struct('>I')
+# Подтверждение кадра в обратном канале воркер -> супервизор: один байт на кадр
+FRAME_ACK = b'\x01'
+# Сколько ждать подтверждения от воркера, прежде чем ответить Telegram 503, сек
+ACK_TIMEOUT = 10.0
+# Как часто воркер публикует свою статистику в разделяемую память, сек
+SHARED_STATS_INTERVAL = 1.0
+# Максимальный размер тела запроса webhook
+MAX_BODY_SIZE = 1 << 20
+
+
+def route_update(data: Dict[str, Any], workers: int) -> int:
+    """
+    Выбирает воркер для обновления по id пользователя.
+
+    Все обновления одного пользователя попадают в один воркер, поэтому
+    порядок обработки и схлопывание inline-запросов сохраняются. Обновления
+    без отправителя распределяются по update_id.
+
+    Args:
+        data: Обновление в виде словаря (JSON от Telegram)
+        workers: Количество воркеров
+
+    Returns:
+        int: Индекс воркера
+    """
+    for value in data.values():
+        if isinstance(value, dict):
+            sender = value.get('from')
+            if isinstance(sender, dict) and 'id' in sender:
+                return sender['id'] % workers
+    return data.get('update_id', 0) % workers
+
+
+class WorkerContext:
+    """Параметры, с которыми IsItTrueBot работает как воркер супервизора."""
+
+    def __init__(self, index: int, socket_path: str, stats_table: SharedStatsTable):
+        """
+        Args:
+            index: Индекс воркера (строка в таблице статистики)
+            socket_path: Unix-сокет, на котором воркер принимает обновления
+            stats_table: Общая таблица статистики
+        """
+        self.index = index
+        self.socket_path = socket_path
+        self.stats_table = stats_table
+
+
+def run_worker(index: int, socket_path: str, stats_table_name: str, workers: int, categories: Tuple[str, ...]):
+    """Точка входа процесса-воркера."""
+    from src.bot import IsItTrueBot
+
+    # Процесс запущен через spawn: окружение унаследовано, .env читаем заново
+    BotConfig.load()
+    stats_table = SharedStatsTable(workers, categories, name=stats_table_name)
+    try:
+        IsItTrueBot(worker=WorkerContext(index, socket_path, stats_table)).run()
+    finally:
+        stats_table.close()
+
+
+class _WorkerHandle:
+    """Процесс воркера и соединение, по которому ему передаются обновления."""
+
+    def __init__(self, index: int, socket_path: str):
+        self.index = index
+        self.socket_path = socket_path
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.drain_lock = asyncio.Lock()
+        # Ожидающие подтверждения кадры текущего соединения, в порядке отправки
+        self.pending: deque = deque()
+        self.ack_task: Optional[asyncio.Task] = None
+        self.forwarded = 0
+        self.restarts = 0
+
+    @property
+    def alive(self) -> bool:
+        return bool(self.process and self.process.is_alive() and self.writer and not self.writer.is_closing())
+
+    def connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Начинает работу с новым соединением воркера."""
+        self.writer = writer
+        self.pending = deque()
+        self.ack_task = asyncio.get_running_loop().create_task(self._read_acks(reader, self.pending))
+
+    def disconnect(self):
+        if self.writer:
+            self.writer.close()
+        if self.ack_task:
+            self.ack_task.cancel()
+
+    async def _read_acks(self, reader: asyncio.StreamReader, pending: deque):
+        """
+        Сопоставляет подтверждения воркера отправленным кадрам.
+
+        Воркер читает кадры по порядку, поэтому подтверждения приходят в
+        порядке отправки. Когда соединение закрывается, все неподтвержденные
+        кадры завершаются ошибкой - их обновления получат 503.
+        """
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                for _ in range(len(data)):
+                    ack = pending.popleft()
+                    if not ack.done():
+                        ack.set_result(None)
+        except (ConnectionError, IndexError):
+            pass
+        finally:
+            while pending:
+                ack = pending.popleft()
+                if not ack.done():
+                    ack.set_exception(ConnectionError(f"Воркер {self.index} закрыл соединение"))
+
+    async def send(self, body: bytes, timeout: float = ACK_TIMEOUT):
+        """
+        Передает обновление воркеру и ждет, пока он примет его в очередь обработки.
+
+        Raises:
+            ConnectionError: Воркер недоступен, закрыл соединение или не подтвердил кадр вовремя
+        """
+        if not self.alive:
+            raise ConnectionError(f"Воркер {self.index} недоступен")
+        ack = asyncio.get_running_loop().create_future()
+        self.writer.write(FRAME_HEADER.pack(len(body)) + body)
+        self.pending.append(ack)
+        # В Python 3.9 drain() нельзя ждать из нескольких корутин одновременно
+        async with self.drain_lock:
+            await self.writer.drain()
+        try:
+            await asyncio.wait_for(ack, timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"Воркер {self.index} не подтвердил обновление за {timeout:g} с")
+        self.forwarded += 1
+
+
+class Supervisor:
+    """
+    Режим нескольких процессов за одним webhook.
+
+    Супервизор принимает POST-запросы Telegram на webhook ("входная дверь"),
+    по id пользователя выбирает воркер и передает ему тело запроса как есть
+    через unix-сокет. Каждый воркер - обычный IsItTrueBot со своим event loop
+    на своем ядре. Счетчики воркеров собираются в разделяемой памяти
+    (SharedStatsTable), поэтому /stats в любом воркере показывает общие числа.
+
+    Telegram получает 200 только после того, как воркер подтвердил, что
+    принял обновление в свою очередь обработки. Упавший воркер
+    перезапускается; пока он недоступен, его обновления получают ответ 503 и
+    Telegram доставляет их повторно. Обновления, уже принятые воркером, но
+    не обработанные к моменту его падения, теряются - как и в обычном
+    режиме webhook, где ответ 200 отправляется при постановке в очередь.
+    """
+
+    def __init__(self, workers: int):
+        """
+        Args:
+            workers: Количество процессов-воркеров
+        """
+        self.logger = logging.getLogger(__name__)
+        self.workers_count = workers
+        # Категории те же, что загрузят воркеры: из файла ответов или встроенные
+        corpus_file = CorpusFile(BotConfig.RESPONSES_FILE)
+        corpus = corpus_file.load() if corpus_file.exists() else builtin_corpus()
+        self.categories = corpus.categories
+        self.webhook_path = '/' + BotConfig.WEBHOOK_PATH.strip('/')
+        self._context = multiprocessing.get_context('spawn')
+        self._workers: List[_WorkerHandle] = []
+        self._socket_dir: Optional[str] = None
+        self.stats_table: Optional[SharedStatsTable] = None
+        self.rejected = 0
+        self._connections = set()
+
+    def run(self):
+        """Запускает воркеры и входную дверь webhook до получения SIGTERM/SIGINT."""
+        asyncio.run(self._run())
+
+    async def _run(self):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        self._socket_dir = tempfile.mkdtemp(prefix='isittruebot-')
+        self.stats_table = SharedStatsTable(self.workers_count, self.categories)
+        server = None
+        metrics_server = None
+        monitor = None
+        try:
+            self._workers = [
+                _WorkerHandle(index, os.path.join(self._socket_dir, f'worker-{index}.sock'))
+                for index in range(self.workers_count)
+            ]
+            await asyncio.gather(*(self._start_worker(worker) for worker in self._workers))
+
+            server = await asyncio.start_server(
+                self._handle_connection,
+                BotConfig.WEBHOOK_LISTEN,
+                BotConfig.WEBHOOK_PORT,
+                ssl=self._ssl_context(),
+            )
+            await self._set_webhook()
+            self.logger.info(
+                "Супервизор: %s воркеров, webhook слушает %s:%s",
+                self.workers_count, BotConfig.WEBHOOK_LISTEN, BotConfig.WEBHOOK_PORT
+            )
+
+            if BotConfig.METRICS_PORT:
+                metrics_server = MetricsServer(BotConfig.METRICS_LISTEN, BotConfig.METRICS_PORT)
+                metrics_server.add_registry('/metrics', self._build_metrics())
+                metrics_server.add_route('/health', self._health)
+                await metrics_server.start()
+
+            monitor = loop.create_task(self._monitor_workers(stop))
+            await stop.wait()
+        finally:
+            self.logger.info("Супервизор останавливается")
+            if monitor:
+                monitor.cancel()
+            if server:
+                server.close()
+                for task in list(self._connections):
+                    task.cancel()
+                await asyncio.gather(*self._connections, return_exceptions=True)
+                await server.wait_closed()
+            if metrics_server:
+                await metrics_server.stop()
+            await self._stop_workers()
+            self.stats_table.close()
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+    # --- воркеры -------------------------------------------------------------
+
+    async def _start_worker(self, worker: _WorkerHandle, timeout: float = 60.0):
+        if os.path.exists(worker.socket_path):
+            os.unlink(worker.socket_path)
+        worker.process = self._context.Process(
+            target=run_worker,
+            args=(worker.index, worker.socket_path, self.stats_table.name, self.workers_count, self.categories),
+            name=f'isittruebot-worker-{worker.index}',
+        )
+        worker.process.start()
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                worker.connect(*await asyncio.open_unix_connection(worker.socket_path))
+                return
+            except OSError:
+                if not worker.process.is_alive() or time.monotonic() > deadline:
+                    raise RuntimeError(f"Воркер {worker.index} не запустился")
+                await asyncio.sleep(0.1)
+
+    async def _monitor_workers(self, stop: asyncio.Event):
+        """Перезапускает упавшие воркеры (все сразу, чтобы долгий запуск одного не задерживал другие)."""
+        while not stop.is_set():
+            await asyncio.sleep(1.0)
+            dead = [worker for worker in self._workers if not worker.process.is_alive()]
+            if dead:
+                await asyncio.gather(*(self._restart_worker(worker) for worker in dead))
+
+    async def _restart_worker(self, worker: _WorkerHandle):
+        self.logger.error(
+            "Воркер %s завершился с кодом %s, перезапускаем", worker.index, worker.process.exitcode
+        )
+        worker.disconnect()
+        worker.restarts += 1
+        try:
+            await self._start_worker(worker)
+        except RuntimeError as e:
+            self.logger.error("%s", e)
+
+    async def _stop_workers(self, timeout: float = 15.0):
+        for worker in self._workers:
+            worker.disconnect()
+            if worker.process and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            if not worker.process:
+                continue
+            await asyncio.to_thread(worker.process.join, max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+
+    # --- webhook -------------------------------------------------------------
+
+    def _ssl_context(self) -> Optional[ssl.SSLContext]:
+        if not BotConfig.WEBHOOK_CERT:
+            return None
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(BotConfig.WEBHOOK_CERT, BotConfig.WEBHOOK_KEY)
+        return context
+
+    async def _set_webhook(self):
+        bot = Bot(BotConfig.BOT_TOKEN, base_url=BotConfig.API_BASE_URL or 'https://api.telegram.org/bot')
+        async with bot:
+            await bot.set_webhook(
+                url=BotConfig.get_webhook_url(),
+                certificate=Path(BotConfig.WEBHOOK_CERT).read_bytes() if BotConfig.WEBHOOK_CERT else None,
+                allowed_updates=BotConfig.ALLOWED_UPDATES,
+                max_connections=BotConfig.WEBHOOK_MAX_CONNECTIONS,
+                secret_token=BotConfig.WEBHOOK_SECRET_TOKEN,
+            )
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Обслуживает keep-alive соединение Telegram с webhook."""
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', '0'))
+                if length > MAX_BODY_SIZE:
+                    writer.write(self._response(413))
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                writer.write(self._response(await self._handle_request(request_line, headers, body)))
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            # CancelledError - остановка супервизора, соединение просто закрывается
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _handle_request(self, request_line: bytes, headers: Dict[str, str], body: bytes) -> int:
+        parts = request_line.decode('latin-1').split()
+        if len(parts) < 2 or parts[0] != 'POST':
+            return 405
+        if parts[1].split('?', 1)[0] != self.webhook_path:
+            return 404
+        if (BotConfig.WEBHOOK_SECRET_TOKEN
+                and headers.get('x-telegram-bot-api-secret-token') != BotConfig.WEBHOOK_SECRET_TOKEN):
+            return 403
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400
+        if not isinstance(data, dict):
+            return 400
+
+        worker = self._workers[route_update(data, self.workers_count)]
+        try:
+            await worker.send(body)
+        except ConnectionError as e:
+            self.rejected += 1
+            self.logger.warning("%s", e)
+            return 503
+        return 200
+
+    @staticmethod
+    def _response(status: int) -> bytes:
+        reasons = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+                   405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+        return f'HTTP/1.1 {status} {reasons[status]}\r\nContent-Length: 0\r\n\r\n'.encode('latin-1')
+
+    # --- метрики и здоровье --------------------------------------------------
+
+    def _build_metrics(self) -> MetricsRegistry:
+        metrics = MetricsRegistry(prefix='isittruebot_')
+        for field in ('total_queries', 'text_queries', 'button_queries'):
+            metrics.callback(
+                f'{field}_total', f'Счетчик {field} по всем воркерам',
+                lambda field=field: self.stats_table.aggregate()[field], type_name='counter'
+            )
+        metrics.callback('today_queries', 'Запросов за текущий день по всем воркерам',
+                         lambda: self.stats_table.aggregate()['today_queries'])
+        metrics.callback_family(
+            'responses_total', 'Сгенерированные ответы по категориям', 'category',
+            lambda: self.stats_table.aggregate()['categories'], type_name='counter'
+        )
+        metrics.callback_family(
+            'supervisor_forwarded_total', 'Обновления, переданные воркерам', 'worker',
+            lambda: {str(worker.index): worker.forwarded for worker in self._workers}, type_name='counter'
+        )
+        metrics.callback('supervisor_rejected_total', 'Обновления, отклоненные из-за недоступного воркера',
+                         lambda: self.rejected, type_name='counter')
+        metrics.callback('supervisor_workers_alive', 'Работающие воркеры',
+                         lambda: sum(worker.alive for worker in self._workers))
+        metrics.callback('supervisor_worker_restarts_total', 'Перезапуски воркеров',
+                         lambda: sum(worker.restarts for worker in self._workers), type_name='counter')
+        return metrics
+
+    async def _health(self) -> Tuple[int, str, bytes]:
+        alive = sum(worker.alive for worker in self._workers)
+        healthy = alive == self.workers_count
+        payload = {
+            'status': 'ok' if healthy else 'unhealthy',
+            'mode': 'supervisor',
+            'workers': self.workers_count,
+            'workers_alive': alive,
+        }
+        return (200 if healthy else 503), 'application/json', json.dumps(payload).encode('utf-8')
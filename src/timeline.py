@@ -0,0 +1,250 @@
+import time
+from array import array
+from collections import deque
+from typing import Callable, Optional, Sequence, Tuple
+
+# Глубина истории: сутки поминутно
+TIMELINE_MINUTES = 24 * 60
+# Окна, по которым поддерживаются скользящие суммы (в минутах)
+TIMELINE_WINDOWS = (5, 15, 30, 60)
+
+
+class MinuteTimeline:
+    """
+    Поминутная история запросов фиксированного размера.
+
+    Данные лежат в кольцевом буфере из массивов array: по ячейке на минуту
+    для каждого счетчика из fields, а также сумма, количество и максимум
+    времени ответа. Память выделяется один раз в конструкторе и не зависит
+    от нагрузки.
+
+    Запись (add, observe_latency) меняет только ячейку текущей минуты - O(1).
+    При смене минуты закрытая минута добавляется в скользящие суммы окон
+    TIMELINE_WINDOWS и всей истории, а вышедшая из окна - вычитается; пиковая
+    минута поддерживается монотонной очередью. Поэтому чтение сумм, QPS, пика
+    и тренда не обходит буфер.
+    """
+
+    def __init__(self, fields: Sequence[str], minutes: int = TIMELINE_MINUTES,
+                 windows: Sequence[int] = TIMELINE_WINDOWS, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            fields: Имена счетчиков; первый считается общим числом запросов (для пика)
+            minutes: Глубина истории в минутах
+            windows: Окна скользящих сумм в минутах (не больше minutes)
+            clock: Источник времени (unix time)
+        """
+        if any(window > minutes for window in windows):
+            raise ValueError("Окно скользящей суммы не может быть длиннее истории")
+        self.fields = tuple(fields)
+        self.minutes = minutes
+        self.windows = tuple(sorted(set(windows) | {minutes}))
+        self._index = {name: i for i, name in enumerate(self.fields)}
+        self._clock = clock
+
+        size = len(self.fields)
+        self._counts = array('I', bytes(4 * minutes * size))
+        self._latency_sum = array('d', bytes(8 * minutes))
+        self._latency_count = array('I', bytes(4 * minutes))
+        self._latency_max = array('d', bytes(8 * minutes))
+
+        # Суммы по закрытым минутам окна: для окна W это минуты m-W+1 .. m-1,
+        # текущая минута m добавляется при чтении
+        self._sums = {window: [0] * size for window in self.windows}
+        self._latency_sums = {window: [0.0, 0] for window in self.windows}
+        # Монотонная очередь (минута, запросов) закрытых минут истории:
+        # значения убывают, в начале - пиковая минута
+        self._peaks = deque()
+
+        self.started = clock()
+        self._minute = int(self.started // 60)
+
+    def _slot(self, minute: int) -> int:
+        return minute % self.minutes
+
+    def _advance(self, now: float):
+        """Переходит к минуте, соответствующей now, закрывая прошедшие минуты."""
+        minute = int(now // 60)
+        if minute <= self._minute:
+            return
+        if minute - self._minute >= self.minutes:
+            # Бот простаивал дольше всей истории - в ней ничего не осталось
+            self._clear()
+        else:
+            for current in range(self._minute + 1, minute + 1):
+                self._close_minute(current)
+        self._minute = minute
+
+    def _close_minute(self, current: int):
+        """Закрывает минуту current - 1 и освобождает ячейку для минуты current."""
+        size = len(self.fields)
+        closed = self._slot(current - 1) * size
+        closed_counts = self._counts[closed:closed + size]
+        closed_latency = (self._latency_sum[self._slot(current - 1)], self._latency_count[self._slot(current - 1)])
+
+        for window in self.windows:
+            sums = self._sums[window]
+            latency = self._latency_sums[window]
+            expired = self._slot(current - window)
+            base = expired * size
+            for i in range(size):
+                sums[i] += closed_counts[i] - self._counts[base + i]
+            latency[0] += closed_latency[0] - self._latency_sum[expired]
+            latency[1] += closed_latency[1] - self._latency_count[expired]
+
+        peaks = self._peaks
+        total = closed_counts[0] if size else 0
+        while peaks and peaks[-1][1] <= total:
+            peaks.pop()
+        peaks.append((current - 1, total))
+        while peaks[0][0] <= current - self.minutes:
+            peaks.popleft()
+
+        slot = self._slot(current)
+        base = slot * size
+        for i in range(size):
+            self._counts[base + i] = 0
+        self._latency_sum[slot] = 0.0
+        self._latency_count[slot] = 0
+        self._latency_max[slot] = 0.0
+
+    def _clear(self):
+        size = len(self.fields)
+        self._counts = array('I', bytes(4 * self.minutes * size))
+        self._latency_sum = array('d', bytes(8 * self.minutes))
+        self._latency_count = array('I', bytes(4 * self.minutes))
+        self._latency_max = array('d', bytes(8 * self.minutes))
+        for window in self.windows:
+            self._sums[window] = [0] * size
+            self._latency_sums[window] = [0.0, 0]
+        self._peaks.clear()
+
+    def add(self, field: str, count: int = 1):
+        """
+        Увеличивает счетчик field в текущей минуте.
+
+        Args:
+            field: Имя счетчика из fields
+            count: Величина приращения
+        """
+        self._advance(self._clock())
+        self._counts[self._slot(self._minute) * len(self.fields) + self._index[field]] += count
+
+    def observe_latency(self, seconds: float):
+        """
+        Учитывает время ответа в текущей минуте.
+
+        Args:
+            seconds: Время ответа в секундах
+        """
+        self._advance(self._clock())
+        slot = self._slot(self._minute)
+        self._latency_sum[slot] += seconds
+        self._latency_count[slot] += 1
+        if seconds > self._latency_max[slot]:
+            self._latency_max[slot] = seconds
+
+    def window_sum(self, field: str, minutes: int) -> int:
+        """
+        Возвращает сумму счетчика за последние minutes минут (включая текущую).
+
+        Args:
+            field: Имя счетчика
+            minutes: Окно из TIMELINE_WINDOWS или вся история
+
+        Returns:
+            int: Сумма за окно
+        """
+        self._advance(self._clock())
+        index = self._index[field]
+        current = self._counts[self._slot(self._minute) * len(self.fields) + index]
+        return self._sums[minutes][index] + current
+
+    def covered_seconds(self, minutes: int) -> float:
+        """
+        Возвращает длительность окна, для которого есть данные.
+
+        Окно не длиннее времени работы бота, а текущая минута учитывается
+        только прошедшей частью.
+        """
+        now = self._clock()
+        elapsed_in_minute = now - self._minute * 60
+        return max(0.0, min(now - self.started, (minutes - 1) * 60 + elapsed_in_minute))
+
+    def qps(self, minutes: int = TIMELINE_WINDOWS[0]) -> float:
+        """
+        Возвращает среднее число запросов в секунду за окно.
+
+        Args:
+            minutes: Окно из TIMELINE_WINDOWS
+
+        Returns:
+            float: Запросов в секунду
+        """
+        total = self.window_sum(self.fields[0], minutes)
+        return total / max(self.covered_seconds(minutes), 1.0)
+
+    def peak(self) -> Tuple[int, Optional[float]]:
+        """
+        Возвращает самую загруженную минуту за всю историю.
+
+        Returns:
+            Tuple[int, Optional[float]]: (запросов за минуту, начало минуты в unix time
+            или None, если запросов не было)
+        """
+        self._advance(self._clock())
+        current = self._counts[self._slot(self._minute) * len(self.fields)]
+        if self._peaks and self._peaks[0][1] >= current:
+            minute, count = self._peaks[0]
+        else:
+            minute, count = self._minute, current
+        if not count:
+            return 0, None
+        return count, minute * 60.0
+
+    def trend(self, minutes: int = TIMELINE_WINDOWS[1]) -> Optional[float]:
+        """
+        Сравнивает последние minutes минут с предыдущими minutes минутами.
+
+        Для окна minutes в TIMELINE_WINDOWS должно быть и окно 2 * minutes.
+
+        Returns:
+            Optional[float]: Относительное изменение (0.25 - рост на 25%) или None,
+            если данных за оба окна еще нет или в предыдущем окне не было запросов
+        """
+        if self._clock() - self.started < 2 * minutes * 60:
+            return None
+        field = self.fields[0]
+        recent = self.window_sum(field, minutes)
+        previous = self.window_sum(field, 2 * minutes) - recent
+        if not previous:
+            return None
+        return recent / previous - 1
+
+    def latency(self, minutes: int = TIMELINE_WINDOWS[0]) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Возвращает среднее и максимальное время ответа за окно.
+
+        Среднее берется из скользящих сумм; максимум вычисляется по ячейкам
+        окна, поэтому окно должно быть коротким.
+
+        Returns:
+            Tuple[Optional[float], Optional[float]]: (среднее, максимум) в секундах
+            или (None, None), если ответов не было
+        """
+        self._advance(self._clock())
+        slot = self._slot(self._minute)
+        latency_sum, latency_count = self._latency_sums[minutes]
+        latency_sum += self._latency_sum[slot]
+        latency_count += self._latency_count[slot]
+        if not latency_count:
+            return None, None
+        latency_max = max(self._latency_max[self._slot(self._minute - i)] for i in range(minutes))
+        return latency_sum / latency_count, latency_max
+
+    @property
+    def nbytes(self) -> int:
+        """Размер массивов буфера в байтах."""
+        return sum(buf.itemsize * len(buf) for buf in (
+            self._counts, self._latency_sum, self._latency_count, self._latency_max
+        ))
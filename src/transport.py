@@ -0,0 +1,104 @@
+import ssl
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import httpx
+from telegram.request import HTTPXRequest
+
+from config.settings import BotConfig
+
+# getUpdates - всегда один запрос за раз: long polling не распараллеливается
+GET_UPDATES_POOL_SIZE = 1
+
+
+@lru_cache(maxsize=None)
+def _shared_ssl_context() -> ssl.SSLContext:
+    """
+    SSL-контекст с корневыми сертификатами, общий для всех клиентов.
+
+    httpx загружает набор сертификатов certifi заново для каждого клиента
+    (около 40 мс на запуск), а клиентов у бота несколько.
+    """
+    return httpx.create_ssl_context()
+
+
+class KeepAliveHTTPXRequest(HTTPXRequest):
+    """
+    HTTPXRequest с настраиваемым временем жизни простаивающих соединений.
+
+    Стандартный HTTPXRequest задает только размер пула; соединение, которое
+    простояло дольше keepalive_expiry, закрывается, и следующий запрос
+    платит за новое TCP- и TLS-рукопожатие с api.telegram.org.
+
+    Один клиент могут использовать несколько ботов (EXTRA_BOTS): каждый
+    Bot вызывает initialize и shutdown, и клиент закрывается только после
+    shutdown последнего из них.
+    """
+
+    def __init__(self, connection_pool_size: int = 1, keepalive_expiry: Optional[float] = 5.0, **kwargs):
+        """
+        Args:
+            connection_pool_size: Максимум одновременных соединений
+            keepalive_expiry: Сколько секунд держать простаивающее соединение
+                открытым (0 - закрывать сразу, None - не закрывать)
+            **kwargs: Таймауты и http_version, как у HTTPXRequest
+        """
+        # HTTPXRequest.__init__ сразу создает клиент через _build_client
+        self.keepalive_expiry = keepalive_expiry
+        self._users = 0
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+
+    async def initialize(self) -> None:
+        self._users += 1
+        await super().initialize()
+
+    async def shutdown(self) -> None:
+        self._users = max(self._users - 1, 0)
+        if not self._users:
+            await super().shutdown()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        # Вызывается и при повторной инициализации после shutdown
+        pool_size = self._client_kwargs['limits'].max_connections
+        self._client_kwargs['limits'] = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        self._client_kwargs['verify'] = _shared_ssl_context()
+        return super()._build_client()
+
+
+def build_requests(request: Optional[KeepAliveHTTPXRequest] = None
+                   ) -> Tuple[KeepAliveHTTPXRequest, KeepAliveHTTPXRequest]:
+    """
+    Создает HTTP-клиенты Bot API по настройкам BotConfig.
+
+    У getUpdates и у остальных методов раздельные пулы соединений: долгий
+    запрос long polling не занимает соединение, нужное для ответов, а
+    ответы не ждут в пуле, пока вернется getUpdates.
+
+    Args:
+        request: Уже созданный клиент исходящих методов, общий с другим
+            ботом процесса. getUpdates у каждого бота свой: long polling
+            держит соединение до прихода обновлений
+
+    Returns:
+        Tuple[KeepAliveHTTPXRequest, KeepAliveHTTPXRequest]: Клиент для
+        исходящих методов и клиент для getUpdates
+    """
+    options = dict(
+        keepalive_expiry=BotConfig.BOT_API_KEEPALIVE_EXPIRY,
+        connect_timeout=BotConfig.BOT_API_CONNECT_TIMEOUT,
+        read_timeout=BotConfig.BOT_API_READ_TIMEOUT,
+        write_timeout=BotConfig.BOT_API_WRITE_TIMEOUT,
+        pool_timeout=BotConfig.BOT_API_POOL_TIMEOUT,
+        http_version=BotConfig.BOT_API_HTTP_VERSION,
+    )
+    if request is None:
+        request = KeepAliveHTTPXRequest(connection_pool_size=BotConfig.BOT_API_POOL_SIZE, **options)
+    # Ответ на getUpdates приходит через timeout long polling - Bot.get_updates
+    # сам добавляет его к read_timeout. HTTP/2 для одного соединения не нужен
+    options['http_version'] = '1.1'
+    get_updates_request = KeepAliveHTTPXRequest(connection_pool_size=GET_UPDATES_POOL_SIZE, **options)
+    return request, get_updates_request
@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import heapq
+import logging
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from telegram import Update
+
+# Заголовок сегмента: сигнатура и версия формата
+SEGMENT_MAGIC = b'ITTUPD\x00\x01'
+SEGMENT_SUFFIX = '.rec'
+# Запись: длина текста (байт), время поступления (unix), вид, хеш
+# пользователя, код языка (2 символа ASCII); за ней - текст в UTF-8
+RECORD_HEADER = struct.Struct('<HdBQ2s')
+
+KIND_INLINE_QUERY = 1
+KIND_PRIVATE_MESSAGE = 2
+KIND_GROUP_MESSAGE = 3
+
+# Как часто буфер записи сбрасывается в файл, сек: лог можно читать по ходу записи
+FLUSH_INTERVAL = 1.0
+# Размер буфера, при котором он сбрасывается, не дожидаясь FLUSH_INTERVAL
+WRITE_BUFFER_SIZE = 64 * 1024
+# Больше стольких несброшенных байт (диск не успевает) - новые записи отбрасываются
+MAX_PENDING_BYTES = 64 * WRITE_BUFFER_SIZE
+
+
+class RecordedUpdate(NamedTuple):
+    """Обновление из лога: только то, от чего зависит работа бота."""
+
+    time: float
+    kind: int
+    user: int
+    language: Optional[str]
+    text: str
+
+
+def scrub_text(text: str) -> str:
+    """
+    Скрывает содержание текста, сохраняя его форму.
+
+    Длина, пробелы, знаки препинания и алфавит (кириллица или нет) остаются,
+    поэтому доля пустых запросов и длина вопросов в логе настоящие.
+    Команда бота в начале сообщения сохраняется.
+
+    Args:
+        text: Текст запроса или сообщения
+
+    Returns:
+        str: Текст той же формы
+    """
+    prefix = ''
+    if text.startswith('/'):
+        command, separator, text = text.partition(' ')
+        prefix = command + separator
+    chars = []
+    for char in text:
+        if char.isdigit():
+            chars.append('0')
+        elif char.isalpha():
+            chars.append('ж' if 'а' <= char.lower() <= 'я' or char.lower() == 'ё' else 'x')
+        else:
+            chars.append(char)
+    return prefix + ''.join(chars)
+
+
+class UpdateRecorder:
+    """
+    Запись поступающих обновлений в компактный двоичный лог для воспроизведения.
+
+    Обновление записывается при поступлении в очередь (до схлопывания и
+    обработчиков) одной записью: время, вид (inline-запрос, сообщение в
+    личном чате или в группе), хеш id пользователя с солью, код языка и
+    текст - по желанию обезличенный (scrub_text). Запись - копирование в
+    буфер в памяти. Буфер сбрасывает в файл фоновая задача (start/stop) раз
+    в FLUSH_INTERVAL и при заполнении до WRITE_BUFFER_SIZE; запись в файл,
+    смена сегмента и удаление старых сегментов выполняются в отдельном
+    потоке, поэтому не задерживают event loop.
+
+    Лог состоит из сегментов <stream>-<время>.rec. Сегмент закрывается,
+    когда достигает segment_bytes; если сегменты потока занимают больше
+    max_bytes, самые старые удаляются.
+    """
+
+    def __init__(self, directory: str, stream: str, segment_bytes: int, max_bytes: int,
+                 scrub: bool = False, salt: Optional[bytes] = None):
+        """
+        Args:
+            directory: Каталог сегментов
+            stream: Имя потока в именах файлов (бот, воркер)
+            segment_bytes: Размер сегмента, после которого начинается новый
+            max_bytes: Максимальный общий размер сегментов потока
+            scrub: Обезличивать тексты запросов и сообщений
+            salt: Соль хеша id пользователей (None - случайная на время работы процесса)
+        """
+        self.directory = Path(directory)
+        self.stream = stream
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.scrub = scrub
+        # Ключ blake2b - не длиннее 64 байт, поэтому соль любой длины сворачивается в 32
+        self._salt = hashlib.blake2b(salt, digest_size=32).digest() if salt else os.urandom(32)
+        self.logger = logging.getLogger(__name__)
+
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[Path] = None
+        self._segment_size = 0
+        # Записи, еще не переданные в файл (только из event loop)
+        self._buffer = bytearray()
+        # Файл и сегменты меняются только в потоке записи под этой блокировкой
+        self._file_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.enabled = True
+
+        # Счетчики
+        self.recorded = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.segments_deleted = 0
+
+    def hash_user(self, user_id: int) -> int:
+        """Хеш id пользователя: одинаковый для одного пользователя в пределах соли."""
+        digest = hashlib.blake2b(user_id.to_bytes(8, 'little', signed=True), digest_size=8, key=self._salt)
+        return int.from_bytes(digest.digest(), 'little')
+
+    def on_arrival(self, update: object):
+        """Записывает поступившее обновление (обработчик ArrivalQueue)."""
+        if not self.enabled or not isinstance(update, Update):
+            return
+        if update.inline_query:
+            user = update.inline_query.from_user
+            self.record(KIND_INLINE_QUERY, user.id, user.language_code, update.inline_query.query)
+        elif update.message and update.message.text and update.message.from_user:
+            user = update.message.from_user
+            kind = KIND_PRIVATE_MESSAGE if update.message.chat.type == 'private' else KIND_GROUP_MESSAGE
+            self.record(kind, user.id, user.language_code, update.message.text)
+
+    def record(self, kind: int, user_id: int, language: Optional[str], text: str):
+        """
+        Добавляет запись в буфер.
+
+        Args:
+            kind: KIND_*
+            user_id: id пользователя Telegram (в лог попадает только хеш)
+            language: Код языка пользователя
+            text: Текст запроса или сообщения
+        """
+        if len(self._buffer) >= MAX_PENDING_BYTES:
+            self.dropped += 1
+            return
+        if self.scrub:
+            text = scrub_text(text)
+        data = text.encode('utf-8')
+        language_code = (language or '')[:2].encode('ascii', 'replace')
+        self._buffer += RECORD_HEADER.pack(len(data), time.time(), kind, self.hash_user(user_id), language_code)
+        self._buffer += data
+        self.recorded += 1
+        if len(self._buffer) >= WRITE_BUFFER_SIZE and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        """Запускает фоновую задачу сброса буфера (в работающем event loop)."""
+        self._wakeup = asyncio.Event()
+        self._writer_task = asyncio.get_running_loop().create_task(self._writer_loop())
+
+    async def stop(self):
+        """Сбрасывает оставшийся буфер и закрывает текущий сегмент."""
+        if self._writer_task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._writer_task
+            self._writer_task = None
+        elif self.enabled:
+            await self._write_pending()
+        await asyncio.to_thread(self.close)
+
+    async def _writer_loop(self):
+        while self.enabled:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._write_pending()
+            if self._stopping:
+                break
+
+    async def _write_pending(self):
+        if not self._buffer:
+            return
+        chunk, self._buffer = self._buffer, bytearray()
+        try:
+            await asyncio.to_thread(self._write, chunk)
+        except OSError as e:
+            # Запись не должна мешать ответам: при ошибке диска запись выключается
+            self.logger.error("Запись обновлений остановлена: %s", e)
+            self.enabled = False
+            self._buffer = bytearray()
+            await asyncio.to_thread(self.close)
+
+    def _write(self, chunk: bytes):
+        """Пишет целые записи в текущий сегмент (в потоке записи)."""
+        with self._file_lock:
+            if self._file is None or self._segment_size >= self.segment_bytes:
+                self._rotate()
+            self._file.write(chunk)
+            self._file.flush()
+            self._segment_size += len(chunk)
+            self.bytes_written += len(chunk)
+
+    def _rotate(self):
+        """Закрывает текущий сегмент, открывает новый и соблюдает ограничение размера."""
+        self._close_file()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        self._path = self.directory / f"{self.stream}-{stamp}{SEGMENT_SUFFIX}"
+        self._file = open(self._path, 'wb')
+        self._file.write(SEGMENT_MAGIC)
+        self._segment_size = len(SEGMENT_MAGIC)
+        self._enforce_limit()
+
+    def _enforce_limit(self):
+        segments = sorted(self.directory.glob(f"{self.stream}-*{SEGMENT_SUFFIX}"))
+        total = sum(path.stat().st_size for path in segments)
+        # Текущий сегмент еще пуст - место оставляем под него целиком
+        total += self.segment_bytes
+        for path in segments:
+            if total <= self.max_bytes or path == self._path:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+            self.segments_deleted += 1
+
+    def close(self):
+        """Закрывает текущий сегмент (уже переданные в файл записи сохраняются)."""
+        with self._file_lock:
+            self._close_file()
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        Возвращает счетчики записи.
+
+        Returns:
+            Dict[str, float]: Записано и отброшено обновлений, записано байт, удалено сегментов
+        """
+        return {
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'bytes_written': self.bytes_written,
+            'segments_deleted': self.segments_deleted,
+        }
+
+
+def read_log(paths: Iterable[str]) -> Iterator[RecordedUpdate]:
+    """
+    Читает лог из файлов сегментов и каталогов в порядке времени поступления.
+
+    Сегменты разных потоков (воркеров, ботов) сливаются по времени.
+
+    Args:
+        paths: Файлы сегментов и каталоги с ними
+
+    Returns:
+        Iterator[RecordedUpdate]: Записи по возрастанию времени
+    """
+    segments = []
+    for path in map(Path, paths):
+        segments.extend(sorted(path.glob(f"*{SEGMENT_SUFFIX}")) if path.is_dir() else [path])
+    return heapq.merge(*(read_segment(segment) for segment in segments), key=lambda record: record.time)
+
+
+def read_segment(path: Path) -> Iterator[RecordedUpdate]:
+    """
+    Читает записи сегмента по одной.
+
+    Оборванная последняя запись (процесс завершился без close) пропускается.
+
+    Raises:
+        ValueError: Если файл - не сегмент лога обновлений
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+            raise ValueError(f"{path} - не лог обновлений (другой формат или версия)")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            length, at, kind, user, language = RECORD_HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield RecordedUpdate(at, kind, user, language.rstrip(b'\0').decode('ascii') or None,
+                                 data.decode('utf-8'))
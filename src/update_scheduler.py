@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application
+
+
+class ArrivalQueue(asyncio.Queue):
+    """
+    Очередь обновлений приложения, уведомляющая подписчиков о каждом поступлении.
+
+    Updater кладет в нее обновления сразу после получения (и в polling, и в
+    webhook-режиме), поэтому подписчики узнают об обновлении раньше, чем оно
+    дойдет до обработчиков.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._arrival_listeners: List[Callable[[object], None]] = []
+
+    def add_arrival_listener(self, listener: Callable[[object], None]):
+        """Добавляет синхронный обработчик поступления обновления."""
+        self._arrival_listeners.append(listener)
+
+    def put_nowait(self, item: object):
+        super().put_nowait(item)
+        for listener in self._arrival_listeners:
+            listener(item)
+
+
+class UpdateScheduler:
+    """
+    Планировщик конкурентной обработки обновлений.
+
+    - Ограничивает число одновременно обрабатываемых обновлений (max_in_flight).
+      Когда все слоты заняты, прием новых обновлений из очереди приостанавливается -
+      это и есть backpressure: обновления копятся в update_queue приложения.
+    - Сохраняет порядок для каждого пользователя: обновление пользователя начинает
+      обрабатываться только после завершения его предыдущего обновления.
+      Обновления разных пользователей обрабатываются параллельно.
+    """
+
+    # Как часто (в секундах) можно писать в лог предупреждение о переполнении
+    BACKPRESSURE_LOG_INTERVAL = 60.0
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        create_task: Callable[..., 'asyncio.Task'],
+        queue_size: Optional[Callable[[], int]] = None,
+    ):
+        """
+        Args:
+            max_in_flight: Максимум одновременно обрабатываемых обновлений
+            create_task: Функция запуска задачи (Application.create_task)
+            queue_size: Функция, возвращающая длину очереди ожидающих обновлений
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight должен быть положительным")
+
+        self.max_in_flight = max_in_flight
+        self._create_task = create_task
+        self._queue_size = queue_size or (lambda: 0)
+        self.logger = logging.getLogger(__name__)
+
+        # Семафор создается лениво, внутри работающего event loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Последняя задача каждого пользователя - следующая задача ждет ее завершения
+        self._tails: Dict[Any, asyncio.Future] = {}
+        self._last_backpressure_log = 0.0
+
+        # Метрики
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.backpressure_waits = 0
+        self.backpressure_wait_seconds = 0.0
+        self.ordering_waits = 0
+        self.peak_queue_size = 0
+
+    @staticmethod
+    def _ordering_key(update: object) -> Optional[int]:
+        """Ключ упорядочивания - id пользователя (None, если пользователя нет)."""
+        if isinstance(update, Update) and update.effective_user:
+            return update.effective_user.id
+        return None
+
+    async def submit(self, update: object, process: Callable[[object], Awaitable[None]]):
+        """
+        Запускает обработку обновления в отдельной задаче.
+
+        Вызывается последовательно из цикла приема обновлений, поэтому порядок
+        вызовов submit совпадает с порядком поступления обновлений.
+
+        Args:
+            update: Обновление
+            process: Корутина-обработчик (Application.process_update)
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        queue_size = self._queue_size()
+        if queue_size > self.peak_queue_size:
+            self.peak_queue_size = queue_size
+
+        if self._slots.locked():
+            # Все слоты заняты - ждем, пока освободится хотя бы один
+            self.backpressure_waits += 1
+            started = time.monotonic()
+            self._log_backpressure(queue_size)
+            await self._slots.acquire()
+            self.backpressure_wait_seconds += time.monotonic() - started
+        else:
+            await self._slots.acquire()
+
+        self.submitted += 1
+        self.in_flight += 1
+        if self.in_flight > self.peak_in_flight:
+            self.peak_in_flight = self.in_flight
+
+        key = self._ordering_key(update)
+        previous = self._tails.get(key) if key is not None else None
+        task = self._create_task(self._run(update, process, previous, key), update=update)
+        if key is not None:
+            self._tails[key] = task
+
+    async def _run(self, update: object, process: Callable[[object], Awaitable[None]],
+                   previous: Optional[asyncio.Future], key: Optional[int]):
+        try:
+            if previous is not None and not previous.done():
+                self.ordering_waits += 1
+                await asyncio.wait((previous,))
+            await process(update)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+            if key is not None and self._tails.get(key) is asyncio.current_task():
+                del self._tails[key]
+
+    def _log_backpressure(self, queue_size: int):
+        now = time.monotonic()
+        if now - self._last_backpressure_log >= self.BACKPRESSURE_LOG_INTERVAL:
+            self._last_backpressure_log = now
+            self.logger.warning(
+                "Все %s слотов обработки заняты, в очереди %s обновлений", self.max_in_flight, queue_size
+            )
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        Возвращает метрики конкурентной обработки.
+
+        Returns:
+            Dict[str, float]: Текущие значения счетчиков и gauge-метрик
+        """
+        return {
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'queue_size': self._queue_size(),
+            'peak_queue_size': self.peak_queue_size,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'backpressure_waits': self.backpressure_waits,
+            'backpressure_wait_seconds': self.backpressure_wait_seconds,
+            'ordering_waits': self.ordering_waits,
+            'active_users': len(self._tails),
+        }
+
+
+class ConcurrentApplication(Application):
+    """
+    Application, передающее обработку обновлений в UpdateScheduler.
+
+    Встроенный цикл приема обновлений работает в последовательном режиме
+    и вызывает process_update по одному; если планировщик задан, process_update
+    лишь ставит обновление в работу и сразу возвращает управление.
+    """
+
+    update_scheduler: Optional[UpdateScheduler] = None
+
+    async def process_update(self, update: object) -> None:
+        if self.update_scheduler is None:
+            await super().process_update(update)
+            return
+        await self.update_scheduler.submit(update, super().process_update)
+
+    def _mark_for_persistence_update(self, *, update: object = None, job: object = None) -> None:
+        # Application запоминает id чата и пользователя каждого обработанного
+        # обновления для записи в persistence, а очищает эти множества только
+        # при записи. Без persistence они растут с каждым новым пользователем
+        # все время работы процесса
+        if self.persistence:
+            super()._mark_for_persistence_update(update=update, job=job)